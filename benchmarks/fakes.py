@@ -0,0 +1,274 @@
+"""Offline stand-ins for every external service the app talks to.
+
+Each fake has an optional `latency` (seconds) so benchmarks can model a slow upstream
+without the network. install() wires them all in; it must run before `src` is imported
+only for faster_whisper, which the app imports lazily.
+"""
+import os
+import re
+import sys
+import html
+import json
+import time
+import types
+import wave
+import threading
+from types import SimpleNamespace
+
+SAMPLE_RATE = 16000
+LYRICS = [
+    "la luna brilla sobre el mar",
+    "y yo te espero en la ciudad",
+    "canta conmigo esta canción",
+    "la luna brilla sobre el mar",
+    "no tengo miedo de volar",
+    "canta conmigo esta canción",
+]
+
+
+# Every LINE_SECONDS of a sample clip holds one "sung" lyric line, then silence
+LINE_SECONDS = 3.0
+SUNG_SECONDS = 2.5
+_LEVEL = 1000
+
+
+def write_sample_clip(path, seconds=20.0):
+    """Writes a mono 16 kHz WAV standing in for a music clip: a burst of noise per lyric line, then silence.
+
+    Line i is sung at loudness (i % len(LYRICS) + 1) * _LEVEL, which is how the fake Whisper
+    knows which line it hears in any slice of the clip.
+    """
+    import numpy as np
+
+    samples = np.zeros(int(seconds * SAMPLE_RATE), dtype='<i2')
+    noise = np.random.default_rng(0).standard_normal(int(SUNG_SECONDS * SAMPLE_RATE))
+    # Never exactly zero, so every sung sample stands apart from the silence
+    noise = np.where(noise >= 0, np.maximum(noise, 0.01), np.minimum(noise, -0.01))
+    for i in range(int(seconds // LINE_SECONDS)):
+        start = int(i * LINE_SECONDS * SAMPLE_RATE)
+        burst = np.clip(noise * (i % len(LYRICS) + 1) * _LEVEL, -32767, 32767)
+        samples[start:start + len(burst)] = np.where(burst >= 0, np.maximum(burst, 1), np.minimum(burst, -1))
+    with wave.open(path, 'wb') as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(SAMPLE_RATE)
+        f.writeframes(samples.tobytes())
+    return path
+
+
+# --- Whisper -----------------------------------------------------------------
+
+def decode_audio(path, sampling_rate=SAMPLE_RATE):
+    import numpy as np
+
+    with wave.open(path, 'rb') as f:
+        frames = f.readframes(f.getnframes())
+    return np.frombuffer(frames, dtype='<i2').astype(np.float32) / 32768.0
+
+
+def _sung_regions(audio, min_silence=0.2):
+    """(start, end) sample ranges of the non-silent stretches of audio."""
+    import numpy as np
+
+    sung = np.flatnonzero(np.asarray(audio) != 0)
+    if not len(sung):
+        return []
+    breaks = np.flatnonzero(np.diff(sung) > min_silence * SAMPLE_RATE)
+    starts = np.concatenate(([sung[0]], sung[breaks + 1]))
+    ends = np.concatenate((sung[breaks], [sung[-1]])) + 1
+    return list(zip(starts.tolist(), ends.tolist()))
+
+
+class VadOptions:
+    def __init__(self, **options):
+        self.options = options
+
+
+def get_speech_timestamps(audio, vad_options=None, **kwargs):
+    return [{'start': start, 'end': end} for start, end in _sung_regions(audio)]
+
+
+class WhisperModel:
+    """Emits the lyric line sung in each non-silent stretch of the audio, with exact timestamps."""
+    latency_per_audio_second = 0.0
+
+    def __init__(self, size, device='cpu', compute_type='int8', cpu_threads=0, num_workers=1):
+        self.size = size
+
+    def transcribe(self, audio, language=None, **options):
+        if isinstance(audio, str):
+            audio = decode_audio(audio)
+        duration = len(audio) / SAMPLE_RATE
+        info = SimpleNamespace(language=language or 'es', duration=duration)
+
+        def words(start, text):
+            if not options.get('word_timestamps'):
+                return None
+            tokens = text.split()
+            step = 2.5 / len(tokens)
+            return [SimpleNamespace(start=start + j * step, end=start + (j + 1) * step, word=f" {token}") for j, token in enumerate(tokens)]
+
+        def segments():
+            import numpy as np
+
+            for start, end in _sung_regions(audio):
+                time.sleep((end - start) / SAMPLE_RATE * self.latency_per_audio_second)
+                level = np.abs(audio[start:end]).mean() * 32768 / (_LEVEL * 0.8)
+                text = LYRICS[max(0, min(len(LYRICS) - 1, round(level) - 1))]
+                yield SimpleNamespace(start=start / SAMPLE_RATE, end=end / SAMPLE_RATE, text=f" {text}",
+                                      words=words(start / SAMPLE_RATE, text))
+        return segments(), info
+
+
+class BatchedInferencePipeline:
+    def __init__(self, model):
+        self.model = model
+
+    def transcribe(self, audio, language=None, batch_size=16, **options):
+        return self.model.transcribe(audio, language=language, **options)
+
+
+def _whisper_module():
+    module = types.ModuleType('faster_whisper')
+    module.WhisperModel = WhisperModel
+    module.BatchedInferencePipeline = BatchedInferencePipeline
+    module.decode_audio = decode_audio
+    module.vad = types.ModuleType('faster_whisper.vad')
+    module.vad.VadOptions = VadOptions
+    module.vad.get_speech_timestamps = get_speech_timestamps
+    return module
+
+
+# --- yt-dlp --------------------------------------------------------------------
+
+class FakeYoutubeDL:
+    """Covers the yt-dlp calls the app makes: extract_info, process_ie_result, prepare_filename."""
+    sample_clip = None
+    latency = 0.0
+
+    def __init__(self, params=None):
+        self.params = params or {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    @staticmethod
+    def sanitize_info(info):
+        return info
+
+    def extract_info(self, url, download=False):
+        time.sleep(self.latency)
+        match = re.search(r'v=([A-Za-z0-9_-]{11})', url)
+        youtube_id = match.group(1) if match else 'benchvideo0'
+        info = {
+            'id': youtube_id, 'title': f"Fake Artist - Song {youtube_id} (Official Video)", '_type': 'video',
+            'webpage_url': url, 'ext': 'mp4',
+            'subtitles': {'es': [{'ext': 'srt', 'name': 'Spanish'}], 'en': [{'ext': 'srt', 'name': 'English'}]},
+        }
+        return self.process_ie_result(info, download=True) if download else info
+
+    def _is_audio_only(self):
+        selector = self.params.get('format', '')
+        return 'bestaudio' in selector and 'bestvideo' not in selector
+
+    def prepare_filename(self, info):
+        template = self.params.get('outtmpl', '%(id)s.%(ext)s')
+        return template % {'id': info['id'], 'ext': 'm4a' if self._is_audio_only() else 'mp4'}
+
+    def process_ie_result(self, info, download=True):
+        time.sleep(self.latency)
+        if not download:
+            return info
+        target = self.prepare_filename(info)
+        with open(self.sample_clip, 'rb') as src, open(target, 'wb') as dst:
+            dst.write(src.read())
+        if self.params.get('writesubtitles'):
+            base = os.path.splitext(target)[0]
+            for lang in self.params.get('subtitleslangs', []):
+                with open(f"{base}.{lang}.srt", 'w', encoding='utf-8') as f:
+                    for i, line in enumerate(LYRICS):
+                        f.write(f"{i + 1}\n00:00:{i * 3:02d},000 --> 00:00:{i * 3 + 2:02d},500\n{line}\n\n")
+        return info
+
+
+# --- Gemini ----------------------------------------------------------------------
+
+class FakeGemini:
+    """A google.genai client whose models.generate_content answers every schema the app uses."""
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.models = self
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def generate_content(self, model, contents, config=None):
+        time.sleep(self.latency)
+        with self._lock:
+            self.calls += 1
+        schema = getattr((config or {}).get('response_schema'), '__name__', '')
+        if schema == 'CueBatch':
+            section = contents.split('--- LINES TO PROCESS ---\n', 1)[1].split('\n\n', 1)[0]
+            lines = [json.loads(line) for line in section.splitlines()]
+            payload = {'cues': [{'index': line['index'], 'text': f"[{line['text']}]"} for line in lines]}
+        elif schema == 'SentenceTranslation':
+            sentence = re.search(r'Sentence: "(.*)"', contents, re.S).group(1)
+            words = sentence.split()
+            payload = {'translation': ' '.join(f"en_{w}" for w in words),
+                       'alignments': [{'source': w, 'target': f"en_{w}"} for w in words]}
+        elif schema == 'MusicInfo':
+            payload = {'artist': 'Fake Artist', 'title': 'Fake Song'}
+        else:
+            raise NotImplementedError(f"FakeGemini has no answer for schema {schema!r}")
+        return SimpleNamespace(text=json.dumps(payload, ensure_ascii=False))
+
+
+# --- Genius and Google Translate --------------------------------------------------
+
+class FakeGenius:
+    def __init__(self, latency=0.0):
+        self.latency = latency
+
+    def search_song(self, title, artist):
+        time.sleep(self.latency)
+        return SimpleNamespace(lyrics=f"{title} Lyrics\n" + "\n".join(LYRICS))
+
+
+class FakeGoogleTranslate:
+    """Stands in for translation.http_session, answering like Google Translate's no-JavaScript page."""
+    latency = 0.0
+
+    def get(self, url, params=None, timeout=None):
+        time.sleep(self.latency)
+        body = f'<html><body><div class="result-container">{params["tl"]}_{html.escape(params["q"])}</div></body></html>'
+        return SimpleNamespace(status_code=200, text=body, raise_for_status=lambda: None)
+
+
+class FakeHttpSession:
+    """Answers thumbnail requests with a tiny JPEG-ish body instead of hitting i.ytimg.com."""
+    latency = 0.0
+
+    def get(self, url, timeout=None):
+        time.sleep(self.latency)
+        return SimpleNamespace(status_code=200, content=b'\xff\xd8\xff\xe0fake-thumbnail\xff\xd9')
+
+
+def install(sample_clip):
+    """Routes faster_whisper, yt-dlp, Genius, Google Translate and thumbnail fetches to the fakes.
+
+    Returns a FakeGemini to hand to the app in place of the genai client.
+    """
+    sys.modules['faster_whisper'] = _whisper_module()
+    sys.modules['faster_whisper.vad'] = sys.modules['faster_whisper'].vad
+
+    from src import utils, translation, metadata_cache
+
+    FakeYoutubeDL.sample_clip = sample_clip
+    metadata_cache.set_extractor(FakeYoutubeDL)
+    utils.genius = FakeGenius()
+    utils.http_session = FakeHttpSession()
+    translation.http_session = FakeGoogleTranslate()
+    return FakeGemini()
@@ -0,0 +1,364 @@
+"""Offline benchmark suite.
+
+    python -m benchmarks.run                     # run everything, compare with baselines.json
+    python -m benchmarks.run --only srt index    # run some benchmarks
+    python -m benchmarks.run --save-baseline     # record the current numbers as the baseline
+    python -m benchmarks.run --check             # exit 1 if anything regressed past --tolerance
+
+Everything runs against a throwaway database and folder, with the fakes from
+benchmarks/fakes.py in place of yt-dlp, Gemini, Genius, Google Translate and Whisper,
+so no credentials, network or model download are needed. Metrics ending in "seconds"
+are lower-is-better, metrics ending in "per_second" higher-is-better.
+"""
+import io
+import os
+import re
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import contextlib
+from urllib.parse import unquote
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines.json')
+
+BENCHMARKS = {}
+
+
+def benchmark(name):
+    """Registers func(env) -> {metric: value} as a benchmark."""
+    def decorator(func):
+        BENCHMARKS[name] = func
+        return func
+    return decorator
+
+
+def best_of(func, repeat=5, number=1):
+    """Fastest of `repeat` timings of `number` back-to-back calls, in seconds per call.
+
+    Give sub-millisecond calls a `number` large enough that each timing is well above
+    timer and scheduler noise.
+    """
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(number):
+            func()
+        timings.append((time.perf_counter() - started) / number)
+    return min(timings)
+
+
+def _percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+@benchmark('srt_write')
+def bench_srt_write(env):
+    from src.srt import format_timestamp, write_srt
+
+    segments = [(i * 2.5, i * 2.5 + 2.0, f"line number {i} of the song") for i in range(5000)]
+    path = os.path.join(env['dir'], 'write.srt')
+    return {
+        'format_timestamp_100k_seconds': best_of(lambda: [format_timestamp(i * 0.731) for i in range(100000)]),
+        'write_srt_5k_cues_seconds': best_of(lambda: write_srt(path, segments)),
+    }
+
+
+@benchmark('srt_parse_align')
+def bench_srt_parse_align(env):
+    from src.srt import read_srt, write_srt, align_tracks
+
+    primary = os.path.join(env['dir'], 'parse.es.srt')
+    secondary = os.path.join(env['dir'], 'parse.en.srt')
+    write_srt(primary, [(i * 2.5, i * 2.5 + 2.0, f"línea {i}\nsegunda parte") for i in range(5000)])
+    write_srt(secondary, [(i * 2.5 + 0.3, i * 2.5 + 2.2, f"line {i}") for i in range(5000)])
+    cues1, cues2 = read_srt(primary), read_srt(secondary)
+    return {
+        'read_srt_5k_cues_seconds': best_of(lambda: read_srt(primary)),
+        'align_5k_cues_seconds': best_of(lambda: align_tracks(cues1, cues2)),
+    }
+
+
+@benchmark('index_10k')
+def bench_index(env):
+    import database
+
+    conn = database.get_connection()
+    with conn:
+        conn.execute("DELETE FROM videos")
+        conn.executemany(
+            "INSERT INTO videos (youtube_id, title, filename, added_at) VALUES (?, ?, ?, ?)",
+            [(f"v{i:010d}", f"Artist {i % 300} - Song {i} (Official Video)", f"v{i:010d}.mp4", 1700000000 + i) for i in range(10000)]
+        )
+    conn.close()
+
+    client = env['app'].test_client()
+    # The cursor of page 150, found by following the "Older" links once
+    after = None
+    for _ in range(149):
+        html = client.get('/', query_string={'after': after} if after else {}).get_data(as_text=True)
+        after = unquote(re.search(r'after=([^"&]+)', html).group(1))
+    return {
+        'first_page_seconds': best_of(lambda: client.get('/'), number=20),
+        'deep_page_seconds': best_of(lambda: client.get('/', query_string={'after': after}), number=20),
+        'title_search_seconds': best_of(lambda: client.get('/?search=song 42'), number=20),
+    }
+
+
+@benchmark('get_definition')
+def bench_get_definition(env):
+    from benchmarks.fakes import FakeGoogleTranslate
+    from src import translation_cache
+
+    env['gemini'].latency = 0.05
+    FakeGoogleTranslate.latency = 0.01
+    # 40 distinct lines, several words each, clicked 400 times by 8 concurrent users
+    requests = [{'word': f"palabra{i % 5}", 'sentence': f"frase {i % 40} con palabra{i % 5} y más",
+                 'lang_code': 'es'} for i in range(400)]
+
+    def click(body):
+        client = env['app'].test_client()
+        started = time.perf_counter()
+        response = client.post('/get_definition', json=body)
+        assert response.status_code == 200, response.data
+        return time.perf_counter() - started
+
+    translation_cache._memory.clear()
+    conn = env['database'].get_connection()
+    with conn:
+        conn.execute("DELETE FROM translation_cache")
+    conn.close()
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        latencies = list(pool.map(click, requests))
+    elapsed = time.perf_counter() - started
+    env['gemini'].latency = 0.0
+    FakeGoogleTranslate.latency = 0.0
+    return {
+        'requests_per_second': len(requests) / elapsed,
+        'p50_seconds': _percentile(latencies, 0.5),
+        'p95_seconds': _percentile(latencies, 0.95),
+    }
+
+
+@benchmark('vocabulary')
+def bench_vocabulary(env):
+    client = env['app'].test_client()
+    conn = env['database'].get_connection()
+    with conn:
+        conn.execute("DELETE FROM vocabulary")
+    conn.close()
+
+    started = time.perf_counter()
+    for i in range(2000):
+        client.post('/save_word', json={'word': f"palabra{i}", 'definition': f"word {i}", 'context': f"una frase con palabra{i}"})
+    save_seconds = (time.perf_counter() - started) / 2000
+
+    words = [{'word': f"palabra{i}", 'definition': f"word {i}", 'context': f"una frase con palabra{i}", 'lang': 'es'}
+             for i in range(20000)]
+
+    def bulk_save():
+        with conn:
+            conn.execute("DELETE FROM vocabulary WHERE lang = 'es'")
+        for start in range(0, len(words), 5000):
+            client.post('/api/vocabulary', json={'words': words[start:start + 5000]})
+
+    conn = env['database'].get_connection()
+    bulk_seconds = best_of(bulk_save, repeat=3)
+    conn.close()
+
+    def last_page():
+        after = None
+        for _ in range(50):
+            response = client.get('/api/vocabulary', query_string={'after': after} if after else {}).get_json()
+            after = response['next']
+
+    return {
+        'save_word_seconds': save_seconds,
+        'bulk_save_20k_words_seconds': bulk_seconds,
+        'first_page_22k_words_seconds': best_of(lambda: client.get('/vocabulary'), number=20),
+        'page_through_5k_words_seconds': best_of(last_page),
+        'export_csv_22k_words_seconds': best_of(lambda: client.get('/vocabulary/export.csv').get_data(), repeat=3),
+    }
+
+
+@benchmark('flashcards')
+def bench_flashcards(env):
+    """Due-batch latency should not grow with the deck."""
+    client = env['app'].test_client()
+    conn = env['database'].get_connection()
+    results = {}
+    for deck_size in (1000, 50000):
+        with conn:
+            conn.execute("DELETE FROM vocabulary")
+            conn.executemany(
+                "INSERT INTO vocabulary (word, lang, definition, context, created_at) VALUES (?, ?, ?, ?, ?)",
+                [(f"palabra{i}", 'es' if i % 2 else 'fr', f"word {i}", f"una frase con palabra{i}", 1700000000 + i)
+                 for i in range(deck_size)]
+            )
+        results[f'due_batch_{deck_size // 1000}k_cards_seconds'] = best_of(
+            lambda: client.get('/api/flashcards/due', query_string={'limit': 20, 'lang': 'es'}), repeat=20, number=50)
+    card_id = client.get('/api/flashcards/due').get_json()['cards'][0]['word_id']
+    results['review_seconds'] = best_of(lambda: client.post(f'/api/flashcards/{card_id}/review', json={'grade': 'again'}),
+                                        repeat=20, number=50)
+    with conn:
+        conn.execute("DELETE FROM vocabulary")
+    conn.close()
+    return results
+
+
+@benchmark('ingest_e2e')
+def bench_ingest(env):
+    from src import ingest_pipeline
+
+    video_folder = os.path.join(env['dir'], 'videos')
+    os.makedirs(video_folder, exist_ok=True)
+    params = {'use_genius': True, 'lang_code': None, 'target_langs': ['en', 'fr'], 'precompute_translations': False}
+    runs = iter(range(100))
+
+    def ingest():
+        # A fresh id and an empty translation memory, so every run does the full amount of work
+        conn = env['database'].get_connection()
+        with conn:
+            conn.execute("DELETE FROM translation_memory")
+        conn.close()
+        youtube_id = f"bench{next(runs):06d}"
+        ingest_pipeline.run(f"https://www.youtube.com/watch?v={youtube_id}", params, video_folder, env['gemini'], 'fake-model')
+
+    return {'ingest_20s_clip_seconds': best_of(ingest, repeat=3)}
+
+
+@benchmark('parallel_transcribe')
+def bench_parallel_transcribe(env):
+    """Serial vs chunked process-pool transcription of a long clip.
+
+    The outputs are compared here too, but the regression check for that is
+    tests/test_parallel_transcribe.py.
+    """
+    from benchmarks import fakes
+    from src import utils, parallel_transcribe, transcription_profiles, subtitle_store
+
+    clip = fakes.write_sample_clip(os.path.join(env['dir'], 'long.wav'), seconds=240)
+    profile = transcription_profiles.get_profile('accurate')
+    options = transcription_profiles.transcribe_options(profile, utils.TRANSCRIBE_OPTIONS)
+    fakes.WhisperModel.latency_per_audio_second = 0.002
+    # Forked workers inherit the fake faster_whisper module; spawned ones would look for the real one
+    start_method, parallel_transcribe.START_METHOD = parallel_transcribe.START_METHOD, 'fork'
+    try:
+        started = time.perf_counter()
+        srt_path = utils.transcribe_and_save_srt(clip, parallel=False, youtube_id='benchlong00', profile=profile.name,
+                                                 srt_base=os.path.join(env['dir'], 'long'))
+        serial_seconds = time.perf_counter() - started
+
+        def parallel():
+            return parallel_transcribe.transcribe(clip, options=options, workers=2, youtube_id='benchlong00', profile=profile)
+
+        result = parallel()
+        parallel_seconds = best_of(parallel, repeat=3)
+    finally:
+        fakes.WhisperModel.latency_per_audio_second = 0.0
+        parallel_transcribe.release_idle_pool(max_idle=0)
+        parallel_transcribe.START_METHOD = start_method
+
+    if result is None:
+        raise AssertionError("the parallel path declined the clip")
+
+    def ms(seconds):
+        return round(seconds * 1000)
+
+    with subtitle_store.open_track(srt_path) as track:
+        serial = [(ms(cue.start), ms(cue.end), cue.text, [(ms(w.start), ms(w.end), w.text) for w in track.words(i)])
+                  for i, cue in enumerate(track)]
+    chunked = [(ms(start), ms(end), text, [(ms(ws), ms(we), wt) for ws, we, wt in words]) for start, end, text, words in result[1]]
+    if result[0] != 'es' or chunked != serial:
+        raise AssertionError("parallel transcription differs from the serial path")
+    return {'serial_240s_clip_seconds': serial_seconds, 'parallel_240s_clip_seconds': parallel_seconds}
+
+
+def _setup(workdir):
+    """Points the app at a scratch database and folders, installs the fakes and imports the app."""
+    os.environ['LINGOPY_DB'] = os.path.join(workdir, 'library.db')
+    # Importing the app migrates a library.json and indexes the static videos; keep both to the scratch folder
+    os.environ['LINGOPY_STATIC_FOLDER'] = workdir
+    os.environ['LINGOPY_LIBRARY_JSON'] = os.path.join(workdir, 'library.json')
+    os.environ['AUDIO_CACHE_DIR'] = os.path.join(workdir, 'audio_cache')
+    os.environ['PARALLEL_TRANSCRIPTION'] = '0'
+    os.environ['WHISPER_WARMUP'] = '0'
+    sys.path.insert(0, ROOT)
+
+    from benchmarks import fakes
+
+    sample_clip = fakes.write_sample_clip(os.path.join(workdir, 'sample.wav'))
+    with contextlib.redirect_stdout(io.StringIO()):
+        import database
+        from src import app as app_module
+        gemini = fakes.install(sample_clip)
+    app_module._client = gemini
+    return {'dir': workdir, 'app': app_module.app, 'database': database, 'gemini': gemini}
+
+
+def _compare(name, value, baseline, tolerance):
+    """Returns (change as a fraction, True if it's a regression beyond tolerance)."""
+    if not baseline:
+        return None, False
+    change = (value - baseline) / baseline
+    worse = -change if name.endswith('per_second') else change
+    return change, worse > tolerance
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the offline benchmark suite.")
+    parser.add_argument('--only', nargs='+', choices=sorted(BENCHMARKS), help="benchmarks to run")
+    parser.add_argument('--save-baseline', action='store_true', help="write the results to benchmarks/baselines.json")
+    parser.add_argument('--check', action='store_true', help="exit with status 1 when a metric regressed")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="allowed slowdown before --check fails (0.25 = 25%%)")
+    args = parser.parse_args(argv)
+
+    try:
+        with open(BASELINE_PATH, 'r', encoding='utf-8') as f:
+            baselines = json.load(f)
+    except FileNotFoundError:
+        baselines = {}
+
+    workdir = tempfile.mkdtemp(prefix='lingopy-bench-')
+    try:
+        env = _setup(workdir)
+        results = {}
+        regressions = []
+        print(f"{'benchmark':<42}{'value':>14}{'baseline':>14}{'change':>10}")
+        for name in args.only or BENCHMARKS:
+            with contextlib.redirect_stdout(io.StringIO()):
+                metrics = BENCHMARKS[name](env)
+            for metric, value in metrics.items():
+                key = f"{name}.{metric}"
+                results[key] = value
+                change, regressed = _compare(metric, value, baselines.get(key), args.tolerance)
+                if regressed:
+                    regressions.append(key)
+                baseline = f"{baselines[key]:.6g}" if key in baselines else '-'
+                change_text = f"{change:+.0%}" if change is not None else '-'
+                print(f"{key:<42}{value:>14.6g}{baseline:>14}{change_text:>10}{'  REGRESSED' if regressed else ''}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.save_baseline:
+        baselines.update(results)
+        with open(BASELINE_PATH, 'w', encoding='utf-8') as f:
+            json.dump(dict(sorted(baselines.items())), f, indent=2)
+            f.write('\n')
+        print(f"Saved {len(results)} baselines to {BASELINE_PATH}")
+    if regressions:
+        print(f"⚠️ {len(regressions)} metric(s) regressed by more than {args.tolerance:.0%}: {', '.join(regressions)}")
+        if args.check:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,7 +1,119 @@
+import os
 import sqlite3
+import threading
+
+DB_PATH = os.environ.get('LINGOPY_DB', 'library.db')
+
+# Idle connections kept per thread. Nested get_connection() calls in one thread get
+# separate connections, so an inner close() never ends an outer caller's transaction.
+POOL_SIZE = 2
+
+_local = threading.local()
+
+def _idle_connections():
+    if getattr(_local, 'pid', None) != os.getpid() or _local.path != DB_PATH:
+        # Never reuse a connection inherited across fork(), or one to a database we've moved off
+        _local.idle, _local.pid, _local.path = [], os.getpid(), DB_PATH
+    return _local.idle
+
+class PooledConnection(sqlite3.Connection):
+    """A connection that goes back to its thread's pool on close() instead of closing."""
+
+    def close(self):
+        if self.in_transaction:
+            self.rollback()
+        idle = _idle_connections()
+        if self in idle:
+            return
+        if len(idle) < POOL_SIZE:
+            idle.append(self)
+        else:
+            super().close()
+
+def _open():
+    conn = sqlite3.connect(DB_PATH, timeout=30, factory=PooledConnection)
+    conn.row_factory = sqlite3.Row
+    # WAL lets readers carry on while a writer commits; NORMAL is durable enough under WAL
+    conn.execute('PRAGMA journal_mode = WAL')
+    conn.execute('PRAGMA synchronous = NORMAL')
+    return conn
+
+def get_connection():
+    """Returns a connection to the library database, reusing one this thread closed earlier.
+
+    Callers keep using `with conn:` and conn.close() as with a plain connection.
+    """
+    idle = _idle_connections()
+    return idle.pop() if idle else _open()
+
+def _add_column_if_missing(cursor, table, column, declaration):
+    columns = [row[1] for row in cursor.execute(f"PRAGMA table_info({table})")]
+    if column not in columns:
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {declaration}")
+
+def _create_vocabulary(cursor):
+    """Saved words (see src/vocabulary.py), unique per language and source video.
+
+    Tables from before words had a language were unique on word alone; they are rebuilt
+    once, keeping every saved word with an empty lang and no source video.
+    """
+    columns = [row[1] for row in cursor.execute("PRAGMA table_info(vocabulary)")]
+    if columns and 'lang' not in columns:
+        cursor.execute("ALTER TABLE vocabulary RENAME TO vocabulary_old")
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS vocabulary (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            word TEXT NOT NULL,
+            lang TEXT NOT NULL DEFAULT '',
+            youtube_id TEXT NOT NULL DEFAULT '',
+            timestamp REAL,
+            definition TEXT NOT NULL,
+            context TEXT NOT NULL,
+            created_at REAL NOT NULL DEFAULT 0
+        )
+    ''')
+    if columns and 'lang' not in columns:
+        cursor.execute("INSERT INTO vocabulary (id, word, definition, context) SELECT id, word, definition, context FROM vocabulary_old")
+        cursor.execute("DROP TABLE vocabulary_old")
+    cursor.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_vocabulary_entry ON vocabulary (lang, word, youtube_id)')
+    # Listing pages walk (word, id) in order, with or without a language filter
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_vocabulary_word ON vocabulary (word)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_vocabulary_lang_word ON vocabulary (lang, word)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_vocabulary_source ON vocabulary (youtube_id, timestamp)')
+
+def _create_flashcards(cursor):
+    """SM-2 review state, one card per saved word (see src/flashcards.py).
+
+    Cards are created and removed with their word by triggers; `lang` is copied onto the
+    card so "due cards in one language" is a single range scan of idx_flashcards_lang_due.
+    """
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS flashcards (
+            word_id INTEGER PRIMARY KEY REFERENCES vocabulary (id),
+            lang TEXT NOT NULL DEFAULT '',
+            due REAL NOT NULL,
+            interval_days REAL NOT NULL DEFAULT 0,
+            ease REAL NOT NULL DEFAULT 2.5,
+            repetitions INTEGER NOT NULL DEFAULT 0,
+            lapses INTEGER NOT NULL DEFAULT 0,
+            last_review REAL
+        )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_flashcards_due ON flashcards (due)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_flashcards_lang_due ON flashcards (lang, due)')
+    cursor.executescript('''
+        CREATE TRIGGER IF NOT EXISTS vocabulary_card_insert AFTER INSERT ON vocabulary BEGIN
+            INSERT OR IGNORE INTO flashcards (word_id, lang, due) VALUES (new.id, new.lang, new.created_at);
+        END;
+        CREATE TRIGGER IF NOT EXISTS vocabulary_card_delete AFTER DELETE ON vocabulary BEGIN
+            DELETE FROM flashcards WHERE word_id = old.id;
+        END;
+    ''')
+    # Words saved before flashcards existed
+    cursor.execute("INSERT OR IGNORE INTO flashcards (word_id, lang, due) SELECT id, lang, created_at FROM vocabulary")
 
 def init_db():
-    conn = sqlite3.connect('library.db')
+    conn = get_connection()
     cursor = conn.cursor()
 
     cursor.execute('''
@@ -24,12 +136,147 @@ def init_db():
         )
     ''')
 
+    _add_column_if_missing(cursor, 'videos', 'thumbnail', 'TEXT')
+    _add_column_if_missing(cursor, 'videos', 'added_at', 'REAL NOT NULL DEFAULT 0')
+    # Comma-separated widths of the WebP variants made from the thumbnail (see src/thumbnails.py)
+    _add_column_if_missing(cursor, 'videos', 'thumbnail_widths', 'TEXT')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_videos_added ON videos (added_at DESC, id DESC)')
+    cursor.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_subtitles_video_lang ON subtitles (video_id, lang_code)')
+
+    _create_vocabulary(cursor)
+    _create_flashcards(cursor)
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS jobs (
+            id TEXT PRIMARY KEY,
+            kind TEXT NOT NULL,
+            params TEXT NOT NULL,
+            status TEXT NOT NULL,
+            stage TEXT,
+            progress REAL NOT NULL DEFAULT 0,
+            result TEXT,
+            error TEXT,
+            created_at REAL NOT NULL,
+            updated_at REAL NOT NULL
+        )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, created_at)')
+
+    # Checkpoints of the staged Whisper ingest (see src/ingest_pipeline.py): one row per video
+    # with the parameters it was ingested with, and one row per finished or failed stage.
     cursor.execute('''
-        CREATE TABLE IF NOT EXISTS vocabulary (
+        CREATE TABLE IF NOT EXISTS ingest_runs (
+            youtube_id TEXT PRIMARY KEY,
+            video_url TEXT NOT NULL,
+            params TEXT NOT NULL,
+            updated_at REAL NOT NULL
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS ingest_stages (
+            youtube_id TEXT NOT NULL,
+            stage TEXT NOT NULL,
+            status TEXT NOT NULL,
+            output TEXT,
+            error TEXT,
+            finished_at REAL NOT NULL,
+            PRIMARY KEY (youtube_id, stage)
+        )
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS translation_cache (
+            kind TEXT NOT NULL,
+            source_lang TEXT NOT NULL,
+            sentence TEXT NOT NULL,
+            word TEXT NOT NULL,
+            value TEXT NOT NULL,
+            created_at REAL NOT NULL,
+            last_access REAL NOT NULL,
+            PRIMARY KEY (kind, source_lang, sentence, word)
+        )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_translation_cache_access ON translation_cache (last_access)')
+
+    # Library-wide memory of translated subtitle lines (see src/translation_memory.py).
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS translation_memory (
+            source_lang TEXT NOT NULL,
+            line_key TEXT NOT NULL,
+            target_lang TEXT NOT NULL,
+            source_text TEXT NOT NULL,
+            translation TEXT NOT NULL,
+            created_at REAL NOT NULL,
+            PRIMARY KEY (source_lang, line_key, target_lang)
+        )
+    ''')
+
+    # yt-dlp info dicts keyed by video id (see src/metadata_cache.py), stored zlib-compressed JSON.
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS video_metadata (
+            youtube_id TEXT PRIMARY KEY,
+            info BLOB NOT NULL,
+            fetched_at REAL NOT NULL,
+            last_access REAL NOT NULL
+        )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_video_metadata_access ON video_metadata (last_access)')
+
+    # Full-text search over titles and subtitle cues (see src/search.py). Both FTS
+    # tables are external-content indexes kept in sync by triggers.
+    has_title_search = cursor.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'title_search'"
+    ).fetchone()
+    cursor.execute('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS title_search USING fts5(
+            title, content = 'videos', content_rowid = 'id', tokenize = 'unicode61 remove_diacritics 2'
+        )
+    ''')
+    if not has_title_search:
+        cursor.execute("INSERT INTO title_search (title_search) VALUES ('rebuild')")
+    cursor.executescript('''
+        CREATE TRIGGER IF NOT EXISTS videos_search_insert AFTER INSERT ON videos BEGIN
+            INSERT INTO title_search (rowid, title) VALUES (new.id, new.title);
+        END;
+        CREATE TRIGGER IF NOT EXISTS videos_search_delete AFTER DELETE ON videos BEGIN
+            INSERT INTO title_search (title_search, rowid, title) VALUES ('delete', old.id, old.title);
+        END;
+        CREATE TRIGGER IF NOT EXISTS videos_search_update AFTER UPDATE OF title ON videos BEGIN
+            INSERT INTO title_search (title_search, rowid, title) VALUES ('delete', old.id, old.title);
+            INSERT INTO title_search (rowid, title) VALUES (new.id, new.title);
+        END;
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS cues (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
-            word TEXT NOT NULL UNIQUE,
-            definition TEXT NOT NULL,
-            context TEXT NOT NULL
+            youtube_id TEXT NOT NULL,
+            lang_code TEXT NOT NULL,
+            start REAL NOT NULL,
+            end REAL NOT NULL,
+            text TEXT NOT NULL
+        )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_cues_track ON cues (youtube_id, lang_code)')
+    cursor.execute('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS cue_search USING fts5(
+            text, content = 'cues', content_rowid = 'id', tokenize = 'unicode61 remove_diacritics 2'
+        )
+    ''')
+    cursor.executescript('''
+        CREATE TRIGGER IF NOT EXISTS cues_search_insert AFTER INSERT ON cues BEGIN
+            INSERT INTO cue_search (rowid, text) VALUES (new.id, new.text);
+        END;
+        CREATE TRIGGER IF NOT EXISTS cues_search_delete AFTER DELETE ON cues BEGIN
+            INSERT INTO cue_search (cue_search, rowid, text) VALUES ('delete', old.id, old.text);
+        END;
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS search_tracks (
+            youtube_id TEXT NOT NULL,
+            lang_code TEXT NOT NULL,
+            mtime REAL NOT NULL,
+            PRIMARY KEY (youtube_id, lang_code)
         )
     ''')
 
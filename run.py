@@ -1,4 +1,16 @@
-from src.app import app
+import os
 
 if __name__ == '__main__':
-    app.run(debug=True, host='0.0.0.0', port=80)
\ No newline at end of file
+    # Imported here rather than at the top: parallel transcription workers are spawned processes
+    # that re-import this file, and they must not open the database or rescan the library.
+    from src.app import app
+    from src import whisper_registry, transcription_profiles, jobs
+
+    # With debug=True the reloader re-executes this file in a child process;
+    # only warm up and resume jobs in the process that actually serves requests.
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        if os.environ.get('WHISPER_WARMUP', '1') == '1':
+            transcription_profiles.warm_up()
+            whisper_registry.start_idle_reaper()
+        jobs.resume_pending()
+    app.run(debug=True, host='0.0.0.0', port=80)
@@ -0,0 +1,79 @@
+"""Production entry point: `python serve.py` (run.py stays the debug server).
+
+Uses gunicorn where it's available (Linux/macOS), so media is sent with sendfile(); otherwise
+falls back to waitress, which also runs on Windows.
+
+One process with many threads is the default, because the ingest executor, the loaded
+Whisper models and the /metrics counters all live in the process that owns them. With
+LINGOPY_WORKERS above 1 each worker has its own copies: an ingest runs in whichever
+worker queued it, every worker may load its own models, and a /metrics scrape only sees
+the worker that answers it. Raise it only for media-heavy, ingest-light deployments.
+"""
+import os
+import sys
+
+HOST = os.environ.get('LINGOPY_HOST', '0.0.0.0')
+PORT = int(os.environ.get('LINGOPY_PORT', '80'))
+WORKERS = int(os.environ.get('LINGOPY_WORKERS', '1'))
+THREADS = int(os.environ.get('LINGOPY_THREADS', '16'))
+
+
+def _start_background_work(resume_jobs):
+    from src import whisper_registry, transcription_profiles, jobs
+
+    whisper_registry.start_idle_reaper()
+    # Jobs live in the database, so any worker can report on them; only one should pick up leftovers
+    if resume_jobs:
+        if os.environ.get('WHISPER_WARMUP', '1') == '1':
+            transcription_profiles.warm_up()
+        jobs.resume_pending()
+
+
+def _serve_gunicorn():
+    from gunicorn.app.base import BaseApplication
+
+    class LingopyApplication(BaseApplication):
+        def load_config(self):
+            self.cfg.set('bind', f"{HOST}:{PORT}")
+            self.cfg.set('workers', WORKERS)
+            self.cfg.set('threads', THREADS)
+            self.cfg.set('worker_class', 'gthread')
+            # Whisper passes and LLM calls run in job threads; don't let the arbiter kill a busy worker
+            self.cfg.set('timeout', 0)
+            self.cfg.set('sendfile', True)
+            self.cfg.set('post_worker_init', lambda worker: _start_background_work(worker.age == 1))
+
+        def load(self):
+            from src.app import app
+            return app
+
+    LingopyApplication().run()
+
+
+def _serve_waitress():
+    from waitress import serve
+    from src.app import app
+
+    _start_background_work(True)
+    serve(app, host=HOST, port=PORT, threads=THREADS * WORKERS)
+
+
+def main():
+    try:
+        import gunicorn  # noqa: F401
+    except ImportError:
+        try:
+            import waitress  # noqa: F401
+        except ImportError:
+            print("⚠️ Neither gunicorn nor waitress is installed: pip install gunicorn (or waitress on Windows).")
+            return 1
+        print(f"Serving with waitress on {HOST}:{PORT} ({THREADS * WORKERS} threads)...")
+        _serve_waitress()
+        return 0
+    print(f"Serving with gunicorn on {HOST}:{PORT} ({WORKERS} workers x {THREADS} threads)...")
+    _serve_gunicorn()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,65 +1,131 @@
 import os
-import glob
-import json
-from flask import Flask, render_template, request, url_for, redirect
+import re
+import time
+from flask import Flask, Response, render_template, request, url_for, redirect, jsonify, g, stream_with_context
 from . import utils
-import sqlite3
-from deep_translator import GoogleTranslator
+from . import jobs
+from . import translation
+from . import translation_cache
+from . import translation_index
+from . import library
+from . import search
+from . import subtitle_tracks
+from . import bulk_ingest
+from . import metadata_cache
+from . import ingest_pipeline
+from . import translation_memory
+from . import transcription_profiles
+from . import media
+from . import vocabulary as vocabulary_store
+from . import flashcards
+from . import thumbnails
+from . import metrics
+import database
 from google import genai
 from dotenv import load_dotenv
 
 load_dotenv()
+database.init_db()
 
-client = genai.Client()
+_client = None
 
-app = Flask(__name__)
+
+def get_client():
+    """The Gemini client, created on first use so importing the app needs no credentials."""
+    global _client
+    if _client is None:
+        _client = genai.Client()
+    return _client
+
+
+# The static folder holds js/ and the videos/ library; both paths can be moved, e.g. to keep a scratch run apart
+app = Flask(__name__, static_folder=os.environ.get('LINGOPY_STATIC_FOLDER', 'static'))
+library.migrate_from_json(os.environ.get('LINGOPY_LIBRARY_JSON', 'library.json'), app.static_folder)
+search.backfill(os.path.join(app.static_folder, 'videos'))
 
 gemini_model = 'gemini-1.5-flash'
 
+metrics.collected('lingopy_job_queue_depth', 'Jobs queued or running.', jobs.queue_depth)
+metrics.collected('lingopy_translation_cache_lookups_total', 'Translation cache lookups by result.',
+                  lambda: {(result,): translation_cache.stats()[result] for result in ('memory_hits', 'db_hits', 'misses', 'coalesced')},
+                  ('result',), kind='counter')
+metrics.collected('lingopy_metadata_cache_lookups_total', 'yt-dlp metadata cache lookups by result.',
+                  lambda: {(result,): count for result, count in metadata_cache.stats().items()}, ('result',), kind='counter')
+
+
+@app.before_request
+def start_timer():
+    g.request_started = time.perf_counter()
+
+
+@app.after_request
+def record_request(response):
+    started = g.pop('request_started', None)
+    if started is not None:
+        # Label by route pattern, not path, so /player/<youtube_id> stays one series
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        labels = {'route': route, 'method': request.method, 'status': response.status_code}
+        metrics.HTTP_REQUEST_SECONDS.observe(time.perf_counter() - started, **labels)
+        metrics.HTTP_REQUESTS.inc(**labels)
+    return response
+
+
+@app.route('/metrics')
+def prometheus_metrics():
+    return metrics.render(), 200, {'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
+
 
 @app.route('/')
 def index():
     search_query = request.args.get('search', '').lower()
-    library_path = 'library.json'
+    after = request.args.get('after') or None
     try:
-        with open(library_path, 'r', encoding='utf-8') as f:
-            library_data = json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError):
-        library_data = {}
+        videos, next_cursor = library.list_videos(search_query, after)
+    except ValueError:
+        return redirect(url_for('index', search=search_query or None))
 
-    video_folder = os.path.join(app.static_folder, 'videos')
-    thumbnail_folder = os.path.join(app.static_folder, 'thumbnails')
     videos_data = []
-    
-    try:
-        video_files = [f for f in os.listdir(video_folder) if f.endswith('.mp4')]
-    except FileNotFoundError:
-        video_files = []
-
-    for filename in video_files:
-        youtube_id = os.path.splitext(filename)[0]
-        title = library_data.get(youtube_id, youtube_id)
-
-        if search_query and search_query not in title.lower():
-            continue
-
-        thumbnail_filename = youtube_id + ".jpg"
-        thumbnail_path = os.path.join(thumbnail_folder, thumbnail_filename)
-        
-        if os.path.exists(thumbnail_path):
-            thumbnail_url = url_for('static', filename=f'thumbnails/{thumbnail_filename}')
+    for video in videos:
+        youtube_id = video['youtube_id']
+        widths = library.thumbnail_widths(video)
+        thumbnail_srcset = None
+        if video['thumbnail'] and widths:
+            variants = [(width, media_url(thumbnails.variant_path(video['thumbnail'], width))) for width in widths]
+            # Browsers without srcset support get the variant closest to a card's width
+            thumbnail_url = next((url for width, url in variants if width >= 340), variants[-1][1])
+            thumbnail_srcset = ', '.join(f"{url} {width}w" for width, url in variants)
+        elif video['thumbnail']:
+            thumbnail_url = media_url(video['thumbnail'])
         else:
-            thumbnail_url = f"https://i.ytimg.com/vi/{youtube_id}/hqdefault.jpg"
+            thumbnail_url = f"https://i.ytimg.com/vi/{youtube_id}/mqdefault.jpg"
 
         video_info = {
             'youtube_id': youtube_id,
             'player_url': url_for('player', youtube_id=youtube_id),
             'thumbnail_url': thumbnail_url,
-            'title': title
+            'thumbnail_srcset': thumbnail_srcset,
+            'title': video['title']
         }
         videos_data.append(video_info)
 
-    return render_template('index.html', videos=videos_data, search_query=search_query)
+    lyric_matches = []
+    if search_query and not after:
+        for cue in search.search(search_query)['cues']:
+            cue['player_url'] = url_for('player', youtube_id=cue['youtube_id'], t=f"{cue['start']:.2f}")
+            cue['timestamp'] = utils.format_timestamp(cue['start']).split(',')[0]
+            lyric_matches.append(cue)
+
+    return render_template('index.html', videos=videos_data, search_query=search_query, after=after, next_cursor=next_cursor,
+                           lyric_matches=lyric_matches)
+
+
+@app.route('/api/search')
+def search_library():
+    query = request.args.get('q', '')
+    results = search.search(query, limit=min(request.args.get('limit', search.RESULT_LIMIT, type=int), 200))
+    for cue in results['cues']:
+        cue['player_url'] = url_for('player', youtube_id=cue['youtube_id'], t=f"{cue['start']:.2f}")
+    return jsonify(results)
 
 
 @app.route('/add', methods=['GET', 'POST'])
@@ -73,7 +139,9 @@ def add_video():
         
         try:
             video_info = utils.get_subtitle_options(clean_url)
-            return render_template('confirm.html', video=video_info, video_url=clean_url)
+            return render_template('confirm.html', video=video_info, video_url=clean_url,
+                                   profiles=transcription_profiles.PROFILES.values(),
+                                   default_profile=transcription_profiles.get_profile().name)
         except Exception as e:
             print(f"Error fetching subtitle options: {e}")
             return "Could not fetch video data...", 500
@@ -81,94 +149,256 @@ def add_video():
     return render_template('add.html')
 
 
+@jobs.register('download')
+def run_download_job(params, progress):
+    """Runs a /download request on the ingest worker pool."""
+    video_save_path = os.path.join(app.static_folder, 'videos')
+    if params.get('generate_with_whisper'):
+        ingest_params = {name: params.get(name) for name in ('use_genius', 'lang_code', 'target_langs', 'precompute_translations', 'profile')}
+        video_title = ingest_pipeline.run(params['video_url'], ingest_params, video_save_path, get_client(), gemini_model, progress=progress)
+    else:
+        video_title = utils.download_video_and_subs(
+            params['video_url'], params['lang_codes'], video_save_path, progress=progress,
+            client=get_client(), model_name=gemini_model, precompute=params.get('precompute_translations', False)
+        )
+    return {'title': video_title}
+
+
+def _lang_list(value):
+    """Splits 'en, fr de' into ['en', 'fr', 'de']."""
+    return [code for code in re.split(r'[\s,]+', value or '') if code]
+
+
 @app.route('/download', methods=['POST'])
 def download_video():
     # Get all the data from the form on the confirmation page
     video_url = request.form.get('video_url')
     generate_with_whisper = request.form.get('generate_with_whisper')
-    video_save_path = os.path.join(app.static_folder, 'videos')
+    if not video_url:
+        return "URL is missing.", 400
+
+    params = {
+        'video_url': video_url,
+        'generate_with_whisper': bool(generate_with_whisper),
+        'precompute_translations': request.form.get('precompute_translations') == 'true',
+    }
+    if generate_with_whisper:
+        # If generating, get the extra Whisper-related options
+        whisper_lang = request.form.get('whisper_lang_code')
+        params['lang_code'] = whisper_lang if whisper_lang else None
+        params['target_langs'] = _lang_list(request.form.get('translate_to_lang')) or ['en']
+        params['use_genius'] = request.form.get('use_genius') == 'true'
+        profile = request.form.get('transcription_profile')
+        params['profile'] = profile if profile in transcription_profiles.PROFILES else None
+    else:
+        # Otherwise, just download the official subtitles
+        lang_codes = request.form.getlist('lang_codes')
+        if not lang_codes:
+            return "You must select at least one subtitle language.", 400
+        params['lang_codes'] = lang_codes
 
     try:
-        if generate_with_whisper:
-            # If generating, get the extra Whisper-related options
-            whisper_lang = request.form.get('whisper_lang_code')
-            target_lang = request.form.get('translate_to_lang', 'en')
-            use_genius = request.form.get('use_genius') == 'true'
-            lang_code_or_none = whisper_lang if whisper_lang else None
-            
-            # Call the full-featured transcription function
-            video_title = utils.download_and_transcribe(
-                video_url, video_save_path, use_genius, client, gemini_model,
-                lang_code=lang_code_or_none, target_lang=target_lang
-            )
-        else:
-            # Otherwise, just download the official subtitles
-            lang_codes = request.form.getlist('lang_codes')
-            if not lang_codes:
-                return "You must select at least one subtitle language.", 400
-            video_title = utils.download_video_and_subs(video_url, lang_codes, video_save_path)
-        
-        return render_template('downloading.html', video_title=video_title)
-        
+        job_id = jobs.enqueue('download', params)
     except Exception as e:
-        print(f"An error occurred during download: {e}")
-        return "An error occurred during the download process.", 500
+        print(f"Could not queue download: {e}")
+        return "Could not start the download process.", 500
+
+    return render_template('downloading.html', video_title=request.form.get('video_title', video_url), job_id=job_id)
+
+
+@jobs.register('resume_ingest')
+def run_resume_ingest_job(params, progress):
+    """Re-runs the failed or stale stages of a Whisper ingest, optionally re-translating."""
+    video_save_path = os.path.join(app.static_folder, 'videos')
+    video_title = ingest_pipeline.resume(params['youtube_id'], video_save_path, get_client(), gemini_model, progress=progress,
+                                         add_langs=params.get('target_langs'))
+    return {'title': video_title}
+
+
+@app.route('/api/ingest/<youtube_id>')
+def ingest_state(youtube_id):
+    state = ingest_pipeline.get_state(youtube_id)
+    if state is None:
+        return {"error": "No ingest recorded for this video"}, 404
+    return jsonify(state)
+
+
+@app.route('/api/ingest/<youtube_id>/resume', methods=['POST'])
+def resume_ingest(youtube_id):
+    """Queues a retry of the failed or stale stages. Optional field target_lang ('fr' or 'fr, de') adds translations."""
+    if ingest_pipeline.get_state(youtube_id) is None:
+        return {"error": "No ingest recorded for this video"}, 404
+    data = request.get_json(silent=True) or request.form
+    params = {'youtube_id': youtube_id}
+    if data.get('target_lang'):
+        params['target_langs'] = _lang_list(data.get('target_lang'))
+    job_id = jobs.enqueue('resume_ingest', params)
+    return {"job_id": job_id, "status_url": url_for('job_status', job_id=job_id)}, 202
+
+
+@app.route('/api/ingest/<youtube_id>/retranslate', methods=['POST'])
+def retranslate(youtube_id):
+    """Queues a translation of the existing corrected SRT into target_lang (one code or a comma-separated list)."""
+    data = request.get_json(silent=True) or request.form
+    if not data.get('target_lang'):
+        return {"error": "target_lang is missing"}, 400
+    return resume_ingest(youtube_id)
+
+
+@jobs.register('bulk_ingest')
+def run_bulk_ingest_job(params, progress):
+    """Downloads every video behind a list of playlist/video URLs with official subtitles."""
+    video_save_path = os.path.join(app.static_folder, 'videos')
+
+    def download(url):
+        return utils.download_video_and_subs(url, params['lang_codes'], video_save_path, client=get_client(), model_name=gemini_model,
+                                             precompute=params.get('precompute_translations', False))
+
+    return bulk_ingest.ingest(params['urls'], download, concurrency=params.get('concurrency'), progress=progress)
+
+
+@app.route('/api/bulk_ingest', methods=['POST'])
+def queue_bulk_ingest():
+    """Queues a bulk ingest. Takes JSON {urls, lang_codes, concurrency?, precompute_translations?}; poll /jobs/<job_id>."""
+    data = request.get_json(silent=True) or {}
+    urls = data.get('urls') or []
+    if isinstance(urls, str):
+        urls = urls.split()
+    if not isinstance(urls, list) or not all(isinstance(url, str) for url in urls):
+        return {"error": "urls must be a list of strings"}, 400
+    urls = [url.strip() for url in urls if url.strip()]
+    lang_codes = data.get('lang_codes') or ['en']
+    if isinstance(lang_codes, str):
+        lang_codes = _lang_list(lang_codes)
+    if not isinstance(lang_codes, list) or not all(isinstance(code, str) and code.strip() for code in lang_codes):
+        return {"error": "lang_codes must be a list of language codes"}, 400
+    if not urls:
+        return {"error": "No URLs given"}, 400
+    try:
+        concurrency = int(data.get('concurrency') or bulk_ingest.CONCURRENCY)
+    except (TypeError, ValueError):
+        return {"error": "concurrency must be a number"}, 400
+
+    params = {
+        'urls': urls,
+        'lang_codes': [code.strip() for code in lang_codes],
+        'concurrency': max(1, min(concurrency, 16)),
+        'precompute_translations': bool(data.get('precompute_translations')),
+    }
+    job_id = jobs.enqueue('bulk_ingest', params)
+    return {"job_id": job_id, "status_url": url_for('job_status', job_id=job_id)}, 202
+
+
+@jobs.register('thumbnail_backfill')
+def run_thumbnail_backfill_job(params, progress):
+    """Makes local thumbnails and WebP variants for library videos that don't have them yet."""
+    return thumbnails.backfill(os.path.join(app.static_folder, 'videos'), force=params.get('force', False), progress=progress)
+
+
+@app.route('/api/thumbnails/backfill', methods=['POST'])
+def queue_thumbnail_backfill():
+    """Queues a thumbnail backfill over the whole library. Optional JSON {force: true} redoes every video."""
+    data = request.get_json(silent=True) or {}
+    job_id = jobs.enqueue('thumbnail_backfill', {'force': bool(data.get('force'))})
+    return {"job_id": job_id, "status_url": url_for('job_status', job_id=job_id)}, 202
+
+
+@app.route('/jobs')
+def list_jobs():
+    return jsonify(jobs.list_jobs(limit=request.args.get('limit', 20, type=int)))
+
+
+@app.route('/jobs/<job_id>')
+def job_status(job_id):
+    job = jobs.get_job(job_id)
+    if job is None:
+        return {"error": "Job not found"}, 404
+    return jsonify(job)
+
+
+def media_url(filename):
+    """URL of a library file (path relative to the static folder), versioned so browsers can cache it for good."""
+    if not filename.startswith('videos/'):
+        return url_for('static', filename=filename)
+    filename = filename[len('videos/'):]
+    return url_for('media_file', filename=filename, v=media.version(os.path.join(app.static_folder, 'videos'), filename))
+
+
+@app.route('/media/<path:filename>')
+def media_file(filename):
+    """Library videos, subtitles and thumbnails, with byte ranges and conditional requests."""
+    return media.send(os.path.join(app.static_folder, 'videos'), filename, request)
 
 
 @app.route('/player/<youtube_id>')
 def player(youtube_id):
-    library_path = 'library.json'
-    try:
-        with open(library_path, 'r', encoding='utf-8') as f:
-            library_data = json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError):
-        library_data = {}
-    video_title = library_data.get(youtube_id, youtube_id)
+    video = library.get_video(youtube_id)
+    video_title = video['title'] if video else youtube_id
+    video_filename = video['filename'] if video else f'{youtube_id}.mp4'
+    video_url = media_url(f'videos/{video_filename}')
 
-    video_folder = os.path.join(app.static_folder, 'videos')
-    video_url = url_for('static', filename=f'videos/{youtube_id}.mp4')
-    subtitle_pattern = os.path.join(video_folder, f'{youtube_id}.*.srt')
-    subtitle_files = glob.glob(subtitle_pattern)
-    
     subtitle_data = []
-    for srt_path in subtitle_files:
-        filename = os.path.basename(srt_path)
-        lang_code = filename.split('.')[-2]
+    for sub in library.list_subtitles(youtube_id):
         subtitle_data.append({
-            'lang_code': lang_code.upper(),
-            'url': url_for('static', filename=f'videos/{filename}')
+            'lang_code': sub['lang_name'],
+            'value': sub['lang_code'],
+            'url': media_url(f"videos/{sub['filename']}")
         })
 
-    preselect_lang1_url = None
-    preselect_lang2_url = None
+    preselect_lang1 = None
+    preselect_lang2 = None
     
-    # Find the English subtitle URL, if it exists
+    # Find the English subtitle, if it exists
     en_sub = next((sub for sub in subtitle_data if sub['lang_code'] == 'EN'), None)
     if en_sub:
-        preselect_lang2_url = en_sub['url']
+        preselect_lang2 = en_sub['value']
 
     # If there are only two languages and one is English, pre-select the other one
     if len(subtitle_data) == 2 and en_sub:
         other_sub = next((sub for sub in subtitle_data if sub['lang_code'] != 'EN'), None)
         if other_sub:
-            preselect_lang1_url = other_sub['url']
+            preselect_lang1 = other_sub['value']
 
     return render_template(
         'player.html',
+        youtube_id=youtube_id,
         video_title=video_title,
         video_url=video_url,
         subtitles=subtitle_data,
-        # Pass the pre-selection URLs to the template
-        preselect_lang1=preselect_lang1_url,
-        preselect_lang2=preselect_lang2_url
+        # Pass the pre-selected language codes to the template
+        preselect_lang1=preselect_lang1,
+        preselect_lang2=preselect_lang2
     )
 
+
+@app.route('/api/subtitles/<youtube_id>')
+def aligned_subtitles(youtube_id):
+    """Returns two subtitle tracks parsed and aligned cue by cue, for the player."""
+    lang1 = request.args.get('lang1') or None
+    lang2 = request.args.get('lang2') or None
+    for lang in (lang1, lang2):
+        if lang and not re.fullmatch(r'[A-Za-z0-9_-]+', lang):
+            return {"error": "Invalid language code"}, 400
+
+    video_folder = os.path.join(app.static_folder, 'videos')
+    result = subtitle_tracks.get_aligned(video_folder, youtube_id, lang1, lang2)
+    if result is None:
+        return {"error": "Subtitle track not found"}, 404
+
+    etag, payload = result
+    response = jsonify(payload)
+    response.set_etag(etag)
+    # Always revalidate; an unchanged track then costs a single 304
+    response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
+
 @app.route('/delete', methods=['POST'])
 def delete_video():
     youtube_id = request.form.get('youtube_id')
     if youtube_id:
         video_save_path = os.path.join(app.static_folder, 'videos')
         utils.delete_video_files(youtube_id, video_save_path)
+        ingest_pipeline.forget(youtube_id)
     return redirect(url_for('index'))
 
 @app.route('/save_word', methods=['POST'])
@@ -182,54 +412,126 @@ def save_word():
         return {"status": "error", "message": "Missing data"}, 400
 
     try:
-        conn = sqlite3.connect('library.db')
-        cursor = conn.cursor()
-        cursor.execute(
-            "INSERT OR IGNORE INTO vocabulary (word, definition, context) VALUES (?, ?, ?)",
-            (word, definition, context)
-        )
-        conn.commit()
-        conn.close()
+        vocabulary_store.save_word(word, definition, context, lang=data.get('lang_code'),
+                                   youtube_id=data.get('youtube_id'), timestamp=data.get('timestamp'))
         return {"status": "success", "message": "Word saved!"}
+    except ValueError as e:
+        return {"status": "error", "message": str(e)}, 400
     except Exception as e:
         print(f"Database error: {e}")
         return {"status": "error", "message": "Could not save word"}, 500
 
 
+@app.route('/api/vocabulary', methods=['GET', 'POST'])
+def vocabulary_api():
+    """GET: one page of saved words (?lang=, ?after=<cursor>, ?limit=). POST: save {"words": [...]} at once."""
+    if request.method == 'POST':
+        words = (request.get_json(silent=True) or {}).get('words')
+        if not isinstance(words, list) or not words:
+            return {"error": "Expected a non-empty 'words' list"}, 400
+        try:
+            saved = vocabulary_store.save_words(words)
+        except (ValueError, TypeError, AttributeError) as e:
+            return {"error": str(e)}, 400
+        return {"saved": saved, "ignored": len(words) - saved}
+
+    limit = min(request.args.get('limit', vocabulary_store.PAGE_SIZE, type=int), 1000)
+    try:
+        words, next_cursor = vocabulary_store.list_words(request.args.get('lang') or None, request.args.get('after') or None, max(1, limit))
+    except ValueError as e:
+        return {"error": str(e)}, 400
+    return jsonify({"words": words, "next": next_cursor})
+
+
+@app.route('/api/vocabulary/delete', methods=['POST'])
+def vocabulary_bulk_delete():
+    ids = (request.get_json(silent=True) or {}).get('ids')
+    if not isinstance(ids, list) or not ids:
+        return {"error": "Expected a non-empty 'ids' list"}, 400
+    try:
+        deleted = vocabulary_store.delete_words(ids)
+    except (ValueError, TypeError) as e:
+        return {"error": str(e)}, 400
+    return {"deleted": deleted}
+
+
+@app.route('/vocabulary/export.<fmt>')
+def vocabulary_export(fmt):
+    """Streams the whole vocabulary as CSV, or as a tab-separated file Anki can import (.txt)."""
+    lang = request.args.get('lang') or None
+    if fmt == 'csv':
+        chunks, mimetype = vocabulary_store.export_csv(lang), 'text/csv'
+    elif fmt == 'txt':
+        chunks, mimetype = vocabulary_store.export_anki(lang), 'text/plain'
+    else:
+        return "Unknown export format.", 404
+    filename = f"lingopy-vocabulary{'-' + lang if lang else ''}.{fmt}"
+    return Response(stream_with_context(chunks), mimetype=f"{mimetype}; charset=utf-8",
+                    headers={'Content-Disposition': f'attachment; filename="{filename}"'})
+
+
 @app.route('/vocabulary')
 def vocabulary():
-    words = []
+    lang = request.args.get('lang') or None
+    words, next_cursor, total = [], None, 0
     try:
-        conn = sqlite3.connect('library.db')
-        cursor = conn.cursor()
-        cursor.execute("SELECT word, definition, context FROM vocabulary ORDER BY word ASC")
-        
-        for row in cursor.fetchall():
-            words.append({'word': row[0], 'definition': row[1], 'context': row[2]})
-        
-        conn.close()
+        words, next_cursor = vocabulary_store.list_words(lang, request.args.get('after') or None)
+        total = vocabulary_store.count_words(lang)
+    except ValueError:
+        return redirect(url_for('vocabulary', lang=lang))
     except Exception as e:
         print(f"Database error when fetching vocabulary: {e}")
 
-    return render_template('vocabulary.html', words=words)
+    return render_template('vocabulary.html', words=words, next_cursor=next_cursor, total=total, lang=lang,
+                           langs=vocabulary_store.list_langs())
 
 @app.route('/delete_word', methods=['POST'])
 def delete_word():
+    word_id = request.form.get('id', type=int)
     word_to_delete = request.form.get('word')
-    if word_to_delete:
-        try:
-            conn = sqlite3.connect('library.db')
-            cursor = conn.cursor()
-            cursor.execute("DELETE FROM vocabulary WHERE word = ?", (word_to_delete,))
-            conn.commit()
-            conn.close()
-        except Exception as e:
-            print(f"Database error while deleting word: {e}")
-            
-    # Redirect back to the vocabulary page to see the updated list
-    return redirect(url_for('vocabulary'))
+    try:
+        if word_id is not None:
+            vocabulary_store.delete_words([word_id])
+        elif word_to_delete:
+            vocabulary_store.delete_word(word_to_delete)
+    except Exception as e:
+        print(f"Database error while deleting word: {e}")
+
+    # Back to the page the word was deleted from
+    return redirect(url_for('vocabulary', lang=request.form.get('lang') or None, after=request.form.get('after') or None))
+
+
+
+@app.route('/flashcards')
+def flashcards_review():
+    lang = request.args.get('lang') or None
+    return render_template('flashcards.html', lang=lang, langs=vocabulary_store.list_langs(), due=flashcards.due_count(lang))
 
 
+@app.route('/api/flashcards/due')
+def flashcards_due():
+    """The next batch of due cards. ?exclude=1,2,3 skips cards the page has already queued."""
+    limit = max(1, min(request.args.get('limit', flashcards.BATCH_SIZE, type=int), flashcards.MAX_BATCH))
+    try:
+        exclude = [int(word_id) for word_id in request.args.get('exclude', '').split(',') if word_id]
+    except ValueError:
+        return {"error": "exclude must be a comma-separated list of ids"}, 400
+    cards = flashcards.due_cards(limit, lang=request.args.get('lang') or None, exclude=exclude)
+    for card in cards:
+        card['clip_url'] = url_for('player', youtube_id=card['youtube_id'], t=card['timestamp']) if card['youtube_id'] else None
+    return jsonify({"cards": cards})
+
+
+@app.route('/api/flashcards/<int:word_id>/review', methods=['POST'])
+def flashcards_review_card(word_id):
+    grade = (request.get_json(silent=True) or {}).get('grade')
+    if grade not in flashcards.GRADES:
+        return {"error": f"grade must be one of {', '.join(flashcards.GRADES)}"}, 400
+    card = flashcards.review(word_id, flashcards.GRADES[grade])
+    if card is None:
+        return {"error": "Card not found"}, 404
+    return card
+
 
 @app.route('/get_definition', methods=['POST'])
 def get_definition():
@@ -237,6 +539,7 @@ def get_definition():
     clicked_word = data.get('word')
     full_sentence = data.get('sentence')
     lang_code = data.get('lang_code', 'en').lower().strip()
+    youtube_id = data.get('youtube_id')
 
     if not clicked_word or not full_sentence:
         return {"error": "Missing data"}, 400
@@ -247,31 +550,32 @@ def get_definition():
             "word_translation": clicked_word
         }
 
-    try:
-        prompt = (
-            f"Translate the following sentence from the language with code '{lang_code}' to English. "
-            f"In the translated English sentence, find the word or short phrase that most closely corresponds to the word '{clicked_word}' "
-            "and wrap it in <mark> tags. Only return the final, translated sentence and nothing else."
-            f"\n\nSentence: \"{full_sentence}\""
-        )
-        
-        response = client.models.generate_content(
-            model=gemini_model,
-            contents=prompt,
-            config={
-                "temperature": 0.0
-            }
-        )
-        highlighted_sentence = response.text
+    sentence_translation, word_translation = None, None
+    if youtube_id:
+        video_folder = os.path.join(app.static_folder, 'videos')
+        try:
+            sentence_translation, word_translation = translation_index.lookup(
+                video_folder, youtube_id, lang_code, full_sentence, clicked_word
+            )
+        except Exception as e:
+            print(f"Translation index lookup failed: {e}")
 
+    sentence_translation, word_translation = translation.define(
+        full_sentence.strip(), clicked_word, lang_code, get_client(), gemini_model,
+        sentence_translation=sentence_translation, word_translation=word_translation,
+        wait_for_sentence=bool(data.get('wait_for_sentence'))
+    )
+    if sentence_translation is None and word_translation is None:
+        return {"error": "Could not process translation"}, 504
 
-        
-        word_translation = GoogleTranslator(source=lang_code, target='en').translate(clicked_word)
-        
-        return {
-            "sentence_translation": highlighted_sentence,
-            "word_translation": word_translation
-        }
-    except Exception as e:
-        print(f"LLM or Translation Error: {e}")
-        return {"error": "Could not process translation"}, 500
\ No newline at end of file
+    # A late sentence is reported as pending; the player asks again with wait_for_sentence.
+    return {
+        "sentence_translation": translation.highlight(sentence_translation, clicked_word, word_translation) if sentence_translation else None,
+        "sentence_pending": sentence_translation is None,
+        "word_translation": word_translation
+    }
+
+
+@app.route('/cache_stats')
+def cache_stats():
+    return jsonify({**translation_cache.stats(), 'metadata': metadata_cache.stats(), 'translation_memory': translation_memory.stats()})
@@ -0,0 +1,68 @@
+import os
+import tempfile
+import threading
+
+SAMPLE_RATE = 16000
+AUDIO_CACHE_DIR = os.environ.get("AUDIO_CACHE_DIR", "audio_cache")
+
+_decode_locks = {}
+_decode_locks_lock = threading.Lock()
+
+
+def pcm_path(youtube_id):
+    """Path of the cached 16 kHz mono float32 PCM for a video."""
+    return os.path.join(AUDIO_CACHE_DIR, f"{youtube_id}.f32")
+
+
+def _lock_for(youtube_id):
+    with _decode_locks_lock:
+        return _decode_locks.setdefault(youtube_id, threading.Lock())
+
+
+def load(youtube_id):
+    """Memory-maps the cached PCM for a video, or returns None if it hasn't been decoded yet."""
+    import numpy as np
+
+    path = pcm_path(youtube_id)
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return None
+    return np.memmap(path, dtype=np.float32, mode='r')
+
+
+def get_audio(youtube_id, media_path):
+    """Returns the video's audio as a read-only memmap, decoding media_path once if needed."""
+    audio = load(youtube_id)
+    if audio is not None:
+        return audio
+
+    with _lock_for(youtube_id):
+        audio = load(youtube_id)
+        if audio is not None:
+            return audio
+
+        from faster_whisper import decode_audio
+
+        print(f"Decoding audio of '{os.path.basename(media_path)}' to the PCM cache...")
+        os.makedirs(AUDIO_CACHE_DIR, exist_ok=True)
+        path = pcm_path(youtube_id)
+        # A temp file of its own: the lock only covers this process, and another one (a second
+        # server worker, or the ingest queue's) may be decoding the same video
+        fd, tmp_path = tempfile.mkstemp(dir=AUDIO_CACHE_DIR, prefix=f"{youtube_id}.", suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                # Same decoder and resampler Whisper uses on a file path, so results don't change
+                decode_audio(media_path, sampling_rate=SAMPLE_RATE).tofile(f)
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+    return load(youtube_id)
+
+
+def remove(youtube_id):
+    try:
+        os.remove(pcm_path(youtube_id))
+        return True
+    except FileNotFoundError:
+        return False
@@ -0,0 +1,131 @@
+import os
+import sys
+import json
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import database
+from . import library
+from . import metadata_cache
+from . import utils
+
+CONCURRENCY = int(os.environ.get("BULK_INGEST_CONCURRENCY", "4"))
+
+
+def read_url_file(path):
+    """Reads one URL per line, skipping blank lines and '#' comments."""
+    with open(path, 'r', encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip() and not line.strip().startswith('#')]
+
+
+def expand(sources):
+    """Expands playlist/channel URLs into single videos without fetching each video's page.
+
+    Returns (items, failures): items is [{'url': ..., 'youtube_id': ...}, ...] in source order
+    with duplicates removed; failures holds a report entry for every source that couldn't be
+    read (private, removed, or not a video URL at all), so one bad line doesn't sink the batch.
+    """
+    items = []
+    failures = []
+    seen = set()
+    with metadata_cache.youtube_dl({'quiet': True, 'extract_flat': 'in_playlist'}) as ydl:
+        for source in sources:
+            try:
+                info = ydl.extract_info(source, download=False)
+            except Exception as e:
+                print(f"⚠️ Bulk ingest could not read {source}: {e}")
+                failures.append({'url': source, 'youtube_id': None, 'status': 'failed', 'error': str(e)})
+                continue
+            entries = info.get('entries') if info.get('_type') == 'playlist' else [info]
+            for entry in entries or []:
+                youtube_id = entry and entry.get('id')
+                if not youtube_id or youtube_id in seen:
+                    continue
+                seen.add(youtube_id)
+                url = entry.get('webpage_url') or f"https://www.youtube.com/watch?v={youtube_id}"
+                items.append({'url': url, 'youtube_id': youtube_id})
+    return items, failures
+
+
+def _ingest_one(item, download):
+    started = time.time()
+    result = {'url': item['url'], 'youtube_id': item['youtube_id']}
+    try:
+        result['title'] = download(item['url'])
+        result['status'] = 'done'
+    except Exception as e:
+        print(f"⚠️ Bulk ingest of {item['url']} failed: {e}")
+        result['status'] = 'failed'
+        result['error'] = str(e)
+    result['seconds'] = round(time.time() - started, 1)
+    return result
+
+
+def ingest(sources, download, concurrency=None, report_path=None, progress=None):
+    """Ingests every video behind the given URLs, at most `concurrency` at a time.
+
+    `download(url)` downloads one video and returns its title. Videos already in the library
+    are skipped. Returns a report with one entry per video (status done/skipped/failed) and a
+    failed entry per source URL that couldn't be expanded, also written to report_path as JSON.
+    """
+    if progress:
+        progress('expanding')
+    items, failures = expand(sources)
+    report = {'started_at': time.time(), 'sources': list(sources), 'items': []}
+    pending = []
+    for item in items:
+        if library.get_video(item['youtube_id']):
+            report['items'].append({**item, 'status': 'skipped', 'reason': 'already in library'})
+        else:
+            pending.append(item)
+    print(f"Bulk ingest: {len(items)} videos found, {len(pending)} to download.")
+
+    finished = 0
+    with ThreadPoolExecutor(max_workers=max(1, concurrency or CONCURRENCY), thread_name_prefix='bulk-ingest') as pool:
+        futures = [pool.submit(_ingest_one, item, download) for item in pending]
+        for future in as_completed(futures):
+            report['items'].append(future.result())
+            finished += 1
+            if progress:
+                progress('downloading', 100.0 * finished / len(pending))
+
+    order = {item['youtube_id']: index for index, item in enumerate(items)}
+    report['items'].sort(key=lambda entry: order[entry['youtube_id']])
+    report['items'] += failures
+    report['finished_at'] = time.time()
+    report['counts'] = {status: sum(1 for entry in report['items'] if entry['status'] == status)
+                        for status in ('done', 'skipped', 'failed')}
+
+    if report_path:
+        with open(report_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"Bulk ingest finished: {report['counts']}")
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Download many videos (playlists or URL lists) into the library.")
+    parser.add_argument('urls', nargs='*', help="video or playlist URLs")
+    parser.add_argument('--file', help="text file with one URL per line")
+    parser.add_argument('--langs', nargs='+', default=['en'], help="official subtitle languages to download")
+    parser.add_argument('--concurrency', type=int, default=CONCURRENCY)
+    parser.add_argument('--report', default='bulk_ingest_report.json', help="where to write the per-video report")
+    parser.add_argument('--static-folder', default=os.path.join(os.path.dirname(__file__), 'static'))
+    args = parser.parse_args(argv)
+
+    sources = list(args.urls)
+    if args.file:
+        sources += read_url_file(args.file)
+    if not sources:
+        parser.error("give at least one URL or --file")
+
+    database.init_db()
+    video_save_path = os.path.join(args.static_folder, 'videos')
+    os.makedirs(video_save_path, exist_ok=True)
+    report = ingest(sources, lambda url: utils.download_video_and_subs(url, args.langs, video_save_path),
+                    concurrency=args.concurrency, report_path=args.report)
+    return 1 if report['counts']['failed'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,93 @@
+import time
+import database
+
+DAY = 86400
+# A failed card comes back within the same session
+RELEARN_SECONDS = 600
+MIN_EASE = 1.3
+BATCH_SIZE = 20
+MAX_BATCH = 100
+MAX_EXCLUDE = 500
+
+# The buttons the review page shows, mapped to SM-2 quality (0-5)
+GRADES = {'again': 1, 'hard': 3, 'good': 4, 'easy': 5}
+
+_CARD_COLUMNS = ('f.word_id, f.lang, f.due, f.interval_days, f.ease, f.repetitions, f.lapses, f.last_review, '
+                 'v.word, v.definition, v.context, v.youtube_id, v.timestamp')
+
+
+def schedule(card, quality, now):
+    """SM-2: returns the card's new (due, interval_days, ease, repetitions, lapses) after a review.
+
+    Quality below 3 is a lapse: the card restarts its repetitions and is shown again
+    RELEARN_SECONDS later. Otherwise the interval grows 1 day, 6 days, then by the ease factor.
+    """
+    ease = max(MIN_EASE, card['ease'] + 0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02))
+    if quality < 3:
+        return now + RELEARN_SECONDS, 0.0, ease, 0, card['lapses'] + 1
+    repetitions = card['repetitions'] + 1
+    if repetitions == 1:
+        interval = 1.0
+    elif repetitions == 2:
+        interval = 6.0
+    else:
+        interval = round(card['interval_days'] * ease, 1)
+    return now + interval * DAY, interval, ease, repetitions, card['lapses']
+
+
+def due_cards(limit=BATCH_SIZE, lang=None, now=None, exclude=()):
+    """The next `limit` cards due by now, earliest first, with their word, sentence and clip.
+
+    One range scan of idx_flashcards_due (or idx_flashcards_lang_due) plus a primary-key
+    lookup per card, so the cost tracks `limit`, not the size of the deck. `exclude` skips
+    cards a client already holds from an earlier batch.
+    """
+    now = time.time() if now is None else now
+    query = f"SELECT {_CARD_COLUMNS} FROM flashcards f JOIN vocabulary v ON v.id = f.word_id WHERE f.due <= ?"
+    params = [now]
+    if lang:
+        query += " AND f.lang = ?"
+        params.append(lang)
+    exclude = [int(word_id) for word_id in exclude][:MAX_EXCLUDE]
+    if exclude:
+        query += f" AND f.word_id NOT IN ({', '.join('?' * len(exclude))})"
+        params += exclude
+    query += " ORDER BY f.due LIMIT ?"
+    params.append(limit)
+    conn = database.get_connection()
+    try:
+        return [dict(row) for row in conn.execute(query, params)]
+    finally:
+        conn.close()
+
+
+def review(word_id, quality, now=None):
+    """Records a review and returns the card's new state, or None if there's no such card."""
+    now = time.time() if now is None else now
+    conn = database.get_connection()
+    try:
+        with conn:
+            card = conn.execute("SELECT ease, repetitions, interval_days, lapses FROM flashcards WHERE word_id = ?",
+                                (word_id,)).fetchone()
+            if card is None:
+                return None
+            due, interval, ease, repetitions, lapses = schedule(card, quality, now)
+            conn.execute(
+                "UPDATE flashcards SET due = ?, interval_days = ?, ease = ?, repetitions = ?, lapses = ?, last_review = ? "
+                "WHERE word_id = ?",
+                (due, interval, ease, repetitions, lapses, now, word_id)
+            )
+    finally:
+        conn.close()
+    return {'word_id': word_id, 'due': due, 'interval_days': interval, 'ease': ease, 'repetitions': repetitions, 'lapses': lapses}
+
+
+def due_count(lang=None, now=None):
+    now = time.time() if now is None else now
+    conn = database.get_connection()
+    try:
+        if lang:
+            return conn.execute("SELECT COUNT(*) FROM flashcards WHERE lang = ? AND due <= ?", (lang, now)).fetchone()[0]
+        return conn.execute("SELECT COUNT(*) FROM flashcards WHERE due <= ?", (now,)).fetchone()[0]
+    finally:
+        conn.close()
@@ -0,0 +1,303 @@
+import os
+import json
+import time
+from typing import Callable, NamedTuple
+from concurrent.futures import ThreadPoolExecutor
+import database
+from . import utils
+from . import library
+from . import search
+from . import audio_cache
+from . import metadata_cache
+from . import metrics
+from . import thumbnails
+from . import transcription_profiles
+from .srt import parse_subtitle_filename
+
+
+class Stage(NamedTuple):
+    name: str
+    after: tuple            # stages whose re-run makes this one stale
+    run: Callable           # run(ctx, progress) -> JSON-serialisable output
+    is_current: Callable    # is_current(ctx, output) -> False once the output is gone or no longer matches the params
+    background: bool = False
+
+
+def _report(progress, stage, percent=None):
+    if progress:
+        progress(stage, percent)
+
+
+def _path(ctx, filename):
+    return os.path.join(ctx['video_save_path'], filename)
+
+
+def _exists(ctx, filename):
+    return bool(filename) and os.path.exists(_path(ctx, filename))
+
+
+def _metadata(ctx, progress):
+    _report(progress, 'metadata')
+    info = metadata_cache.get_info(ctx['video_url'])
+    return {'title': info.get('title') or ctx['youtube_id']}
+
+
+def _lyrics(ctx, progress):
+    if not ctx['params'].get('use_genius'):
+        return {'use_genius': False, 'lyrics': None}
+    _report(progress, 'lyrics')
+    clean_title, clean_artist = utils.get_clean_title_and_artist_with_llm(ctx['outputs']['metadata']['title'], ctx['client'], ctx['model_name'])
+    # A failed lookup (no artist from the LLM, or a Genius error) lets the ingest go on without
+    # lyrics but is marked, so is_current sends it round again on resume
+    if not (clean_title and clean_artist):
+        return {'use_genius': True, 'lyrics': None, 'lookup_failed': True}
+    try:
+        lyrics = utils.get_lyrics_from_genius(clean_title, clean_artist, raise_errors=True)
+    except Exception:
+        return {'use_genius': True, 'lyrics': None, 'lookup_failed': True}
+    return {'use_genius': True, 'lyrics': lyrics}
+
+
+def _lyrics_is_current(ctx, output):
+    return output['use_genius'] == bool(ctx['params'].get('use_genius')) and not output.get('lookup_failed')
+
+
+def _media(ctx, progress):
+    audio_path = utils.download_audio_file(ctx['video_url'], ctx['video_save_path'], progress=progress)
+    return {'audio': os.path.basename(audio_path)}
+
+
+def _media_is_current(ctx, output):
+    # The audio file is deleted once decoded; the PCM cache is what transcription needs.
+    return _exists(ctx, output['audio']) or os.path.exists(audio_cache.pcm_path(ctx['youtube_id']))
+
+
+def _video(ctx, progress):
+    return {'filename': os.path.basename(utils.download_video_file(ctx['video_url'], ctx['video_save_path']))}
+
+
+def _transcription(ctx, progress):
+    audio_path = _path(ctx, ctx['outputs']['media']['audio'])
+    srt_path = utils.transcribe_and_save_srt(audio_path, lang_code=ctx['params'].get('lang_code'), progress=progress,
+                                             youtube_id=ctx['youtube_id'], srt_base=_path(ctx, ctx['youtube_id']),
+                                             profile=ctx['params'].get('profile'))
+    # The PCM cache now holds everything later passes need from the audio file
+    try:
+        os.remove(audio_path)
+    except OSError:
+        pass
+    _, lang_code = parse_subtitle_filename(os.path.basename(srt_path))
+    # What was asked for, not what was detected, so is_current can tell when the request changes
+    return {'srt': os.path.basename(srt_path), 'lang': lang_code, 'lang_code': ctx['params'].get('lang_code'),
+            'profile': transcription_profiles.get_profile(ctx['params'].get('profile')).name}
+
+
+def _transcription_is_current(ctx, output):
+    profile = transcription_profiles.get_profile(ctx['params'].get('profile')).name
+    # Runs recorded before these were stored count as matching
+    return (_exists(ctx, output['srt']) and output.get('lang_code', ctx['params'].get('lang_code')) == ctx['params'].get('lang_code')
+            and output.get('profile', profile) == profile)
+
+
+def _correction(ctx, progress):
+    transcription = ctx['outputs']['transcription']
+    utils.correct_srt_with_llm(_path(ctx, transcription['srt']), ctx['outputs']['metadata']['title'], transcription['lang'],
+                               ctx['client'], ctx['model_name'], ctx['outputs']['lyrics']['lyrics'], progress=progress)
+    return {'srt': transcription['srt']}
+
+
+def target_langs(params):
+    """Target languages of an ingest; older runs stored a single target_lang."""
+    return params.get('target_langs') or [params.get('target_lang') or 'en']
+
+
+def _translation(ctx, progress):
+    transcription = ctx['outputs']['transcription']
+    langs = [lang for lang in target_langs(ctx['params']) if lang != transcription['lang']]
+    if not langs:
+        return {'srts': {}}
+    srt_paths = utils.translate_srt_with_llm(_path(ctx, ctx['outputs']['correction']['srt']), transcription['lang'], langs,
+                                             ctx['client'], ctx['model_name'], progress=progress)
+    return {'srts': {lang: os.path.basename(path) for lang, path in srt_paths.items()}}
+
+
+def _translation_is_current(ctx, output):
+    srts = output.get('srts', {})
+    source_lang = ctx['outputs']['transcription']['lang']
+    return all(lang in srts and _exists(ctx, srts[lang]) for lang in target_langs(ctx['params']) if lang != source_lang)
+
+
+def _thumbnail(ctx, progress):
+    _report(progress, 'thumbnail')
+    thumbnail_path = utils.download_thumbnail(ctx['youtube_id'], _path(ctx, 'thumbnails'))
+    if not thumbnail_path:
+        return {'thumbnail': None}
+    return {'thumbnail': os.path.relpath(thumbnail_path, os.path.dirname(ctx['video_save_path'])).replace(os.sep, '/')}
+
+
+def _thumbnail_is_current(ctx, output):
+    return not output['thumbnail'] or os.path.exists(os.path.join(os.path.dirname(ctx['video_save_path']), output['thumbnail']))
+
+
+def _indexing(ctx, progress):
+    if not ctx['params'].get('precompute_translations'):
+        return {'precompute': False}
+    utils.precompute_translations(ctx['youtube_id'], ctx['video_save_path'], ctx['client'], ctx['model_name'], progress=progress)
+    return {'precompute': True}
+
+
+STAGES = [
+    Stage('metadata', (), _metadata, lambda ctx, output: True),
+    Stage('lyrics', ('metadata',), _lyrics, _lyrics_is_current),
+    Stage('media', ('metadata',), _media, _media_is_current),
+    # The mp4 isn't needed until the catalog insert, so it downloads while Whisper runs.
+    Stage('video', ('metadata',), _video, lambda ctx, output: _exists(ctx, output['filename']), background=True),
+    Stage('transcription', ('media',), _transcription, _transcription_is_current),
+    Stage('correction', ('transcription', 'lyrics'), _correction, lambda ctx, output: _exists(ctx, output['srt'])),
+    Stage('translation', ('correction',), _translation, _translation_is_current),
+    Stage('thumbnail', ('metadata',), _thumbnail, _thumbnail_is_current),
+    Stage('indexing', ('correction', 'translation'), _indexing,
+          lambda ctx, output: output['precompute'] or not ctx['params'].get('precompute_translations')),
+]
+
+
+def _save_run(youtube_id, video_url, params):
+    conn = database.get_connection()
+    try:
+        conn.execute(
+            "INSERT OR REPLACE INTO ingest_runs (youtube_id, video_url, params, updated_at) VALUES (?, ?, ?, ?)",
+            (youtube_id, video_url, json.dumps(params, ensure_ascii=False), time.time())
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def _save_stage(youtube_id, stage, status, output=None, error=None):
+    finished_at = time.time()
+    conn = database.get_connection()
+    try:
+        conn.execute(
+            "INSERT OR REPLACE INTO ingest_stages (youtube_id, stage, status, output, error, finished_at) VALUES (?, ?, ?, ?, ?, ?)",
+            (youtube_id, stage, status, json.dumps(output, ensure_ascii=False) if output is not None else None, error, finished_at)
+        )
+        conn.commit()
+    finally:
+        conn.close()
+    return finished_at
+
+
+def _load_run(youtube_id):
+    conn = database.get_connection()
+    try:
+        run_row = conn.execute("SELECT youtube_id, video_url, params, updated_at FROM ingest_runs WHERE youtube_id = ?",
+                               (youtube_id,)).fetchone()
+        stage_rows = conn.execute("SELECT stage, status, output, error, finished_at FROM ingest_stages WHERE youtube_id = ?",
+                                  (youtube_id,)).fetchall()
+    finally:
+        conn.close()
+    if run_row is None:
+        return None
+    run = dict(run_row)
+    run['params'] = json.loads(run['params'])
+    run['stages'] = {}
+    for row in stage_rows:
+        record = dict(row)
+        record['output'] = json.loads(record['output']) if record['output'] else None
+        run['stages'][record['stage']] = record
+    return run
+
+
+def _run_stage(youtube_id, stage, ctx, progress):
+    print(f"Ingest {youtube_id}: running stage '{stage.name}'...")
+    try:
+        with metrics.INGEST_STAGE_SECONDS.time(stage=stage.name):
+            output = stage.run(ctx, progress)
+    except Exception as e:
+        print(f"⚠️ Ingest stage '{stage.name}' failed for {youtube_id}: {e}")
+        metrics.INGEST_STAGE_FAILURES.inc(stage=stage.name)
+        _save_stage(youtube_id, stage.name, 'failed', error=str(e))
+        raise
+    return output, _save_stage(youtube_id, stage.name, 'done', output)
+
+
+def _execute(youtube_id, video_save_path, client, model_name, progress):
+    run = _load_run(youtube_id)
+    ctx = {'youtube_id': youtube_id, 'video_url': run['video_url'], 'params': run['params'], 'video_save_path': video_save_path,
+           'client': client, 'model_name': model_name, 'outputs': {}}
+    finished = {}
+
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix='ingest-background') as background:
+        pending = []
+        for stage in STAGES:
+            record = run['stages'].get(stage.name)
+            if (record and record['status'] == 'done'
+                    and all(finished[dep] <= record['finished_at'] for dep in stage.after)
+                    and stage.is_current(ctx, record['output'])):
+                ctx['outputs'][stage.name] = record['output']
+                finished[stage.name] = record['finished_at']
+                continue
+            if stage.background:
+                pending.append((stage, background.submit(_run_stage, youtube_id, stage, ctx, None)))
+                continue
+            ctx['outputs'][stage.name], finished[stage.name] = _run_stage(youtube_id, stage, ctx, progress)
+
+        for stage, future in pending:
+            ctx['outputs'][stage.name], finished[stage.name] = future.result()
+
+    outputs = ctx['outputs']
+    title = outputs['metadata']['title']
+    library.add_video(youtube_id, title, outputs['video']['filename'], outputs['thumbnail']['thumbnail'])
+    # Needs the mp4 when YouTube had no thumbnail, so it runs once the background download is in
+    thumbnails.process(youtube_id, video_save_path, outputs['video']['filename'])
+    library.sync_subtitles(youtube_id, video_save_path)
+    search.sync_video(youtube_id, video_save_path)
+    return title
+
+
+def run(video_url, params, video_save_path, client, model_name, progress=None):
+    """Ingests a video through Whisper, Genius and the LLM, one checkpointed stage at a time.
+
+    params holds use_genius, lang_code, target_langs, precompute_translations and the
+    transcription profile. Stages already completed by an earlier run for the same video
+    are skipped. Returns the title.
+    """
+    youtube_id = metadata_cache.video_id_from_url(video_url) or metadata_cache.get_info(video_url)['id']
+    _save_run(youtube_id, video_url, params)
+    return _execute(youtube_id, video_save_path, client, model_name, progress)
+
+
+def resume(youtube_id, video_save_path, client, model_name, progress=None, add_langs=None):
+    """Re-runs only the failed or stale stages of an earlier ingest.
+
+    add_langs adds target languages: the existing corrected SRT is translated into them,
+    with the translation memory supplying every line already translated elsewhere.
+    """
+    run = _load_run(youtube_id)
+    if run is None:
+        raise LookupError(f"No ingest recorded for {youtube_id}")
+    if add_langs:
+        langs = target_langs(run['params'])
+        run['params']['target_langs'] = langs + [lang for lang in add_langs if lang not in langs]
+        run['params'].pop('target_lang', None)
+        _save_run(youtube_id, run['video_url'], run['params'])
+    return _execute(youtube_id, video_save_path, client, model_name, progress)
+
+
+def get_state(youtube_id):
+    """Returns the ingest parameters and per-stage checkpoints of a video, or None."""
+    run = _load_run(youtube_id)
+    if run is None:
+        return None
+    run['stages'] = [run['stages'].get(stage.name, {'stage': stage.name, 'status': 'pending'}) for stage in STAGES]
+    return run
+
+
+def forget(youtube_id):
+    conn = database.get_connection()
+    try:
+        with conn:
+            conn.execute("DELETE FROM ingest_stages WHERE youtube_id = ?", (youtube_id,))
+            conn.execute("DELETE FROM ingest_runs WHERE youtube_id = ?", (youtube_id,))
+    finally:
+        conn.close()
@@ -0,0 +1,153 @@
+import os
+import json
+import time
+import uuid
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import database
+from . import metrics
+
+MAX_WORKERS = int(os.environ.get('INGEST_WORKERS', '2'))
+
+_handlers = {}
+_executor = None
+_executor_lock = threading.Lock()
+
+_JOB_COLUMNS = 'id, kind, params, status, stage, progress, result, error, created_at, updated_at'
+
+
+def register(kind):
+    """Decorator that registers the function which runs jobs of the given kind.
+
+    The function is called as handler(params, progress) where progress(stage, percent=None)
+    reports what the job is doing. Its return value is stored as the job result.
+    """
+    def decorator(func):
+        _handlers[kind] = func
+        return func
+    return decorator
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix='ingest')
+        return _executor
+
+
+def _update(job_id, **fields):
+    fields['updated_at'] = time.time()
+    assignments = ', '.join(f"{name} = ?" for name in fields)
+    conn = database.get_connection()
+    try:
+        conn.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id))
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def _row_to_job(row):
+    job = dict(row)
+    job['params'] = json.loads(job['params'])
+    job['result'] = json.loads(job['result']) if job['result'] else None
+    return job
+
+
+class _Progress:
+    """Progress reporter handed to job handlers; skips writes that wouldn't change anything visible."""
+
+    def __init__(self, job_id):
+        self.job_id = job_id
+        self.stage = None
+        self.percent = 0.0
+
+    def __call__(self, stage, percent=None):
+        percent = 0.0 if percent is None else max(0.0, min(100.0, float(percent)))
+        if stage == self.stage and abs(percent - self.percent) < 1.0:
+            return
+        self.stage, self.percent = stage, percent
+        _update(self.job_id, stage=stage, progress=round(percent, 1))
+
+
+def _run(job_id):
+    job = get_job(job_id)
+    if job is None or job['status'] not in ('queued', 'running'):
+        return
+    handler = _handlers.get(job['kind'])
+    if handler is None:
+        _update(job_id, status='failed', error=f"No handler registered for '{job['kind']}' jobs.")
+        return
+
+    _update(job_id, status='running')
+    try:
+        result = handler(job['params'], _Progress(job_id))
+    except Exception as e:
+        print(f"⚠️ Job {job_id} failed: {e}")
+        _update(job_id, status='failed', error=str(e))
+        metrics.JOBS_FINISHED.inc(kind=job['kind'], status='failed')
+        return
+    _update(job_id, status='done', stage='done', progress=100.0, result=json.dumps(result, ensure_ascii=False))
+    metrics.JOBS_FINISHED.inc(kind=job['kind'], status='done')
+    print(f"✅ Job {job_id} finished.")
+
+
+def enqueue(kind, params):
+    """Persists a new job and schedules it on the worker pool. Returns the job id."""
+    if kind not in _handlers:
+        raise ValueError(f"Unknown job kind: {kind}")
+    job_id = uuid.uuid4().hex
+    now = time.time()
+    conn = database.get_connection()
+    try:
+        conn.execute(
+            "INSERT INTO jobs (id, kind, params, status, stage, created_at, updated_at) VALUES (?, ?, ?, 'queued', 'queued', ?, ?)",
+            (job_id, kind, json.dumps(params, ensure_ascii=False), now, now)
+        )
+        conn.commit()
+    finally:
+        conn.close()
+    _get_executor().submit(_run, job_id)
+    return job_id
+
+
+def get_job(job_id):
+    conn = database.get_connection()
+    try:
+        row = conn.execute(f"SELECT {_JOB_COLUMNS} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+    finally:
+        conn.close()
+    return _row_to_job(row) if row else None
+
+
+def list_jobs(limit=20):
+    conn = database.get_connection()
+    try:
+        rows = conn.execute(f"SELECT {_JOB_COLUMNS} FROM jobs ORDER BY created_at DESC LIMIT ?", (limit,)).fetchall()
+    finally:
+        conn.close()
+    return [_row_to_job(row) for row in rows]
+
+
+def queue_depth():
+    conn = database.get_connection()
+    try:
+        return conn.execute("SELECT COUNT(*) FROM jobs WHERE status IN ('queued', 'running')").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def resume_pending():
+    """Reschedules jobs left queued or running by a previous process. Call once at startup."""
+    conn = database.get_connection()
+    try:
+        rows = conn.execute(
+            "SELECT id FROM jobs WHERE status IN ('queued', 'running') ORDER BY created_at"
+        ).fetchall()
+    finally:
+        conn.close()
+    for row in rows:
+        print(f"Resuming job {row['id']}...")
+        _update(row['id'], status='queued')
+        _get_executor().submit(_run, row['id'])
+    return len(rows)
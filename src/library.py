@@ -0,0 +1,216 @@
+import os
+import glob
+import json
+import time
+import base64
+import database
+from .srt import parse_subtitle_filename
+
+PAGE_SIZE = 48
+
+_VIDEO_COLUMNS = 'id, youtube_id, title, filename, thumbnail, thumbnail_widths, added_at'
+
+
+def add_video(youtube_id, title, filename=None, thumbnail=None):
+    """Inserts or updates a video in the catalog, keeping its original added_at."""
+    conn = database.get_connection()
+    try:
+        with conn:
+            conn.execute(
+                "INSERT INTO videos (youtube_id, title, filename, thumbnail, added_at) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (youtube_id) DO UPDATE SET title = excluded.title, filename = excluded.filename, "
+                "thumbnail = COALESCE(excluded.thumbnail, videos.thumbnail)",
+                (youtube_id, title, filename or f"{youtube_id}.mp4", thumbnail, time.time())
+            )
+    finally:
+        conn.close()
+
+
+def set_thumbnail(youtube_id, thumbnail, widths=None):
+    """Records a thumbnail path relative to the static folder, and the widths of its WebP variants."""
+    conn = database.get_connection()
+    try:
+        with conn:
+            conn.execute("UPDATE videos SET thumbnail = ?, thumbnail_widths = ? WHERE youtube_id = ?",
+                         (thumbnail, ','.join(str(width) for width in widths) if widths else None, youtube_id))
+    finally:
+        conn.close()
+
+
+def thumbnail_widths(video):
+    """The variant widths recorded for a video row, smallest first."""
+    return [int(width) for width in (video.get('thumbnail_widths') or '').split(',') if width]
+
+
+def list_videos_for_thumbnails(include_done=False):
+    """Videos without thumbnail variants yet (or every video, with include_done), oldest first."""
+    query = "SELECT youtube_id, filename, thumbnail FROM videos"
+    if not include_done:
+        query += " WHERE thumbnail_widths IS NULL"
+    conn = database.get_connection()
+    try:
+        return [dict(row) for row in conn.execute(query + " ORDER BY added_at, id")]
+    finally:
+        conn.close()
+
+
+def remove_video(youtube_id):
+    """Deletes a video and its subtitle rows in one transaction."""
+    conn = database.get_connection()
+    try:
+        with conn:
+            row = conn.execute("SELECT id FROM videos WHERE youtube_id = ?", (youtube_id,)).fetchone()
+            if row is None:
+                return False
+            conn.execute("DELETE FROM subtitles WHERE video_id = ?", (row['id'],))
+            conn.execute("DELETE FROM videos WHERE id = ?", (row['id'],))
+        return True
+    finally:
+        conn.close()
+
+
+def get_video(youtube_id):
+    conn = database.get_connection()
+    try:
+        row = conn.execute(f"SELECT {_VIDEO_COLUMNS} FROM videos WHERE youtube_id = ?", (youtube_id,)).fetchone()
+    finally:
+        conn.close()
+    return dict(row) if row else None
+
+
+def encode_cursor(video):
+    return base64.urlsafe_b64encode(json.dumps([video['added_at'], video['id']]).encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor):
+    """The (added_at, id) a page ends at; ValueError for anything that isn't a cursor we issued."""
+    try:
+        added_at, video_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        return float(added_at), int(video_id)
+    except (TypeError, ValueError, UnicodeError) as e:
+        raise ValueError("Invalid cursor") from e
+
+
+def list_videos(search=None, after=None, limit=PAGE_SIZE):
+    """Returns (videos, next_cursor) for one page, newest first, optionally filtered by title.
+
+    Pages are keyed on the last (added_at, id) seen, so any page is one seek into
+    idx_videos_added rather than a scan past every earlier row. next_cursor is None on the last page.
+    """
+    query = f"SELECT {_VIDEO_COLUMNS} FROM videos"
+    conditions, params = [], []
+    if search:
+        conditions.append("title LIKE ? ESCAPE '\\'")
+        params.append(_like_pattern(search))
+    if after:
+        conditions.append("(added_at, id) < (?, ?)")
+        params += decode_cursor(after)
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    query += " ORDER BY added_at DESC, id DESC LIMIT ?"
+    params.append(limit + 1)
+    conn = database.get_connection()
+    try:
+        rows = [dict(row) for row in conn.execute(query, params)]
+    finally:
+        conn.close()
+    next_cursor = encode_cursor(rows[limit - 1]) if len(rows) > limit else None
+    return rows[:limit], next_cursor
+
+
+def count_videos(search=None):
+    conn = database.get_connection()
+    try:
+        if search:
+            return conn.execute("SELECT COUNT(*) FROM videos WHERE title LIKE ? ESCAPE '\\'", (_like_pattern(search),)).fetchone()[0]
+        return conn.execute("SELECT COUNT(*) FROM videos").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def _like_pattern(search):
+    escaped = search.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return f"%{escaped}%"
+
+
+def list_subtitles(youtube_id):
+    conn = database.get_connection()
+    try:
+        rows = conn.execute(
+            "SELECT s.lang_code, s.lang_name, s.filename FROM subtitles s JOIN videos v ON v.id = s.video_id "
+            "WHERE v.youtube_id = ? ORDER BY s.lang_code",
+            (youtube_id,)
+        ).fetchall()
+    finally:
+        conn.close()
+    return [dict(row) for row in rows]
+
+
+def sync_subtitles(youtube_id, video_folder):
+    """Replaces a video's subtitle rows with the .srt files currently on disk for it."""
+    tracks = []
+    for srt_path in glob.glob(os.path.join(video_folder, f'{youtube_id}.*.srt')):
+        filename = os.path.basename(srt_path)
+        parsed = parse_subtitle_filename(filename)
+        if not parsed or parsed[0] != youtube_id:
+            continue
+        lang_code = parsed[1]
+        tracks.append((lang_code, lang_code.upper(), filename))
+
+    conn = database.get_connection()
+    try:
+        with conn:
+            row = conn.execute("SELECT id FROM videos WHERE youtube_id = ?", (youtube_id,)).fetchone()
+            if row is None:
+                return []
+            conn.execute("DELETE FROM subtitles WHERE video_id = ?", (row['id'],))
+            conn.executemany(
+                "INSERT INTO subtitles (video_id, lang_code, lang_name, filename) VALUES (?, ?, ?, ?)",
+                [(row['id'], *track) for track in tracks]
+            )
+    finally:
+        conn.close()
+    return tracks
+
+
+def migrate_from_json(library_path, static_folder):
+    """One-time import of library.json and the videos folder into the catalog.
+
+    Runs when library.json is still present or the catalog is empty; library.json is
+    renamed afterwards so the scan never repeats.
+    """
+    has_json = os.path.exists(library_path)
+    if not has_json and count_videos() > 0:
+        return 0
+
+    library_data = {}
+    if has_json:
+        try:
+            with open(library_path, 'r', encoding='utf-8') as f:
+                library_data = json.load(f)
+        except json.JSONDecodeError:
+            library_data = {}
+
+    video_folder = os.path.join(static_folder, 'videos')
+    try:
+        video_files = sorted(f for f in os.listdir(video_folder) if f.endswith('.mp4'))
+    except FileNotFoundError:
+        video_files = []
+
+    migrated = 0
+    for filename in video_files:
+        youtube_id = os.path.splitext(filename)[0]
+        thumbnail = None
+        for candidate in (f'thumbnails/{youtube_id}.jpg', f'videos/thumbnails/{youtube_id}.jpg'):
+            if os.path.exists(os.path.join(static_folder, candidate)):
+                thumbnail = candidate
+                break
+        add_video(youtube_id, library_data.get(youtube_id, youtube_id), filename, thumbnail)
+        sync_subtitles(youtube_id, video_folder)
+        migrated += 1
+
+    if has_json:
+        os.replace(library_path, library_path + '.migrated')
+    if migrated:
+        print(f"✅ Migrated {migrated} videos into the library catalog.")
+    return migrated
@@ -0,0 +1,109 @@
+import os
+import mimetypes
+from datetime import datetime, timezone
+from werkzeug.http import http_date, is_resource_modified, parse_date
+from werkzeug.security import safe_join
+from werkzeug.wrappers import Response
+
+# Versioned URLs name one exact file, so browsers may keep them for a year without revalidating.
+IMMUTABLE = 'public, max-age=31536000, immutable'
+REVALIDATE = 'no-cache'
+CHUNK_SIZE = 256 * 1024
+
+
+def _stat(folder, filename):
+    path = safe_join(folder, filename)
+    if path is None:
+        return None, None
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None, None
+    return (path, st) if os.path.isfile(path) else (None, None)
+
+
+def _version(st):
+    return f"{st.st_mtime_ns:x}-{st.st_size:x}"
+
+
+def version(folder, filename):
+    """A token that changes whenever the file does, for cache-busting URLs. None if it's missing."""
+    _, st = _stat(folder, filename)
+    return _version(st) if st else None
+
+
+def _read_range(file, length):
+    """Yields length bytes from the file's current position, for servers without wsgi.file_wrapper."""
+    try:
+        while length > 0:
+            chunk = file.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+    finally:
+        file.close()
+
+
+def _range_applies(request, etag, last_modified):
+    """If-Range: a Range only counts when the client's copy is still the current file."""
+    if_range = request.headers.get('If-Range')
+    if not if_range:
+        return True
+    if if_range.startswith(('"', 'W/')):
+        return if_range == f'"{etag}"'
+    date = parse_date(if_range)
+    return date is not None and last_modified <= date
+
+
+def send(folder, filename, request):
+    """Serves a file from folder with byte ranges, a strong ETag, Last-Modified and 304s.
+
+    Whole files and open-ended ranges (`bytes=N-`, what players send when seeking) are handed
+    to the server's wsgi.file_wrapper positioned at the range start, which gunicorn turns into
+    sendfile(). Ranges that stop short of the end are read in chunks, since not every server's
+    file_wrapper stops at Content-Length. Requests whose ?v= matches the current version are
+    cacheable forever; everything else must revalidate.
+    """
+    path, st = _stat(folder, filename)
+    if path is None:
+        return Response('Not found', status=404, mimetype='text/plain')
+
+    etag = _version(st)
+    # HTTP dates have whole-second precision
+    last_modified = datetime.fromtimestamp(st.st_mtime, timezone.utc).replace(microsecond=0)
+    size = st.st_size
+    response = Response(mimetype=mimetypes.guess_type(path)[0] or 'application/octet-stream', direct_passthrough=True)
+    response.set_etag(etag)
+    response.headers['Last-Modified'] = http_date(last_modified)
+    response.headers['Accept-Ranges'] = 'bytes'
+    response.headers['Cache-Control'] = IMMUTABLE if request.args.get('v') == etag else REVALIDATE
+
+    if not is_resource_modified(request.environ, etag=etag, last_modified=last_modified):
+        response.status_code = 304
+        return response
+
+    start, stop = 0, size
+    byte_range = request.range if _range_applies(request, etag, last_modified) else None
+    # Multi-range requests are rare for media; answering them with the whole file is allowed.
+    if byte_range is not None and len(byte_range.ranges) == 1:
+        span = byte_range.range_for_length(size)
+        if span is None:
+            response.status_code = 416
+            response.headers['Content-Range'] = f"bytes */{size}"
+            return response
+        start, stop = span
+        response.status_code = 206
+        response.headers['Content-Range'] = f"bytes {start}-{stop - 1}/{size}"
+
+    file = open(path, 'rb')
+    file.seek(start)
+    response.content_length = stop - start
+    file_wrapper = request.environ.get('wsgi.file_wrapper')
+    if file_wrapper and stop == size:
+        response.response = file_wrapper(file, CHUNK_SIZE)
+    else:
+        response.response = _read_range(file, stop - start)
+    # HEAD requests never iterate the body, so close the file explicitly too
+    response.call_on_close(file.close)
+    return response
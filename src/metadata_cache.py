@@ -0,0 +1,128 @@
+import os
+import re
+import json
+import time
+import zlib
+import threading
+import yt_dlp
+import database
+from . import metrics
+
+# Format URLs in an info dict expire after a few hours, so entries older than this are refetched.
+TTL_SECONDS = float(os.environ.get("METADATA_CACHE_TTL", str(3 * 3600)))
+MAX_ROWS = int(os.environ.get("METADATA_CACHE_MAX_ROWS", "500"))
+
+_YOUTUBE_ID = re.compile(r'(?:[?&]v=|youtu\.be/|/shorts/|/embed/|/live/)([A-Za-z0-9_-]{11})(?![A-Za-z0-9_-])')
+
+_lock = threading.Lock()
+_stats = {'hits': 0, 'misses': 0}
+
+
+_extractor = yt_dlp.YoutubeDL
+
+
+def set_extractor(extractor):
+    """Replaces the YoutubeDL class used for metadata, downloads and playlist listings. Pass None to restore yt-dlp's."""
+    global _extractor
+    _extractor = extractor or yt_dlp.YoutubeDL
+
+
+def youtube_dl(params):
+    """A YoutubeDL from the current extractor, for use as a context manager."""
+    return _extractor(params)
+
+
+def _extract(video_url):
+    with metrics.YTDLP_SECONDS.time(operation='extract'), youtube_dl({'quiet': True}) as ydl:
+        return ydl.sanitize_info(ydl.extract_info(video_url, download=False))
+
+
+def video_id_from_url(video_url):
+    """Pulls the video id out of a YouTube URL without a network round trip, or returns None."""
+    match = _YOUTUBE_ID.search(video_url or '')
+    return match.group(1) if match else None
+
+
+def _load(youtube_id, now):
+    conn = database.get_connection()
+    try:
+        row = conn.execute("SELECT info, fetched_at FROM video_metadata WHERE youtube_id = ?", (youtube_id,)).fetchone()
+        if row is None:
+            return None
+        if TTL_SECONDS > 0 and now - row['fetched_at'] >= TTL_SECONDS:
+            conn.execute("DELETE FROM video_metadata WHERE youtube_id = ?", (youtube_id,))
+            conn.commit()
+            return None
+        conn.execute("UPDATE video_metadata SET last_access = ? WHERE youtube_id = ?", (now, youtube_id))
+        conn.commit()
+    finally:
+        conn.close()
+    return json.loads(zlib.decompress(row['info']))
+
+
+def _store(info, now):
+    conn = database.get_connection()
+    try:
+        conn.execute(
+            "INSERT OR REPLACE INTO video_metadata (youtube_id, info, fetched_at, last_access) VALUES (?, ?, ?, ?)",
+            (info['id'], zlib.compress(json.dumps(info, ensure_ascii=False).encode('utf-8')), now, now)
+        )
+        conn.execute(
+            "DELETE FROM video_metadata WHERE youtube_id NOT IN "
+            "(SELECT youtube_id FROM video_metadata ORDER BY last_access DESC LIMIT ?)",
+            (MAX_ROWS,)
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def get_info(video_url, refresh=False):
+    """Returns the yt-dlp info dict for a video, extracting it only on a cache miss.
+
+    Each call returns a fresh copy, so callers (and yt-dlp) may modify it freely.
+    """
+    now = time.time()
+    youtube_id = video_id_from_url(video_url)
+    info = _load(youtube_id, now) if youtube_id and not refresh else None
+    with _lock:
+        _stats['hits' if info is not None else 'misses'] += 1
+    if info is not None:
+        return info
+
+    info = _extract(video_url)
+    if info.get('id'):
+        _store(info, now)
+    return info
+
+
+def download(video_url, ydl_opts):
+    """Downloads a video with the given yt-dlp options, reusing cached metadata.
+
+    Returns (info, filename). If the cached format URLs have gone stale the download
+    is retried once with freshly extracted metadata.
+    """
+    for attempt in range(2):
+        info = get_info(video_url, refresh=attempt > 0)
+        try:
+            with metrics.YTDLP_SECONDS.time(operation='download'), youtube_dl(ydl_opts) as ydl:
+                info = ydl.process_ie_result(info, download=True)
+                return info, ydl.prepare_filename(info)
+        except yt_dlp.utils.DownloadError as e:
+            if attempt:
+                raise
+            print(f"⚠️ Download from cached metadata failed ({e}); refetching metadata...")
+
+
+def invalidate(youtube_id):
+    conn = database.get_connection()
+    try:
+        conn.execute("DELETE FROM video_metadata WHERE youtube_id = ?", (youtube_id,))
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def stats():
+    with _lock:
+        return dict(_stats)
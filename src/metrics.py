@@ -0,0 +1,182 @@
+import time
+import threading
+from contextlib import contextmanager
+
+# Seconds; spans a cached click (~ms) up to a multi-minute Whisper pass.
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800)
+
+_registry = []
+_registry_lock = threading.Lock()
+
+
+def _register(metric):
+    with _registry_lock:
+        _registry.append(metric)
+    return metric
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in (*zip(names, values), *extra)]
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _header(self):
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._values = {}
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        with self._lock:
+            values = dict(self._values)
+        return self._header() + [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+                                 for key, value in sorted(values.items())]
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+        self._values = {}
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.get(key, ([0] * len(self.buckets), 0.0))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            self._values[key] = (counts, total + value)
+
+    @contextmanager
+    def time(self, **labels):
+        """Observes how long the block took, whether or not it raised.
+
+        Yields the labels dict, so the block can fill in labels it only learns at the end
+        (e.g. `with H.time(outcome='error') as labels: ...; labels['outcome'] = 'ok'`).
+        """
+        started = time.perf_counter()
+        try:
+            yield labels
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def render(self):
+        with self._lock:
+            values = {key: (list(counts), total) for key, (counts, total) in self._values.items()}
+        lines = self._header()
+        for key, (counts, total) in sorted(values.items()):
+            for bound, count in zip(self.buckets, counts):
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, [('le', _format_value(bound))])} {count}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {counts[-1]}")
+        return lines
+
+
+class Collected(_Metric):
+    """A metric whose value is read from a callback at scrape time, for numbers kept elsewhere.
+
+    The callback returns a number, or a {label value tuple: number} dict for labelled metrics.
+    """
+
+    def __init__(self, name, documentation, callback, labelnames=(), kind='gauge'):
+        super().__init__(name, documentation, labelnames)
+        self.callback = callback
+        self.kind = kind
+
+    def render(self):
+        try:
+            values = self.callback()
+        except Exception as e:
+            print(f"⚠️ Could not collect {self.name}: {e}")
+            return []
+        if not isinstance(values, dict):
+            values = {(): values}
+        return self._header() + [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+                                 for key, value in sorted(values.items())]
+
+
+def counter(name, documentation, labelnames=()):
+    return _register(Counter(name, documentation, labelnames))
+
+
+def histogram(name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+    return _register(Histogram(name, documentation, labelnames, buckets))
+
+
+def collected(name, documentation, callback, labelnames=(), kind='gauge'):
+    return _register(Collected(name, documentation, callback, labelnames, kind))
+
+
+def render():
+    """Every registered metric in the Prometheus text exposition format."""
+    with _registry_lock:
+        metrics = list(_registry)
+    lines = []
+    for metric in metrics:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+
+HTTP_REQUEST_SECONDS = histogram('lingopy_http_request_duration_seconds', 'Request latency by route.', ('route', 'method', 'status'))
+HTTP_REQUESTS = counter('lingopy_http_requests_total', 'Requests served by route and status.', ('route', 'method', 'status'))
+
+INGEST_STAGE_SECONDS = histogram('lingopy_ingest_stage_duration_seconds', 'Time spent in each ingest stage.', ('stage',))
+INGEST_STAGE_FAILURES = counter('lingopy_ingest_stage_failures_total', 'Ingest stages that raised.', ('stage',))
+JOBS_FINISHED = counter('lingopy_jobs_finished_total', 'Background jobs by kind and outcome.', ('kind', 'status'))
+
+YTDLP_SECONDS = histogram('lingopy_ytdlp_duration_seconds', 'yt-dlp metadata extraction and downloads.', ('operation',))
+WHISPER_SECONDS = histogram('lingopy_whisper_transcription_seconds', 'Wall-clock time of Whisper transcriptions.', ('mode',))
+WHISPER_AUDIO_SECONDS = counter('lingopy_whisper_audio_seconds_total', 'Seconds of audio transcribed.', ('mode',))
+WHISPER_LOAD_SECONDS = histogram('lingopy_whisper_model_load_seconds', 'Loading Whisper models (parallel: starting the worker pool).',
+                                 ('mode',), buckets=(0.5, 1, 2.5, 5, 10, 20, 30, 60, 120))
+WHISPER_RTF = histogram('lingopy_whisper_real_time_factor', 'Transcription time divided by audio duration.', ('mode',),
+                        buckets=(0.02, 0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1, 1.5, 2, 5))
+GENIUS_SECONDS = histogram('lingopy_genius_lookup_duration_seconds', 'Genius lyrics lookups.', ('found',))
+LLM_PASS_SECONDS = histogram('lingopy_llm_pass_duration_seconds', 'Whole LLM passes over a subtitle file.', ('operation',))
+LLM_REQUEST_SECONDS = histogram('lingopy_llm_request_duration_seconds', 'Single LLM requests.', ('operation', 'outcome'))
+UPSTREAM_SECONDS = histogram('lingopy_translation_upstream_duration_seconds', 'Click-to-translate upstream calls.', ('kind', 'outcome'))
+
+
+def observe_transcription(mode, elapsed, audio_seconds):
+    """Records one transcription; elapsed should leave out model loading, which has its own histogram."""
+    WHISPER_SECONDS.observe(elapsed, mode=mode)
+    if audio_seconds:
+        WHISPER_AUDIO_SECONDS.inc(audio_seconds, mode=mode)
+        WHISPER_RTF.observe(elapsed / audio_seconds, mode=mode)
@@ -0,0 +1,226 @@
+import os
+import time
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, BrokenExecutor, as_completed
+from . import whisper_registry
+from . import audio_cache
+from . import metrics
+
+SAMPLE_RATE = audio_cache.SAMPLE_RATE
+# Clips shorter than this go through the single-pass path; pool start-up isn't worth it.
+MIN_DURATION = float(os.environ.get("PARALLEL_MIN_DURATION", "180"))
+# Chunks are cut at the first silence after at least this many seconds of audio.
+MIN_CHUNK_SECONDS = 30.0
+WORKERS = int(os.environ.get("PARALLEL_WORKERS", "0")) or max(1, (os.cpu_count() or 1) // 4)
+# Spawn rather than fork: the web process has live threads and open sqlite handles.
+START_METHOD = "spawn"
+
+_worker_model = None
+
+# One pool for the whole process, kept between ingests so its workers load their model once.
+# Its lock is held for a whole transcription: the pool already keeps every worker busy, so
+# concurrent ingests queue here instead of starting more processes, and a profile change
+# can swap the pool's model safely.
+_pool = None
+_pool_key = None
+_pool_last_used = 0.0
+_pool_lock = threading.Lock()
+
+
+def _init_worker(size, compute_type, device, cpu_threads):
+    global _worker_model
+    from faster_whisper import WhisperModel
+
+    _worker_model = WhisperModel(size, device=device, compute_type=compute_type, cpu_threads=cpu_threads)
+
+
+def _read_chunk(source, start, end):
+    """Chunks arrive either as the samples themselves or as a PCM cache path to slice."""
+    if isinstance(source, str):
+        import numpy as np
+
+        return np.array(np.memmap(source, dtype=np.float32, mode='r')[start:end])
+    return source
+
+
+def _worker_ready():
+    # Long enough that a worker which is already up doesn't take every probe meant for the others
+    time.sleep(0.05)
+    return os.getpid()
+
+
+def _start_workers(pool, workers):
+    """Returns once every worker process is up and has its model loaded."""
+    ready = set()
+    while len(ready) < workers:
+        ready.update(future.result() for future in [pool.submit(_worker_ready) for _ in range(workers - len(ready))])
+
+
+def _detect_language(source, start, end):
+    # transcribe() detects the language eagerly; the segments generator is never consumed.
+    _, info = _worker_model.transcribe(_read_chunk(source, start, end))
+    return info.language
+
+
+def _transcribe_chunk(source, start, end, language, options):
+    audio = _read_chunk(source, start, end)
+    offset = start / SAMPLE_RATE
+    segments, _ = _worker_model.transcribe(audio, language=language, **options)
+    chunk_end = offset + len(audio) / SAMPLE_RATE
+    return [(offset + s.start, min(offset + s.end, chunk_end), s.text.strip(),
+             [(offset + w.start, min(offset + w.end, chunk_end), w.word.strip()) for w in s.words or ()])
+            for s in segments]
+
+
+def _get_pool(init_args, workers):
+    """The shared pool for init_args, replacing one started for another model. Call with _pool_lock held."""
+    global _pool, _pool_key
+    key = (init_args, workers)
+    if _pool is not None and _pool_key != key:
+        _shutdown_pool()
+    if _pool is None:
+        print(f"Starting {workers} transcription worker processes ({init_args[0]}, {init_args[1]})...")
+        started = time.perf_counter()
+        _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context(START_METHOD),
+                                    initializer=_init_worker, initargs=init_args)
+        _pool_key = key
+        try:
+            _start_workers(_pool, workers)
+        except BrokenExecutor:
+            _shutdown_pool()
+            raise
+        metrics.WHISPER_LOAD_SECONDS.observe(time.perf_counter() - started, mode='parallel')
+        print(f"Transcription workers ready in {time.perf_counter() - started:.1f}s.")
+    return _pool
+
+
+def _shutdown_pool():
+    global _pool, _pool_key
+    if _pool is not None:
+        _pool.shutdown(cancel_futures=True)
+    _pool, _pool_key = None, None
+
+
+def release_idle_pool(max_idle=None):
+    """Stops the worker processes, and the models they hold, once unused for max_idle seconds.
+
+    Registered with whisper_registry, so its idle reaper covers the pool too. A pool in use is left alone.
+    """
+    max_idle = whisper_registry.IDLE_TIMEOUT if max_idle is None else max_idle
+    if not _pool_lock.acquire(blocking=False):
+        return False
+    try:
+        if _pool is None or time.monotonic() - _pool_last_used < max_idle:
+            return False
+        _shutdown_pool()
+    finally:
+        _pool_lock.release()
+    print("Released idle parallel transcription workers.")
+    return True
+
+
+whisper_registry.add_release_hook(release_idle_pool)
+
+
+def plan_chunks(speech_timestamps, total_samples, min_chunk_samples):
+    """Splits [0, total_samples) at the midpoints of silences between speech regions.
+
+    A cut is placed at the first silence that is at least min_chunk_samples past the
+    previous cut, so no chunk boundary ever falls inside detected speech.
+    """
+    cuts = [0]
+    for prev, nxt in zip(speech_timestamps, speech_timestamps[1:]):
+        gap_middle = (prev["end"] + nxt["start"]) // 2
+        if gap_middle - cuts[-1] >= min_chunk_samples:
+            cuts.append(gap_middle)
+    # Fold a short tail into the previous chunk rather than transcribing a sliver.
+    if len(cuts) > 1 and total_samples - cuts[-1] < min_chunk_samples // 2:
+        cuts.pop()
+    cuts.append(total_samples)
+    return list(zip(cuts, cuts[1:]))
+
+
+def transcribe(media_path, lang_code=None, options=None, progress=None, workers=None, youtube_id=None, profile=None):
+    """Transcribes a file by splitting it at silences and running the chunks in the shared process pool.
+
+    With a youtube_id the audio comes from the PCM cache and workers memory-map their own
+    chunk from it; otherwise the file is decoded here and chunks are sent to the workers.
+    Returns (language, [(start, end, text, words), ...]) with timestamps relative to the whole file
+    (words is a list of (start, end, text), empty unless options ask for word_timestamps),
+    or None when the clip is too short (or there's only one worker) so the caller should
+    use the single-pass path instead. profile picks the model; its thread count is split
+    between the workers.
+    """
+    import numpy as np
+    from faster_whisper.vad import VadOptions, get_speech_timestamps
+
+    workers = workers or WORKERS
+    if workers < 2:
+        return None
+
+    if youtube_id:
+        audio = audio_cache.get_audio(youtube_id, media_path)
+        pcm_path = os.path.abspath(audio_cache.pcm_path(youtube_id))
+    else:
+        from faster_whisper import decode_audio
+
+        audio = decode_audio(media_path, sampling_rate=SAMPLE_RATE)
+        pcm_path = None
+    duration = len(audio) / SAMPLE_RATE
+    if duration < MIN_DURATION:
+        return None
+
+    # Transcription time covers the VAD split and the chunk work, but not decoding or starting the
+    # workers (their model loads go to the load histogram), so the real-time factor compares with the serial path.
+    started = time.perf_counter()
+    speech = get_speech_timestamps(np.asarray(audio), VadOptions(min_silence_duration_ms=500))
+    # Aim for a couple of chunks per worker so a slow chunk doesn't leave the others idle.
+    chunk_seconds = max(MIN_CHUNK_SECONDS, duration / (workers * 2))
+    chunks = plan_chunks(speech, len(audio), int(chunk_seconds * SAMPLE_RATE))
+    split_seconds = time.perf_counter() - started
+    if len(chunks) < 2:
+        return None
+
+    cpu_threads = max(1, ((profile and profile.cpu_threads) or os.cpu_count() or workers) // workers)
+    init_args = (profile.model_size if profile else whisper_registry.DEFAULT_MODEL_SIZE,
+                 profile.compute_type if profile else whisper_registry.DEFAULT_COMPUTE_TYPE,
+                 whisper_registry.DEFAULT_DEVICE, cpu_threads)
+
+    def source(start, end):
+        return pcm_path if pcm_path else audio[start:end]
+
+    global _pool_last_used
+    with _pool_lock:
+        pool = _get_pool(init_args, workers)
+        started = time.perf_counter()
+        print(f"Transcribing {duration:.0f}s of audio in {len(chunks)} chunks across {workers} workers...")
+        try:
+            language = lang_code
+            if not language:
+                first_start, first_end = chunks[0]
+                language = pool.submit(_detect_language, source(first_start, first_end), first_start, first_end).result()
+
+            futures = {
+                pool.submit(_transcribe_chunk, source(start, end), start, end, language, options or {}): index
+                for index, (start, end) in enumerate(chunks)
+            }
+            results = [None] * len(chunks)
+            done_seconds = 0.0
+            for future in as_completed(futures):
+                index = futures[future]
+                results[index] = future.result()
+                start, end = chunks[index]
+                done_seconds += (end - start) / SAMPLE_RATE
+                if progress:
+                    progress('transcribing', 100.0 * done_seconds / duration)
+        except BrokenExecutor:
+            # A worker died (out of memory, usually); start a fresh pool next time
+            _shutdown_pool()
+            raise
+        finally:
+            _pool_last_used = time.monotonic()
+
+    segments = [segment for chunk_segments in results for segment in chunk_segments]
+    metrics.observe_transcription('parallel', split_seconds + time.perf_counter() - started, duration)
+    return language, segments
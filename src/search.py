@@ -0,0 +1,118 @@
+import os
+import re
+import glob
+from markupsafe import escape
+import database
+from .srt import parse_subtitle_filename
+from . import subtitle_store
+
+RESULT_LIMIT = 50
+
+
+def _track_files(youtube_id, video_folder):
+    tracks = {}
+    for srt_path in glob.glob(os.path.join(video_folder, f'{youtube_id}.*.srt')):
+        parsed = parse_subtitle_filename(os.path.basename(srt_path))
+        if parsed and parsed[0] == youtube_id:
+            tracks[parsed[1]] = srt_path
+    return tracks
+
+
+def sync_video(youtube_id, video_folder):
+    """Re-indexes the subtitle tracks of one video whose files were added, changed or removed."""
+    tracks = _track_files(youtube_id, video_folder)
+    conn = database.get_connection()
+    try:
+        indexed = {row['lang_code']: row['mtime'] for row in conn.execute(
+            "SELECT lang_code, mtime FROM search_tracks WHERE youtube_id = ?", (youtube_id,)
+        )}
+        changed = 0
+        with conn:
+            for lang_code in indexed.keys() - tracks.keys():
+                conn.execute("DELETE FROM cues WHERE youtube_id = ? AND lang_code = ?", (youtube_id, lang_code))
+                conn.execute("DELETE FROM search_tracks WHERE youtube_id = ? AND lang_code = ?", (youtube_id, lang_code))
+                changed += 1
+            for lang_code, srt_path in tracks.items():
+                mtime = os.path.getmtime(srt_path)
+                if indexed.get(lang_code) == mtime:
+                    continue
+                conn.execute("DELETE FROM cues WHERE youtube_id = ? AND lang_code = ?", (youtube_id, lang_code))
+                conn.executemany(
+                    "INSERT INTO cues (youtube_id, lang_code, start, end, text) VALUES (?, ?, ?, ?, ?)",
+                    [(youtube_id, lang_code, cue.start, cue.end, cue.text.replace('\n', ' ')) for cue in subtitle_store.read_cues(srt_path)]
+                )
+                conn.execute(
+                    "INSERT OR REPLACE INTO search_tracks (youtube_id, lang_code, mtime) VALUES (?, ?, ?)",
+                    (youtube_id, lang_code, mtime)
+                )
+                changed += 1
+    finally:
+        conn.close()
+    return changed
+
+
+def remove_video(youtube_id):
+    conn = database.get_connection()
+    try:
+        with conn:
+            conn.execute("DELETE FROM cues WHERE youtube_id = ?", (youtube_id,))
+            conn.execute("DELETE FROM search_tracks WHERE youtube_id = ?", (youtube_id,))
+    finally:
+        conn.close()
+
+
+def backfill(video_folder):
+    """Indexes catalog videos that have never been indexed, e.g. right after the catalog migration."""
+    conn = database.get_connection()
+    try:
+        missing = [row['youtube_id'] for row in conn.execute(
+            "SELECT youtube_id FROM videos WHERE youtube_id NOT IN (SELECT DISTINCT youtube_id FROM search_tracks)"
+        )]
+    finally:
+        conn.close()
+    indexed = sum(1 for youtube_id in missing if sync_video(youtube_id, video_folder))
+    if indexed:
+        print(f"✅ Indexed subtitles of {indexed} videos for search.")
+    return indexed
+
+
+def to_fts_query(text):
+    """Turns free text into an FTS5 query: every word must match, the last one as a prefix."""
+    words = re.findall(r'\w+', text, flags=re.UNICODE)
+    if not words:
+        return None
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += '*'
+    return ' '.join(terms)
+
+
+def search(text, limit=RESULT_LIMIT):
+    """Returns {'videos': [...], 'cues': [...]} ranked by relevance."""
+    query = to_fts_query(text)
+    if not query:
+        return {'videos': [], 'cues': []}
+    conn = database.get_connection()
+    try:
+        videos = conn.execute(
+            "SELECT v.youtube_id, v.title FROM title_search "
+            "JOIN videos v ON v.id = title_search.rowid "
+            "WHERE title_search MATCH ? ORDER BY rank LIMIT ?",
+            (query, limit)
+        ).fetchall()
+        cues = conn.execute(
+            "SELECT c.youtube_id, c.lang_code, c.start, c.end, c.text, "
+            "snippet(cue_search, 0, char(2), char(3), '…', 16) AS snippet, v.title "
+            "FROM cue_search JOIN cues c ON c.id = cue_search.rowid "
+            "JOIN videos v ON v.youtube_id = c.youtube_id "
+            "WHERE cue_search MATCH ? ORDER BY rank LIMIT ?",
+            (query, limit)
+        ).fetchall()
+    finally:
+        conn.close()
+    cue_results = []
+    for row in cues:
+        cue = dict(row)
+        # Escape the subtitle text first, then turn the match markers into <mark> tags
+        cue['snippet'] = str(escape(cue['snippet'])).replace('\x02', '<mark>').replace('\x03', '</mark>')
+        cue_results.append(cue)
+    return {'videos': [dict(row) for row in videos], 'cues': cue_results}
@@ -0,0 +1,95 @@
+import re
+import datetime
+from typing import NamedTuple
+
+# <youtube_id>.<lang>.srt -- YouTube ids never contain dots, language tags may contain dashes
+_SUBTITLE_FILENAME = re.compile(r'^(?P<youtube_id>[^.]+)\.(?P<lang_code>[A-Za-z0-9_-]+)\.srt$')
+
+
+class Cue(NamedTuple):
+    start: float
+    end: float
+    text: str
+
+
+def format_timestamp(seconds: float):
+    """Converts seconds into SRT time format HH:MM:SS,ms"""
+    td = datetime.timedelta(seconds=seconds)
+    total_seconds = int(td.total_seconds())
+    hours, remainder = divmod(total_seconds, 3600)
+    minutes, seconds = divmod(remainder, 60)
+    milliseconds = int(td.microseconds / 1000)
+    return f"{hours:02}:{minutes:02}:{seconds:02},{milliseconds:03}"
+
+
+def parse_timestamp(time_str: str) -> float:
+    """Converts an SRT timestamp (HH:MM:SS,ms) into seconds."""
+    hms, _, ms = time_str.strip().replace('.', ',').partition(',')
+    hours, minutes, seconds = hms.split(':')
+    return int(hours) * 3600 + int(minutes) * 60 + int(seconds) + int(ms or 0) / 1000
+
+
+def parse_srt(srt_text: str) -> list[Cue]:
+    """Parses SRT text into cues, tolerating missing indices and stray blank lines."""
+    cues = []
+    lines = srt_text.strip().replace('\r', '').split('\n')
+    i = 0
+    while i < len(lines):
+        if '-->' not in lines[i]:
+            i += 1
+            continue
+        start_str, _, end_str = lines[i].partition('-->')
+        text_lines = []
+        i += 1
+        while i < len(lines) and lines[i].strip() and '-->' not in lines[i]:
+            # Skip a stray index line belonging to the next cue
+            if not lines[i].strip().isdigit():
+                text_lines.append(lines[i].strip())
+            i += 1
+        try:
+            cues.append(Cue(parse_timestamp(start_str), parse_timestamp(end_str.split()[0]), '\n'.join(text_lines)))
+        except (ValueError, IndexError):
+            continue
+    return cues
+
+
+def parse_subtitle_filename(filename):
+    """Returns (youtube_id, lang_code) for a '<youtube_id>.<lang>.srt' filename, or None."""
+    match = _SUBTITLE_FILENAME.match(filename)
+    if not match:
+        return None
+    return match.group('youtube_id'), match.group('lang_code')
+
+
+def align_tracks(primary, secondary):
+    """Pairs every primary cue with the first secondary cue overlapping it, in one sweep.
+
+    Both lists must be sorted by start time. Returns a list of (primary_cue, secondary_cue or None).
+    """
+    pairs = []
+    first = 0
+    for cue in primary:
+        # Secondary cues that ended before this cue starts end before every later one starts too
+        while first < len(secondary) and secondary[first].end <= cue.start:
+            first += 1
+        match = None
+        candidate = first
+        while candidate < len(secondary) and secondary[candidate].start < cue.end:
+            if secondary[candidate].end > cue.start:
+                match = secondary[candidate]
+                break
+            candidate += 1
+        pairs.append((cue, match))
+    return pairs
+
+
+def read_srt(srt_path) -> list[Cue]:
+    with open(srt_path, 'r', encoding='utf-8') as f:
+        return parse_srt(f.read())
+
+
+def write_srt(srt_path, segments):
+    """Writes (start, end, text) tuples as a numbered SRT file."""
+    with open(srt_path, "w", encoding="utf-8") as srt_file:
+        for i, (start, end, text) in enumerate(segments):
+            srt_file.write(f"{i + 1}\n{format_timestamp(start)} --> {format_timestamp(end)}\n{text}\n\n")
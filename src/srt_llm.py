@@ -0,0 +1,140 @@
+import os
+import json
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pydantic import BaseModel
+from . import metrics
+
+WINDOW_SIZE = int(os.environ.get("LLM_WINDOW_SIZE", "40"))
+WINDOW_OVERLAP = int(os.environ.get("LLM_WINDOW_OVERLAP", "5"))
+MAX_CONCURRENCY = int(os.environ.get("LLM_MAX_CONCURRENCY", "4"))
+MAX_ATTEMPTS = 3
+
+# Caps window requests in flight across the whole process, however many passes, languages
+# and ingests are running; their thread pools only decide who queues for a slot.
+_request_slots = threading.BoundedSemaphore(max(1, MAX_CONCURRENCY))
+
+
+class CueText(BaseModel):
+    index: int
+    text: str
+
+
+class CueBatch(BaseModel):
+    cues: list[CueText]
+
+
+class SrtProcessingError(Exception):
+    """Raised when some windows still fail validation after every retry.
+
+    `cues` holds the result with those windows left at their original text, for callers
+    that would rather keep going than fail the pass.
+    """
+
+    def __init__(self, message, cues=None):
+        super().__init__(message)
+        self.cues = cues
+
+
+def make_windows(cue_count, window_size=WINDOW_SIZE, overlap=WINDOW_OVERLAP):
+    """Returns (context_start, own_start, own_end, context_end) index ranges covering every cue once.
+
+    Each window owns [own_start, own_end) and additionally shows up to `overlap` cues on
+    either side as read-only context, so lines at a window edge keep their neighbours.
+    """
+    windows = []
+    for own_start in range(0, cue_count, window_size):
+        own_end = min(own_start + window_size, cue_count)
+        windows.append((max(0, own_start - overlap), own_start, own_end, min(cue_count, own_end + overlap)))
+    return windows
+
+
+def _build_prompt(instruction, cues, window):
+    context_start, own_start, own_end, context_end = window
+
+    def listing(start, end):
+        return "\n".join(json.dumps({"index": i + 1, "text": cues[i].text}, ensure_ascii=False) for i in range(start, end))
+
+    parts = [instruction, ""]
+    if context_start < own_start:
+        parts += ["--- PRECEDING LINES (context only, do not return) ---", listing(context_start, own_start), ""]
+    parts += ["--- LINES TO PROCESS ---", listing(own_start, own_end), ""]
+    if own_end < context_end:
+        parts += ["--- FOLLOWING LINES (context only, do not return) ---", listing(own_end, context_end), ""]
+    parts.append(
+        f"Return a JSON object with a 'cues' list holding exactly one entry per line to process, "
+        f"indices {own_start + 1} to {own_end}, each with its 'index' and the resulting 'text'. "
+        "Keep one output line per input line; never merge, split or drop lines."
+    )
+    return "\n".join(parts)
+
+
+def _process_window(instruction, cues, window, client, model_name):
+    """Runs one window through the LLM and returns {cue position: text}, or raises ValueError."""
+    _, own_start, own_end, _ = window
+    with _request_slots, metrics.LLM_REQUEST_SECONDS.time(operation='subtitle_window', outcome='error') as labels:
+        response = client.models.generate_content(
+            model=model_name,
+            contents=_build_prompt(instruction, cues, window),
+            config={
+                'temperature': 0.0,
+                'response_mime_type': "application/json",
+                'response_schema': CueBatch,
+            }
+        )
+        labels['outcome'] = 'ok'
+    batch = CueBatch.model_validate(json.loads(response.text))
+
+    texts = {}
+    for cue in batch.cues:
+        position = cue.index - 1
+        if not own_start <= position < own_end:
+            raise ValueError(f"unexpected cue index {cue.index}")
+        if position in texts:
+            raise ValueError(f"cue index {cue.index} returned twice")
+        texts[position] = cue.text.strip()
+    missing = own_end - own_start - len(texts)
+    if missing:
+        raise ValueError(f"{missing} cue(s) missing from the response")
+    return texts
+
+
+def process_cues(cues, instruction, client, model_name, window_size=WINDOW_SIZE, overlap=WINDOW_OVERLAP,
+                 max_concurrency=MAX_CONCURRENCY, max_attempts=MAX_ATTEMPTS):
+    """Rewrites the text of every cue with the LLM, window by window, in parallel.
+
+    At most max_concurrency windows of this call are queued at once; what actually reaches the
+    API is limited by LLM_MAX_CONCURRENCY for the whole process.
+
+    Only the text is ever taken from the model; start/end times come from the input cues,
+    so the result always has the same count and timestamps. Windows whose response fails
+    validation are retried on their own; SrtProcessingError is raised if any still fail,
+    carrying the cues with those windows' original text.
+    """
+    windows = make_windows(len(cues), window_size, overlap)
+    results = {}
+    pending = list(windows)
+    errors = {}
+
+    with ThreadPoolExecutor(max_workers=max(1, max_concurrency)) as pool:
+        for attempt in range(max_attempts):
+            if attempt:
+                time.sleep(2 ** attempt)
+                print(f"Retrying {len(pending)} failed window(s) (attempt {attempt + 1}/{max_attempts})...")
+            futures = {pool.submit(_process_window, instruction, cues, w, client, model_name): w for w in pending}
+            pending = []
+            for future, window in futures.items():
+                try:
+                    results.update(future.result())
+                except Exception as e:
+                    errors[window] = e
+                    pending.append(window)
+            if not pending:
+                break
+
+    processed = [cue._replace(text=results[i]) if i in results else cue for i, cue in enumerate(cues)]
+    if pending:
+        details = "; ".join(f"cues {w[1] + 1}-{w[2]}: {errors[w]}" for w in pending)
+        raise SrtProcessingError(f"{len(pending)} window(s) failed after {max_attempts} attempts ({details})", processed)
+    return processed
@@ -0,0 +1,116 @@
+document.addEventListener('DOMContentLoaded', () => {
+    const cardEl = document.getElementById('card');
+    const lang = cardEl.dataset.lang;
+    const dueUrl = cardEl.dataset.dueUrl;
+    const showAnswerBtn = document.getElementById('show-answer');
+    const gradeBtns = [...document.querySelectorAll('.grade')];
+    const dueCountEl = document.getElementById('due-count');
+
+    // Cards are fetched a batch ahead so grading never waits on the network
+    const BATCH_SIZE = 20;
+    const PREFETCH_BELOW = 5;
+    const queue = [];
+    const held = new Set();
+    let current = null;
+    let revealed = false;
+    let fetching = null;
+    let exhausted = false;
+    let dueCount = parseInt(dueCountEl.textContent, 10) || 0;
+
+    function escapeHtml(text) {
+        const div = document.createElement('div');
+        div.textContent = text;
+        return div.innerHTML;
+    }
+
+    async function fetchBatch() {
+        if (fetching || exhausted) return fetching;
+        const params = new URLSearchParams({ limit: BATCH_SIZE, exclude: [...held].join(',') });
+        if (lang) params.set('lang', lang);
+        fetching = (async () => {
+            try {
+                const response = await fetch(`${dueUrl}?${params}`);
+                const { cards } = await response.json();
+                cards.forEach(card => {
+                    if (held.has(card.word_id)) return;
+                    held.add(card.word_id);
+                    queue.push(card);
+                });
+                exhausted = cards.length < BATCH_SIZE;
+            } finally {
+                fetching = null;
+            }
+        })();
+        return fetching;
+    }
+
+    function setVisible(el, visible) { el.classList.toggle('hidden', !visible); }
+
+    async function showNext() {
+        if (queue.length < PREFETCH_BELOW) {
+            const pending = fetchBatch();
+            if (!queue.length && pending) await pending;
+        }
+        current = queue.shift() || null;
+        revealed = false;
+        setVisible(document.getElementById('card-empty'), !current);
+        setVisible(document.getElementById('card-front'), !!current);
+        setVisible(document.getElementById('card-answer'), false);
+        setVisible(showAnswerBtn, !!current);
+        gradeBtns.forEach(btn => setVisible(btn, false));
+        if (!current) return;
+
+        document.getElementById('card-word').textContent = current.word;
+        const context = escapeHtml(current.context);
+        const word = escapeHtml(current.word);
+        document.getElementById('card-context').innerHTML = context.split(word).join(`<mark>${word}</mark>`);
+        document.getElementById('card-definition').textContent = current.definition;
+        const clip = document.getElementById('card-clip');
+        setVisible(clip, !!current.clip_url);
+        if (current.clip_url) clip.href = current.clip_url;
+    }
+
+    function showAnswer() {
+        if (!current) return;
+        revealed = true;
+        setVisible(document.getElementById('card-answer'), true);
+        setVisible(showAnswerBtn, false);
+        gradeBtns.forEach(btn => setVisible(btn, true));
+    }
+
+    async function grade(name) {
+        if (!current || !revealed) return;
+        const card = current;
+        showNext();
+        try {
+            const response = await fetch(`/api/flashcards/${card.word_id}/review`, {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify({ grade: name }),
+            });
+            const result = await response.json();
+            held.delete(card.word_id);
+            if (result.due * 1000 > Date.now()) {
+                dueCount = Math.max(0, dueCount - 1);
+                dueCountEl.textContent = `${dueCount} due`;
+            }
+            // An "again" card is due again in a few minutes; let the next batch bring it back
+            if (name === 'again') exhausted = false;
+        } catch (error) {
+            console.error('Could not record review:', error);
+        }
+    }
+
+    showAnswerBtn.addEventListener('click', showAnswer);
+    gradeBtns.forEach(btn => btn.addEventListener('click', () => grade(btn.dataset.grade)));
+    document.addEventListener('keydown', event => {
+        if (event.key === ' ') {
+            event.preventDefault();
+            showAnswer();
+        } else if (['1', '2', '3', '4'].includes(event.key)) {
+            grade(gradeBtns[parseInt(event.key, 10) - 1].dataset.grade);
+        }
+    });
+
+    showNext();
+});
@@ -4,92 +4,214 @@ document.addEventListener('DOMContentLoaded', function() {
     const lang1Select = document.getElementById('lang1-select');
     const lang2Select = document.getElementById('lang2-select');
     const lyricsPane = document.getElementById('lyrics-pane');
+    const lyricsTrack = document.getElementById('lyrics-track');
     const loopToggleBtn = document.getElementById('loop-toggle');
     const popup = document.getElementById('definition-popup');
     const popupWord = document.getElementById('popup-word');
     const popupDefinition = document.getElementById('popup-definition');
     const popupCloseBtn = document.getElementById('popup-close');
     const popupSaveBtn = document.getElementById('popup-save');
+    const youtubeId = document.getElementById('player-layout').dataset.youtubeId;
 
     // --- State Variables ---
     let isLooping = false;
     let activeBlockForLoop = null;
-    let subtitles1 = [];
-    let subtitles2 = [];
     let combinedSubtitles = [];
+    let activeIndex = -1;
+    let syncFrame = null;
+    let definitionRequestId = 0;
+    let sungBlock = -1;
+    let sungWord = -1;
+
+    // --- Virtual Scrolling State ---
+    const ESTIMATED_BLOCK_HEIGHT = 110;
+    const RENDER_MARGIN = 600; // px rendered above and below the visible area
+    const renderedBlocks = new Map(); // block index -> element
+    let blockHeights = new Float64Array(0);
+    let blockOffsets = new Float64Array(1);
+    let offsetsDirty = false;
+    let renderPending = false;
 
     // --- Core Functions ---
     async function handleLanguageChange() {
-        await loadSubtitles(lang1Select.value, subtitles1);
-        await loadSubtitles(lang2Select.value, subtitles2);
-        combineAndDisplaySubtitles();
+        let blocks = [];
+        if (lang1Select.value) {
+            // The server parses and aligns both tracks, so we only render here
+            const params = new URLSearchParams({ lang1: lang1Select.value, lang2: lang2Select.value });
+            try {
+                const response = await fetch(`/api/subtitles/${encodeURIComponent(youtubeId)}?${params}`);
+                if (!response.ok) throw new Error(`HTTP ${response.status}`);
+                blocks = (await response.json()).blocks;
+            } catch (error) {
+                console.error('Error loading subtitles:', error);
+            }
+        }
+        displaySubtitles(blocks);
     }
 
-    async function loadSubtitles(url, subtitleArray) {
-        subtitleArray.length = 0;
-        if (!url) return;
-        try {
-            const response = await fetch(url);
-            const srtText = await response.text();
-            subtitleArray.push(...parseSRT(srtText));
-        } catch (error) {
-            console.error('Error loading subtitles:', error);
-        }
+    function displaySubtitles(blocks) {
+        combinedSubtitles = blocks.map((aligned, index) => ({
+            id: `block-${index}`,
+            start: aligned.start,
+            end: aligned.end,
+            text1: aligned.text1.replace(/\n/g, '<br>'),
+            text2: aligned.text2.replace(/\n/g, '<br>'),
+            words1: aligned.words1 || null,
+        }));
+        activeIndex = -1;
+        sungBlock = -1;
+        sungWord = -1;
+        activeBlockForLoop = null;
+        blockHeights = new Float64Array(combinedSubtitles.length).fill(ESTIMATED_BLOCK_HEIGHT);
+        blockOffsets = new Float64Array(combinedSubtitles.length + 1);
+        offsetsDirty = true;
+
+        renderedBlocks.forEach(div => div.remove());
+        renderedBlocks.clear();
+        lyricsPane.scrollTop = 0;
+        renderVisibleBlocks();
+        syncLyrics();
     }
-    
-    function combineAndDisplaySubtitles() {
-        lyricsPane.innerHTML = '';
-        combinedSubtitles.length = 0;
-        subtitles1.forEach((sub1, index) => {
-            const sub2 = subtitles2.find(s => sub1.start < s.end && sub1.end > s.start);
-            const block = {
-                id: `block-${index}`,
-                start: sub1.start,
-                end: sub1.end,
-                text1: sub1.text,
-                text2: sub2 ? sub2.text : '',
-            };
-            combinedSubtitles.push(block);
-
-            const blockDiv = document.createElement('div');
-            blockDiv.className = 'lyric-block';
-            blockDiv.id = block.id;
-
-            const p1 = document.createElement('p');
-            p1.className = 'caption-line lang1';
-            p1.dataset.lang = lang1Select.selectedOptions[0].textContent;
-            p1.innerHTML = wrapWordsInSpans(block.text1);
-            
-            // --- UPDATED: Add a check before seeking ---
-            p1.onclick = () => {
-                // Only seek if the current time is outside this subtitle's range
+
+    function createBlockElement(block, index) {
+        const blockDiv = document.createElement('div');
+        blockDiv.className = 'lyric-block';
+        blockDiv.id = block.id;
+
+        const p1 = document.createElement('p');
+        p1.className = 'caption-line lang1';
+        p1.dataset.lang = lang1Select.selectedOptions[0].textContent;
+        p1.innerHTML = wrapWordsInSpans(block.text1);
+        
+        // --- UPDATED: Add a check before seeking ---
+        p1.onclick = () => {
+            // Only seek if the current time is outside this subtitle's range
+            if (player.currentTime < block.start || player.currentTime >= block.end) {
+                player.currentTime = block.start;
+            }
+        };
+        blockDiv.appendChild(p1);
+
+        if (block.text2) {
+            const p2 = document.createElement('p');
+            p2.className = 'caption-line lang2';
+            p2.dataset.lang = lang2Select.selectedOptions[0].textContent;
+            p2.innerHTML = wrapWordsInSpans(block.text2);
+            // --- UPDATED: Add the same check here ---
+            p2.onclick = () => {
                 if (player.currentTime < block.start || player.currentTime >= block.end) {
                     player.currentTime = block.start;
                 }
             };
-            blockDiv.appendChild(p1);
-
-            if (block.text2) {
-                const p2 = document.createElement('p');
-                p2.className = 'caption-line lang2';
-                p2.dataset.lang = lang2Select.selectedOptions[0].textContent;
-                p2.innerHTML = wrapWordsInSpans(block.text2);
-                // --- UPDATED: Add the same check here ---
-                p2.onclick = () => {
-                    if (player.currentTime < block.start || player.currentTime >= block.end) {
-                        player.currentTime = block.start;
-                    }
-                };
-                blockDiv.appendChild(p2);
+            blockDiv.appendChild(p2);
+        }
+        if (index === activeIndex) setBlockHighlight(blockDiv, true);
+        return blockDiv;
+    }
+
+    // --- Virtual Scrolling ---
+    // Only the blocks near the visible part of the pane exist in the DOM. Each block is
+    // absolutely positioned at its offset; heights start as estimates and are replaced by
+    // measurements as blocks get rendered.
+    function updateOffsets() {
+        if (!offsetsDirty) return;
+        for (let i = 0; i < blockHeights.length; i++) {
+            blockOffsets[i + 1] = blockOffsets[i] + blockHeights[i];
+        }
+        lyricsTrack.style.height = `${blockOffsets[blockHeights.length]}px`;
+        offsetsDirty = false;
+    }
+
+    function blockIndexAtOffset(offset) {
+        // Last block whose top is at or above the offset
+        let low = 0, high = blockHeights.length - 1, found = 0;
+        while (low <= high) {
+            const mid = (low + high) >> 1;
+            if (blockOffsets[mid] <= offset) { found = mid; low = mid + 1; } else { high = mid - 1; }
+        }
+        return found;
+    }
+
+    function renderVisibleBlocks() {
+        if (!combinedSubtitles.length) {
+            lyricsTrack.style.height = '0px';
+            return;
+        }
+        updateOffsets();
+        const viewTop = lyricsPane.scrollTop - RENDER_MARGIN;
+        const viewBottom = lyricsPane.scrollTop + lyricsPane.clientHeight + RENDER_MARGIN;
+        const first = blockIndexAtOffset(Math.max(0, viewTop));
+        const last = blockIndexAtOffset(viewBottom);
+
+        renderedBlocks.forEach((div, index) => {
+            if (index < first || index > last) {
+                div.remove();
+                renderedBlocks.delete(index);
+            }
+        });
+
+        const added = [];
+        for (let i = first; i <= last; i++) {
+            if (!renderedBlocks.has(i)) {
+                const div = createBlockElement(combinedSubtitles[i], i);
+                div.style.top = `${blockOffsets[i]}px`;
+                lyricsTrack.appendChild(div);
+                renderedBlocks.set(i, div);
+                added.push(i);
             }
-            lyricsPane.appendChild(blockDiv);
+        }
+
+        // One layout read for all new blocks, then fix up positions if estimates were off
+        let changed = false;
+        added.forEach(i => {
+            const height = renderedBlocks.get(i).offsetHeight;
+            if (height !== blockHeights[i]) {
+                blockHeights[i] = height;
+                changed = true;
+            }
+        });
+        if (changed) {
+            offsetsDirty = true;
+            updateOffsets();
+            renderedBlocks.forEach((div, index) => { div.style.top = `${blockOffsets[index]}px`; });
+        }
+    }
+
+    function scheduleRender() {
+        if (renderPending) return;
+        renderPending = true;
+        requestAnimationFrame(() => {
+            renderPending = false;
+            renderVisibleBlocks();
         });
     }
 
     // --- Synchronization, Scrolling, and Looping ---
+    function findActiveIndex(time) {
+        // Binary search for the last block starting at or before `time`
+        let low = 0, high = combinedSubtitles.length - 1, found = -1;
+        while (low <= high) {
+            const mid = (low + high) >> 1;
+            if (combinedSubtitles[mid].start <= time) { found = mid; low = mid + 1; } else { high = mid - 1; }
+        }
+        return found !== -1 && time < combinedSubtitles[found].end ? found : -1;
+    }
+
+    function setBlockHighlight(blockDiv, on) {
+        blockDiv.querySelectorAll('.caption-line').forEach(p => p.classList.toggle('highlight', on));
+    }
+
+    function scrollToBlock(index) {
+        updateOffsets();
+        const target = blockOffsets[index] + blockHeights[index] / 2 - lyricsPane.clientHeight / 2;
+        lyricsPane.scrollTop = Math.max(0, target);
+        renderVisibleBlocks();
+    }
+
     function syncLyrics() {
         const currentTime = player.currentTime;
-        const activeBlock = combinedSubtitles.find(b => currentTime >= b.start && currentTime < b.end);
+        const newIndex = findActiveIndex(currentTime);
+        const activeBlock = newIndex !== -1 ? combinedSubtitles[newIndex] : null;
 
         if (activeBlock) {
             activeBlockForLoop = activeBlock;
@@ -100,20 +222,50 @@ document.addEventListener('DOMContentLoaded', function() {
             player.play();
             return;
         }
-        
-        lyricsPane.querySelectorAll('.caption-line').forEach(p => p.classList.remove('highlight'));
-        
-        if (activeBlock) {
-            const activeBlockDiv = document.getElementById(activeBlock.id);
-            if (activeBlockDiv) {
-                activeBlockDiv.querySelectorAll('.caption-line').forEach(p => p.classList.add('highlight'));
-                const paneRect = lyricsPane.getBoundingClientRect();
-                const blockRect = activeBlockDiv.getBoundingClientRect();
-                const scrollOffset = (blockRect.top - paneRect.top) - (paneRect.height / 2) + (blockRect.height / 2);
-                lyricsPane.scrollTop += scrollOffset;
-            }
+
+        syncWords(newIndex, currentTime);
+        if (newIndex === activeIndex) return;
+
+        // Only the previously and newly active blocks are touched
+        const previousDiv = renderedBlocks.get(activeIndex);
+        if (previousDiv) setBlockHighlight(previousDiv, false);
+        activeIndex = newIndex;
+        if (activeIndex !== -1) {
+            scrollToBlock(activeIndex);
+            const activeDiv = renderedBlocks.get(activeIndex);
+            if (activeDiv) setBlockHighlight(activeDiv, true);
         }
     }
+
+    // Karaoke: with word timings from the transcription, the word being sung is highlighted.
+    // Only used while the line still has one word per timing (the LLM pass may have rewritten it).
+    function syncWords(index, time) {
+        const words = index !== -1 ? combinedSubtitles[index].words1 : null;
+        const wordIndex = words ? words.findIndex(([start, end]) => time >= start && time < end) : -1;
+        if (index === sungBlock && wordIndex === sungWord) return;
+
+        const previous = renderedBlocks.get(sungBlock);
+        if (previous) previous.querySelectorAll('.clickable-word.sung').forEach(span => span.classList.remove('sung'));
+        sungBlock = index;
+        sungWord = wordIndex;
+        const blockDiv = renderedBlocks.get(index);
+        if (wordIndex === -1 || !blockDiv) return;
+        const spans = blockDiv.querySelectorAll('.lang1 .clickable-word');
+        if (spans.length === words.length) spans[wordIndex].classList.add('sung');
+    }
+
+    function syncLoop() {
+        syncLyrics();
+        if (!player.paused && !player.ended) {
+            syncFrame = requestAnimationFrame(syncLoop);
+        } else {
+            syncFrame = null;
+        }
+    }
+
+    function startSyncLoop() {
+        if (syncFrame === null) syncFrame = requestAnimationFrame(syncLoop);
+    }
     
     // --- Helper Functions ---
     function wrapWordsInSpans(text) {
@@ -126,54 +278,20 @@ document.addEventListener('DOMContentLoaded', function() {
     }
 
 
-    function parseSRT(srtText) {
-        const subs = [];
-        // Normalize line endings and split by ANY newline
-        const lines = srtText.trim().replace(/\r/g, '').split('\n');
-        
-        let i = 0;
-        while (i < lines.length) {
-            // Find the start of a block by looking for a line with a timestamp
-            if (lines[i] && lines[i].includes('-->')) {
-                const timestampLine = lines[i];
-                const textLines = [];
-                let j = i + 1; // Start looking for text on the next line
-                
-                // Collect text lines until we hit a blank line or a new timestamp
-                while(j < lines.length && lines[j].trim() !== '' && !lines[j].includes('-->')) {
-                    // Check if the line is just a number (a stray index) and ignore it
-                    if (!lines[j].match(/^\d+$/)) {
-                        textLines.push(lines[j]);
-                    }
-                    j++;
-                }
-                
-                const [startStr, endStr] = timestampLine.split(' --> ');
-                if (startStr && endStr) {
-                    subs.push({
-                        start: srtTimeToSeconds(startStr.trim()),
-                        end: srtTimeToSeconds(endStr.trim()),
-                        text: textLines.join('<br>')
-                    });
-                }
-                i = j; // Move the main index to where we left off
-            } else {
-                i++; // Not a timestamp line, move to the next line
-            }
-        }
-        return subs;
-    }
-    
-    function srtTimeToSeconds(timeStr) {
-        const [hms, ms] = timeStr.split(',');
-        const [h, m, s] = hms.split(':');
-        return parseInt(h) * 3600 + parseInt(m) * 60 + parseInt(s) + parseInt(ms) / 1000;
-    }
-
     // --- Event Listeners ---
     lang1Select.addEventListener('change', handleLanguageChange);
     lang2Select.addEventListener('change', handleLanguageChange);
-    player.addEventListener('timeupdate', syncLyrics);
+    player.addEventListener('play', startSyncLoop);
+    player.addEventListener('seeked', syncLyrics);
+    lyricsPane.addEventListener('scroll', scheduleRender);
+    window.addEventListener('resize', () => {
+        // Wrapping changes with the pane width, so every height has to be measured again
+        blockHeights.fill(ESTIMATED_BLOCK_HEIGHT);
+        offsetsDirty = true;
+        renderedBlocks.forEach(div => div.remove());
+        renderedBlocks.clear();
+        scheduleRender();
+    });
 
     loopToggleBtn.addEventListener('click', () => {
         isLooping = !isLooping;
@@ -185,6 +303,7 @@ document.addEventListener('DOMContentLoaded', function() {
             const clickedWord = event.target.dataset.word;
             const fullSentence = event.target.parentElement.textContent.trim();
             const langCode = event.target.parentElement.dataset.lang;
+            const clickedAt = player.currentTime;
 
             const originalHtml = event.target.parentElement.innerHTML.replace(
                 `<span class="clickable-word" data-word="${clickedWord}">${event.target.textContent}</span>`,
@@ -194,29 +313,50 @@ document.addEventListener('DOMContentLoaded', function() {
             document.getElementById('popup-translated-sentence').textContent = 'Translating sentence...';
             document.getElementById('popup-word-translation').textContent = 'Translating word...';
             popup.classList.remove('popup-hidden');
+            popup.dataset.definition = '';
 
-            try {
+            const clickId = ++definitionRequestId;
+            const fetchDefinition = async (waitForSentence) => {
                 const response = await fetch('/get_definition', {
                     method: 'POST',
                     headers: { 'Content-Type': 'application/json' },
-                    body: JSON.stringify({ word: clickedWord, sentence: fullSentence, lang_code: langCode }),
+                    body: JSON.stringify({
+                        word: clickedWord, sentence: fullSentence, lang_code: langCode, youtube_id: youtubeId,
+                        wait_for_sentence: waitForSentence
+                    }),
                 });
-
                 if (!response.ok) throw new Error('Translation failed');
-                
-                const data = await response.json();
+                return response.json();
+            };
 
-                document.getElementById('popup-translated-sentence').innerHTML = data.sentence_translation;
-                document.getElementById('popup-word-translation').innerHTML = 
-                    `${clickedWord} <span>-></span> ${data.word_translation}`;
-                
+            try {
+                let data = await fetchDefinition(false);
+                if (clickId !== definitionRequestId) return;
+
+                // The word translation usually arrives first; show it while the sentence finishes
+                if (data.word_translation) {
+                    document.getElementById('popup-word-translation').innerHTML =
+                        `${clickedWord} <span>-></span> ${data.word_translation}`;
+                } else {
+                    document.getElementById('popup-word-translation').textContent = '';
+                }
                 popup.dataset.word = clickedWord;
-                popup.dataset.definition = data.word_translation;
+                popup.dataset.definition = data.word_translation || '';
                 popup.dataset.context = fullSentence;
+                popup.dataset.lang = langCode;
+                popup.dataset.timestamp = clickedAt;
+
+                if (data.sentence_pending) {
+                    data = await fetchDefinition(true);
+                    if (clickId !== definitionRequestId) return;
+                }
+                if (!data.sentence_translation) throw new Error('Sentence translation failed');
+                document.getElementById('popup-translated-sentence').innerHTML = data.sentence_translation;
 
             } catch (error) {
+                if (clickId !== definitionRequestId) return;
                 document.getElementById('popup-translated-sentence').textContent = 'Could not translate this line.';
-                document.getElementById('popup-word-translation').textContent = '';
+                if (!popup.dataset.definition) document.getElementById('popup-word-translation').textContent = '';
             }
         }
     });
@@ -224,7 +364,7 @@ document.addEventListener('DOMContentLoaded', function() {
     popupCloseBtn.addEventListener('click', () => popup.classList.add('popup-hidden'));
     
     popupSaveBtn.addEventListener('click', async () => {
-        const { word, definition, context } = popup.dataset;
+        const { word, definition, context, lang, timestamp } = popup.dataset;
 
         if (!definition || definition.includes('...')) {
             alert("Cannot save, no definition found.");
@@ -235,7 +375,9 @@ document.addEventListener('DOMContentLoaded', function() {
             const response = await fetch('/save_word', {
                 method: 'POST',
                 headers: { 'Content-Type': 'application/json' },
-                body: JSON.stringify({ word, definition, context }),
+                body: JSON.stringify({
+                    word, definition, context, lang_code: lang, youtube_id: youtubeId, timestamp: parseFloat(timestamp),
+                }),
             });
             const result = await response.json();
             alert(result.message);
@@ -246,6 +388,14 @@ document.addEventListener('DOMContentLoaded', function() {
 
     handleLanguageChange();
 
+    // Deep links from search results carry the cue start time as ?t=seconds
+    const startAt = parseFloat(new URLSearchParams(window.location.search).get('t'));
+    if (!isNaN(startAt)) {
+        const seekToStart = () => { player.currentTime = startAt; };
+        if (player.readyState >= 1) seekToStart();
+        else player.addEventListener('loadedmetadata', seekToStart, { once: true });
+    }
+
     document.addEventListener('keydown', function(event) {
     const key = event.key.toLowerCase();
 
@@ -0,0 +1,233 @@
+import os
+import sys
+import mmap
+import array
+import struct
+import tempfile
+from bisect import bisect_right
+from typing import NamedTuple
+from .srt import Cue, read_srt, write_srt
+
+# <youtube_id>.<lang>.subs, next to the SRT it was built from:
+#
+#   header    magic 'LSUB', version u16, flags u16, cue count n u32, word count m u32, text bytes u32
+#   cues      start_ms u32[n], end_ms u32[n], text_offset u32[n + 1]
+#   words     (flag 1) start_ms u32[m], end_ms u32[m], cue_first_word u32[n + 1], word_offset u32[m + 1]
+#   text      cue texts, then word texts, UTF-8, addressed by the offset arrays
+#
+# Everything is little-endian and 4-byte aligned, so the arrays are read straight out of an mmap.
+MAGIC = b'LSUB'
+VERSION = 1
+HAS_WORDS = 1
+_HEADER = struct.Struct('<4sHHIII')
+_LITTLE_ENDIAN = sys.byteorder == 'little'
+
+
+class Word(NamedTuple):
+    start: float
+    end: float
+    text: str
+
+
+def store_path(srt_path):
+    return os.path.splitext(srt_path)[0] + '.subs'
+
+
+def _ms(seconds):
+    return max(0, int(round(seconds * 1000)))
+
+
+def _u32(values):
+    data = array.array('I', values)
+    if not _LITTLE_ENDIAN:
+        data.byteswap()
+    return data.tobytes()
+
+
+def assign_words(cues, words):
+    """Groups time-ordered words under the cue their midpoint falls in; words between cues are dropped.
+
+    This is how word timings survive the LLM correction pass: the cue text changes, the timings don't.
+    """
+    grouped = [[] for _ in cues]
+    starts = [cue.start for cue in cues]
+    for word in words:
+        middle = (word.start + word.end) / 2
+        index = bisect_right(starts, middle) - 1
+        if index >= 0 and middle < cues[index].end:
+            grouped[index].append(word)
+    return grouped
+
+
+def write(path, cues, words=None):
+    """Writes cues, and optionally a list of Words per cue, as a .subs file (atomically)."""
+    cue_texts = [cue.text.encode('utf-8') for cue in cues]
+    word_lists = words if words is not None else []
+    flat_words = [word for cue_words in word_lists for word in cue_words]
+    word_texts = [word.text.encode('utf-8') for word in flat_words]
+
+    def offsets(chunks, base=0):
+        result = [base]
+        for chunk in chunks:
+            result.append(result[-1] + len(chunk))
+        return result
+
+    cue_text_bytes = sum(len(text) for text in cue_texts)
+    parts = [
+        _HEADER.pack(MAGIC, VERSION, HAS_WORDS if words is not None else 0, len(cues), len(flat_words), cue_text_bytes),
+        _u32(_ms(cue.start) for cue in cues), _u32(_ms(cue.end) for cue in cues), _u32(offsets(cue_texts)),
+    ]
+    if words is not None:
+        parts += [
+            _u32(_ms(word.start) for word in flat_words), _u32(_ms(word.end) for word in flat_words),
+            _u32(offsets(word_lists)), _u32(offsets(word_texts, cue_text_bytes)),
+        ]
+    parts += cue_texts + word_texts
+
+    # A temp file of its own: read paths rebuild stale stores, so two requests (or two server
+    # workers) can be writing the same track at once
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or '.', prefix=f"{os.path.basename(path)}.", suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(b''.join(parts))
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+class Track:
+    """A memory-mapped .subs file. Opening it reads only the header; cues are decoded on access."""
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._views = []
+        try:
+            magic, version, flags, self._count, self._word_count, text_bytes = _HEADER.unpack_from(self._mmap)
+            if magic != MAGIC or version != VERSION:
+                raise ValueError(f"{path} is not a version {VERSION} subtitle store")
+            position = _HEADER.size
+            n, m = self._count, self._word_count
+            self._starts, position = self._array(position, n)
+            self._ends, position = self._array(position, n)
+            self._text_offsets, position = self._array(position, n + 1)
+            self.has_words = bool(flags & HAS_WORDS)
+            if self.has_words:
+                self._word_starts, position = self._array(position, m)
+                self._word_ends, position = self._array(position, m)
+                self._cue_words, position = self._array(position, n + 1)
+                self._word_offsets, position = self._array(position, m + 1)
+            self._text_start = position
+        except Exception:
+            self.close()
+            raise
+
+    def _array(self, position, count):
+        end = position + 4 * count
+        if _LITTLE_ENDIAN:
+            view = memoryview(self._mmap)[position:end].cast('I')
+            self._views.append(view)
+        else:
+            view = array.array('I', self._mmap[position:end])
+            view.byteswap()
+        return view, end
+
+    def _text(self, start, end):
+        return self._mmap[self._text_start + start:self._text_start + end].decode('utf-8')
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, index):
+        if not 0 <= index < self._count:
+            raise IndexError(index)
+        return Cue(self._starts[index] / 1000, self._ends[index] / 1000,
+                   self._text(self._text_offsets[index], self._text_offsets[index + 1]))
+
+    def __iter__(self):
+        return (self[i] for i in range(self._count))
+
+    def index_at(self, seconds):
+        """Index of the cue showing at `seconds`, or -1; a binary search over the mapped start array."""
+        index = bisect_right(self._starts, _ms(seconds)) - 1
+        return index if index >= 0 and _ms(seconds) < self._ends[index] else -1
+
+    def words(self, index):
+        """The Words of one cue ([] when the track was stored without word timings)."""
+        if not self.has_words:
+            return []
+        return [Word(self._word_starts[w] / 1000, self._word_ends[w] / 1000, self._text(self._word_offsets[w], self._word_offsets[w + 1]))
+                for w in range(self._cue_words[index], self._cue_words[index + 1])]
+
+    def close(self):
+        for view in self._views:
+            view.release()
+        self._views = []
+        self._mmap.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def save(srt_path, cues, words=None):
+    """Writes the .subs next to an SRT that was just written from the same cues.
+
+    words is either a list of Words per cue, or a flat time-ordered list to group by time.
+    """
+    if words is not None and (not words or isinstance(words[0], Word)):
+        words = assign_words(cues, words)
+    write(store_path(srt_path), cues, words)
+
+
+def _is_fresh(path, srt_path):
+    try:
+        return os.path.getmtime(path) >= os.path.getmtime(srt_path)
+    except OSError:
+        return False
+
+
+def sync(srt_path):
+    """Rebuilds the .subs when the SRT is newer (an edit or the correction pass). Returns its path.
+
+    Word timings from the previous .subs are carried over and regrouped under the new cues.
+    """
+    path = store_path(srt_path)
+    if _is_fresh(path, srt_path):
+        return path
+    words = None
+    if os.path.exists(path):
+        try:
+            with Track(path) as old:
+                if old.has_words:
+                    words = [word for i in range(len(old)) for word in old.words(i)]
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Ignoring unreadable subtitle store {path}: {e}")
+    save(srt_path, read_srt(srt_path), words)
+    return path
+
+
+def open_track(srt_path):
+    """Opens the up-to-date Track for an SRT, building it first if needed."""
+    return Track(sync(srt_path))
+
+
+def read_cues(srt_path):
+    """Every cue of an SRT, read from its .subs. A drop-in for srt.read_srt."""
+    try:
+        with open_track(srt_path) as track:
+            return list(track)
+    except (OSError, ValueError) as e:
+        print(f"⚠️ Subtitle store unavailable for {srt_path} ({e}); parsing the SRT.")
+        return read_srt(srt_path)
+
+
+def export_srt(subs_path, srt_path):
+    """Writes a .subs file back out as SRT."""
+    with Track(subs_path) as track:
+        write_srt(srt_path, [(cue.start, cue.end, cue.text) for cue in track])
+    return srt_path
@@ -0,0 +1,74 @@
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+from .srt import read_srt, align_tracks
+from . import subtitle_store
+
+CACHE_SIZE = 256
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def _track_path(video_folder, youtube_id, lang_code):
+    return os.path.join(video_folder, f"{youtube_id}.{lang_code}.srt") if lang_code else None
+
+
+def _mtime(path):
+    try:
+        return os.path.getmtime(path) if path else None
+    except OSError:
+        return None
+
+
+def _primary_cues(path):
+    """Cues of the first track with their word timings as [[start, end], ...] (None without timings)."""
+    try:
+        with subtitle_store.open_track(path) as track:
+            return [(cue, [[word.start, word.end] for word in track.words(i)] if track.has_words else None)
+                    for i, cue in enumerate(track)]
+    except (OSError, ValueError) as e:
+        print(f"⚠️ Subtitle store unavailable for {path} ({e}); parsing the SRT.")
+        return [(cue, None) for cue in read_srt(path)]
+
+
+def _build(path1, path2):
+    primary = sorted(_primary_cues(path1), key=lambda item: item[0].start) if path1 else []
+    secondary = sorted(subtitle_store.read_cues(path2), key=lambda cue: cue.start) if path2 else []
+    words = {id(cue): cue_words for cue, cue_words in primary}
+    blocks = []
+    for cue, match in align_tracks([cue for cue, _ in primary], secondary):
+        block = {'start': cue.start, 'end': cue.end, 'text1': cue.text, 'text2': match.text if match else ''}
+        if words[id(cue)]:
+            block['words1'] = words[id(cue)]
+        blocks.append(block)
+    return blocks
+
+
+def get_aligned(video_folder, youtube_id, lang1, lang2):
+    """Returns (etag, payload) for two aligned tracks, or None if a requested track doesn't exist.
+
+    Results are cached per (video, lang1, lang2) and rebuilt when either SRT's mtime changes.
+    """
+    path1 = _track_path(video_folder, youtube_id, lang1)
+    path2 = _track_path(video_folder, youtube_id, lang2)
+    mtimes = (_mtime(path1), _mtime(path2))
+    if (path1 and mtimes[0] is None) or (path2 and mtimes[1] is None):
+        return None
+
+    key = (youtube_id, lang1, lang2)
+    with _cache_lock:
+        cached = _cache.get(key)
+        if cached and cached[0] == mtimes:
+            _cache.move_to_end(key)
+            return cached[1], cached[2]
+
+    payload = {'youtube_id': youtube_id, 'lang1': lang1, 'lang2': lang2, 'blocks': _build(path1, path2)}
+    etag = hashlib.sha1(repr((key, mtimes)).encode('utf-8')).hexdigest()
+    with _cache_lock:
+        _cache[key] = (mtimes, etag, payload)
+        _cache.move_to_end(key)
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    return etag, payload
@@ -0,0 +1,158 @@
+import os
+import sys
+import glob
+import argparse
+import tempfile
+from fractions import Fraction
+import database
+from . import library
+
+# Widths of the WebP variants the library grid picks from with srcset; cards are 340px and up
+WIDTHS = tuple(sorted(int(width) for width in os.environ.get('THUMBNAIL_WIDTHS', '320,480,720').split(',')))
+WEBP_QUALITY = int(os.environ.get('THUMBNAIL_QUALITY', '75'))
+# How far into the video a frame is taken from when YouTube has no thumbnail
+FRAME_POSITION = 0.2
+
+
+def variant_path(thumbnail_path, width):
+    """<id>.jpg -> <id>.<width>.webp, next to it. Works for filesystem paths and static-relative ones."""
+    return f"{os.path.splitext(thumbnail_path)[0]}.{width}.webp"
+
+
+def _write(path, packets):
+    # A temp file of its own, so an ingest and a backfill making the same variant can't clobber each other
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or '.', prefix=f"{os.path.basename(path)}.", suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            for packet in packets:
+                f.write(bytes(packet))
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def _encode(codec, frame, pix_fmt, path, options):
+    import av
+
+    context = av.CodecContext.create(codec, 'w')
+    context.width, context.height, context.pix_fmt = frame.width, frame.height, pix_fmt
+    context.time_base = Fraction(1, 25)
+    context.options = options
+    _write(path, context.encode(frame.reformat(format=pix_fmt)) + context.encode(None))
+
+
+def extract_frame(video_path, thumbnail_path, position=FRAME_POSITION):
+    """Saves the frame `position` of the way into a video as a JPEG. Returns its path, or None."""
+    import av
+
+    try:
+        with av.open(video_path) as container:
+            if not container.streams.video:
+                return None
+            target = (container.duration or 0) / av.time_base * position
+            if target:
+                # Lands on the keyframe before the target; decode forward from there
+                container.seek(int(target * av.time_base))
+            frame = None
+            for frame in container.decode(video=0):
+                if frame.time is None or frame.time >= target:
+                    break
+            if frame is None:
+                return None
+            os.makedirs(os.path.dirname(thumbnail_path), exist_ok=True)
+            _encode('mjpeg', frame, 'yuvj420p', thumbnail_path, {'qscale': '3'})
+    except (av.FFmpegError, OSError) as e:
+        print(f"⚠️ Could not extract a thumbnail frame from {video_path}: {e}")
+        return None
+    print(f"Extracted a thumbnail frame from '{os.path.basename(video_path)}'.")
+    return thumbnail_path
+
+
+def make_variants(thumbnail_path):
+    """Writes the WebP width variants of a thumbnail, skipping ones newer than it. Returns the widths.
+
+    Nothing is upscaled: a source narrower than every width gets one variant at its own width.
+    """
+    import av
+
+    with av.open(thumbnail_path) as container:
+        source = next(container.decode(video=0))
+    widths = [width for width in WIDTHS if width <= source.width] or [source.width]
+    source_mtime = os.path.getmtime(thumbnail_path)
+    for width in widths:
+        path = variant_path(thumbnail_path, width)
+        if os.path.exists(path) and os.path.getmtime(path) >= source_mtime:
+            continue
+        # Even height, as the 4:2:0 encoder needs
+        height = max(2, round(source.height * width / source.width / 2) * 2)
+        scaled = source.reformat(width, height, format='yuv420p', interpolation='AREA')
+        _encode('libwebp', scaled, 'yuv420p', path, {'quality': str(WEBP_QUALITY)})
+    return widths
+
+
+def process(youtube_id, video_save_path, filename=None):
+    """Makes sure a library video has a local thumbnail and its WebP variants, and records both.
+
+    Uses the downloaded YouTube thumbnail when there is one, otherwise a frame of the mp4.
+    Failures are logged rather than raised, so they never fail an ingest. Returns the widths.
+    """
+    thumbnail_path = os.path.join(video_save_path, 'thumbnails', f"{youtube_id}.jpg")
+    try:
+        if not os.path.exists(thumbnail_path):
+            video_path = os.path.join(video_save_path, filename or f"{youtube_id}.mp4")
+            if not os.path.exists(video_path) or not extract_frame(video_path, thumbnail_path):
+                return []
+        widths = make_variants(thumbnail_path)
+    except Exception as e:
+        print(f"⚠️ Could not make thumbnails for {youtube_id}: {e}")
+        return []
+    thumbnail = os.path.relpath(thumbnail_path, os.path.dirname(video_save_path)).replace(os.sep, '/')
+    library.set_thumbnail(youtube_id, thumbnail, widths)
+    return widths
+
+
+def remove(youtube_id, video_save_path):
+    """Deletes a video's thumbnail and every variant of it."""
+    removed = []
+    for path in glob.glob(os.path.join(glob.escape(os.path.join(video_save_path, 'thumbnails')), f"{glob.escape(youtube_id)}.*")):
+        try:
+            os.remove(path)
+            removed.append(path)
+        except OSError as e:
+            print(f"Error deleting file {path}: {e}")
+    return removed
+
+
+def backfill(video_save_path, force=False, progress=None):
+    """Generates thumbnails and variants for every library video that lacks the current set.
+
+    With force, every video is redone (for instance after changing THUMBNAIL_WIDTHS).
+    """
+    videos = library.list_videos_for_thumbnails(include_done=force)
+    counts = {'done': 0, 'missing': 0}
+    for number, video in enumerate(videos):
+        if progress:
+            progress('thumbnails', 100 * number / len(videos))
+        if process(video['youtube_id'], video_save_path, video['filename']):
+            counts['done'] += 1
+        else:
+            counts['missing'] += 1
+    print(f"✅ Thumbnails backfilled: {counts['done']} done, {counts['missing']} without a thumbnail or video.")
+    return counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate local thumbnails and their WebP variants for the library.")
+    parser.add_argument('--force', action='store_true', help="redo videos that already have variants")
+    parser.add_argument('--static-folder', default=os.path.join(os.path.dirname(__file__), 'static'))
+    args = parser.parse_args(argv)
+
+    database.init_db()
+    backfill(os.path.join(args.static_folder, 'videos'), force=args.force)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
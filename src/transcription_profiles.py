@@ -0,0 +1,124 @@
+import os
+import sys
+import time
+import argparse
+import platform
+from typing import NamedTuple
+from . import whisper_registry
+from . import audio_cache
+
+
+class Profile(NamedTuple):
+    name: str
+    description: str
+    model_size: str
+    compute_type: str
+    beam_size: int
+    batch_size: int = 0     # >0 runs faster-whisper's BatchedInferencePipeline with this many segments per batch
+    cpu_threads: int = 0    # 0 uses every core
+
+
+PROFILES = {
+    'fast': Profile('fast', "Small model, greedy decoding, batched", 'small', 'int8', beam_size=1, batch_size=16),
+    'balanced': Profile('balanced', "Medium model, batched", whisper_registry.DEFAULT_MODEL_SIZE,
+                        whisper_registry.DEFAULT_COMPUTE_TYPE, beam_size=5, batch_size=8),
+    'accurate': Profile('accurate', "Large model, full beam search over the whole clip", 'large-v3', 'int8', beam_size=5),
+}
+DEFAULT_PROFILE = os.environ.get("WHISPER_PROFILE", "balanced")
+# Overrides every profile's thread count, e.g. to leave cores free for the web process.
+CPU_THREADS = int(os.environ.get("WHISPER_CPU_THREADS", "0"))
+
+
+def get_profile(name=None):
+    """Returns the named profile, or the configured default (WHISPER_PROFILE) for unknown names.
+
+    'balanced' stands in when WHISPER_PROFILE isn't a profile either.
+    """
+    profile = PROFILES.get(name) or PROFILES.get(DEFAULT_PROFILE) or PROFILES['balanced']
+    return profile._replace(cpu_threads=CPU_THREADS or profile.cpu_threads or os.cpu_count() or 4)
+
+
+def warm_up(name=None):
+    """Loads the model a profile transcribes with (the default one unless named) in the background.
+
+    Goes through get_profile so the registry key, thread count included, is the one ingests ask for.
+    """
+    profile = get_profile(name)
+    return whisper_registry.warm_up(profile.model_size, profile.compute_type, profile.cpu_threads)
+
+
+def transcribe_options(profile, base_options):
+    options = dict(base_options, beam_size=profile.beam_size)
+    if profile.batch_size:
+        # The batched pipeline cuts the audio at VAD boundaries and decodes each piece independently.
+        options.pop('condition_on_previous_text', None)
+        options['batch_size'] = profile.batch_size
+    return options
+
+
+def transcribe(model, audio, profile, language=None, base_options=None):
+    """Runs model.transcribe, or the batched pipeline around it, with the profile's settings."""
+    options = transcribe_options(profile, base_options or {})
+    if profile.batch_size:
+        from faster_whisper import BatchedInferencePipeline
+
+        return BatchedInferencePipeline(model=model).transcribe(audio, language=language, **options)
+    return model.transcribe(audio, language=language, **options)
+
+
+def calibrate(media_path, names=None, language=None, base_options=None):
+    """Transcribes one clip with each profile and returns timings, including the real-time factor.
+
+    The first pass of each profile includes loading the model, so it is reported separately.
+    """
+    import numpy as np
+    from faster_whisper import decode_audio
+
+    audio = np.asarray(decode_audio(media_path, sampling_rate=audio_cache.SAMPLE_RATE))
+    duration = len(audio) / audio_cache.SAMPLE_RATE
+    results = []
+    for name in names or PROFILES:
+        profile = get_profile(name)
+        started = time.perf_counter()
+        model = whisper_registry.get_model(profile.model_size, profile.compute_type, profile.cpu_threads)
+        load_seconds = time.perf_counter() - started
+
+        started = time.perf_counter()
+        segments, info = transcribe(model, audio, profile, language=language, base_options=base_options)
+        segment_count = sum(1 for _ in segments)
+        elapsed = time.perf_counter() - started
+        results.append({
+            'profile': name, 'model_size': profile.model_size, 'compute_type': profile.compute_type,
+            'beam_size': profile.beam_size, 'batch_size': profile.batch_size, 'cpu_threads': profile.cpu_threads,
+            'load_seconds': load_seconds, 'transcribe_seconds': elapsed, 'audio_seconds': duration,
+            'real_time_factor': elapsed / duration if duration else None, 'segments': segment_count,
+            'language': info.language,
+        })
+        # Only one large model in memory at a time
+        whisper_registry.release_idle_models(max_idle=0)
+    return results
+
+
+def main(argv=None):
+    from .utils import TRANSCRIBE_OPTIONS
+
+    parser = argparse.ArgumentParser(description="Measure the real-time factor of each transcription profile on this machine.")
+    parser.add_argument('media', help="audio or video file to transcribe (a few minutes of music works well)")
+    parser.add_argument('--profiles', nargs='+', choices=sorted(PROFILES), help="profiles to measure (default: all)")
+    parser.add_argument('--lang', help="language code, skips language detection")
+    args = parser.parse_args(argv)
+
+    print(f"Calibrating on {platform.machine()} with {os.cpu_count()} CPUs, device '{whisper_registry.DEFAULT_DEVICE}'...")
+    results = calibrate(args.media, args.profiles, args.lang, TRANSCRIBE_OPTIONS)
+    print(f"{'profile':<10}{'model':<12}{'beam':>5}{'batch':>6}{'threads':>8}{'load s':>9}{'run s':>9}{'RTF':>7}")
+    for r in results:
+        # A zero-length clip has no real-time factor
+        rtf = f"{r['real_time_factor']:.2f}" if r['real_time_factor'] is not None else '-'
+        print(f"{r['profile']:<10}{r['model_size']:<12}{r['beam_size']:>5}{r['batch_size']:>6}{r['cpu_threads']:>8}"
+              f"{r['load_seconds']:>9.1f}{r['transcribe_seconds']:>9.1f}{rtf:>7}")
+    print("✅ RTF below 1.0 means faster than real time; set WHISPER_PROFILE to the best one that keeps up.")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,147 @@
+import os
+import re
+import json
+import time
+import requests
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from bs4 import BeautifulSoup
+from pydantic import BaseModel
+from . import translation_cache
+from . import metrics
+
+# How long a click waits for each upstream call, and how long it waits for the sentence before
+# answering with the word alone (the client then asks again with wait_for_sentence).
+WORD_TIMEOUT = float(os.environ.get("DEFINITION_WORD_TIMEOUT", "5"))
+SENTENCE_TIMEOUT = float(os.environ.get("DEFINITION_SENTENCE_TIMEOUT", "20"))
+FAST_RESPONSE_SECONDS = float(os.environ.get("DEFINITION_FAST_RESPONSE", "1.5"))
+
+# Separate pools, so a backlog of slow LLM sentence calls never queues the fast word lookups behind it
+UPSTREAM_WORKERS = int(os.environ.get("TRANSLATION_UPSTREAM_WORKERS", "16"))
+_word_upstream = ThreadPoolExecutor(max_workers=UPSTREAM_WORKERS, thread_name_prefix='translate-word')
+_sentence_upstream = ThreadPoolExecutor(max_workers=UPSTREAM_WORKERS, thread_name_prefix='translate-sentence')
+
+# Google Translate's no-JavaScript page: the same endpoint deep-translator scrapes, fetched here
+# so every request carries a timeout and reuses pooled connections.
+GOOGLE_TRANSLATE_URL = "https://translate.google.com/m"
+http_session = requests.Session()
+http_session.mount("https://", requests.adapters.HTTPAdapter(pool_maxsize=UPSTREAM_WORKERS))
+
+
+class WordAlignment(BaseModel):
+    source: str
+    target: str
+
+
+class SentenceTranslation(BaseModel):
+    translation: str
+    alignments: list[WordAlignment]
+
+
+def _normalize_word(word):
+    return word.strip(" .,!?¿¡\"'“”‘’()[]").lower()
+
+
+def translate_sentence(sentence, lang_code, client, model_name):
+    """Translates a sentence to English along with a word-by-word alignment, via the LLM."""
+    prompt = (
+        f"Translate the following sentence from the language with code '{lang_code}' to English. "
+        "Also align the sentence word by word: for every word of the original sentence, give the word as written "
+        "('source') and the word or short phrase of your English translation that most closely corresponds to it ('target'), "
+        "copied exactly as it appears in the translation."
+        f"\n\nSentence: \"{sentence}\""
+    )
+    with metrics.UPSTREAM_SECONDS.time(kind='sentence', outcome='error') as labels:
+        response = client.models.generate_content(
+            model=model_name,
+            contents=prompt,
+            config={
+                'temperature': 0.0,
+                'response_mime_type': "application/json",
+                'response_schema': SentenceTranslation,
+                # Milliseconds; ends the call itself, not just the click's wait, so hung requests free their thread
+                'http_options': {'timeout': int(SENTENCE_TIMEOUT * 1000)},
+            }
+        )
+        result = SentenceTranslation.model_validate(json.loads(response.text)).model_dump()
+        labels['outcome'] = 'ok'
+    return result
+
+
+def translate_word(word, lang_code):
+    """Translates a single word to English with Google Translate, giving up after WORD_TIMEOUT.
+
+    Scrapes an undocumented page, so a markup change surfaces as LookupError; define() turns
+    that, like a timeout, into a missing word translation rather than a failed click.
+    """
+    with metrics.UPSTREAM_SECONDS.time(kind='word', outcome='error') as labels:
+        response = http_session.get(GOOGLE_TRANSLATE_URL, params={'sl': lang_code or 'auto', 'tl': 'en', 'q': word.strip()},
+                                    timeout=WORD_TIMEOUT)
+        response.raise_for_status()
+        soup = BeautifulSoup(response.text, 'html.parser')
+        element = soup.find('div', {'class': 't0'}) or soup.find('div', {'class': 'result-container'})
+        if element is None:
+            raise LookupError(f"No translation found for '{word}'")
+        result = element.get_text(strip=True)
+        labels['outcome'] = 'ok'
+    return result
+
+
+def get_sentence_translation(sentence, lang_code, client, model_name):
+    """Cached translate_sentence; the result is shared by every word clicked in the sentence."""
+    return translation_cache.get_or_compute(
+        'sentence', lang_code, lambda: translate_sentence(sentence, lang_code, client, model_name), sentence=sentence
+    )
+
+
+def get_word_translation(word, lang_code):
+    return translation_cache.get_or_compute('word', lang_code, lambda: translate_word(word, lang_code), word=word)
+
+
+def _wait(future, timeout, what):
+    try:
+        return future.result(timeout=max(0.0, timeout))
+    except TimeoutError:
+        print(f"⚠️ {what} translation is still running after {timeout:.1f}s")
+    except Exception as e:
+        print(f"⚠️ {what} translation failed: {e}")
+    return None
+
+
+def define(sentence, word, lang_code, client, model_name, sentence_translation=None, word_translation=None, wait_for_sentence=False):
+    """Looks up whichever of the sentence and word translations isn't given, both at once.
+
+    Returns (sentence_translation or None, word_translation or None). The word lookup is fast,
+    so unless wait_for_sentence is set the sentence only gets FAST_RESPONSE_SECONDS; a late
+    sentence keeps running (and lands in the cache) while the caller returns the word alone.
+    """
+    started = time.monotonic()
+    sentence_future = word_future = None
+    if sentence_translation is None:
+        sentence_future = _sentence_upstream.submit(get_sentence_translation, sentence, lang_code, client, model_name)
+    if word_translation is None:
+        word_future = _word_upstream.submit(get_word_translation, word, lang_code)
+
+    if word_future:
+        word_translation = _wait(word_future, WORD_TIMEOUT, "Word")
+    if sentence_future:
+        budget = SENTENCE_TIMEOUT if wait_for_sentence else max(FAST_RESPONSE_SECONDS, WORD_TIMEOUT if word_translation is None else 0.0)
+        sentence_translation = _wait(sentence_future, budget - (time.monotonic() - started), "Sentence")
+    return sentence_translation, word_translation
+
+
+def highlight(sentence_translation, word, word_translation=None):
+    """Returns the translated sentence with the counterpart of `word` wrapped in <mark> tags."""
+    translation = sentence_translation['translation']
+    clicked = _normalize_word(word)
+    candidates = [a['target'] for a in sentence_translation.get('alignments', []) if _normalize_word(a['source']) == clicked]
+    if word_translation:
+        candidates.append(word_translation)
+
+    for target in candidates:
+        target = target.strip()
+        if not target:
+            continue
+        match = re.search(rf"(?<!\w){re.escape(target)}(?!\w)", translation, flags=re.IGNORECASE)
+        if match:
+            return f"{translation[:match.start()]}<mark>{match.group(0)}</mark>{translation[match.end():]}"
+    return translation
@@ -0,0 +1,161 @@
+import os
+import json
+import time
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+import database
+
+MEMORY_SIZE = int(os.environ.get("TRANSLATION_CACHE_MEMORY_SIZE", "5000"))
+MAX_ROWS = int(os.environ.get("TRANSLATION_CACHE_MAX_ROWS", "200000"))
+TTL_SECONDS = float(os.environ.get("TRANSLATION_CACHE_TTL", str(90 * 24 * 3600)))
+# Trim the table back to MAX_ROWS once every this many writes.
+EVICT_EVERY = 500
+
+_memory = OrderedDict()
+_lock = threading.Lock()
+_writes = 0
+_stats = {'memory_hits': 0, 'db_hits': 0, 'misses': 0, 'evictions': 0, 'coalesced': 0}
+# Computations in progress, so concurrent misses on the same key share one upstream call.
+_inflight = {}
+
+
+def _is_fresh(created_at, now):
+    return TTL_SECONDS <= 0 or now - created_at < TTL_SECONDS
+
+
+def _remember(key, value, created_at):
+    with _lock:
+        _memory[key] = (value, created_at)
+        _memory.move_to_end(key)
+        while len(_memory) > MEMORY_SIZE:
+            _memory.popitem(last=False)
+
+
+def get(kind, source_lang, sentence='', word=''):
+    """Returns the cached value for a key, checking memory before SQLite, or None."""
+    key = (kind, source_lang, sentence, word)
+    now = time.time()
+    with _lock:
+        entry = _memory.get(key)
+        if entry is not None:
+            if _is_fresh(entry[1], now):
+                _memory.move_to_end(key)
+                _stats['memory_hits'] += 1
+                return json.loads(entry[0])
+            del _memory[key]
+
+    conn = database.get_connection()
+    try:
+        row = conn.execute(
+            "SELECT value, created_at FROM translation_cache WHERE kind = ? AND source_lang = ? AND sentence = ? AND word = ?",
+            key
+        ).fetchone()
+        if row is not None and _is_fresh(row['created_at'], now):
+            conn.execute(
+                "UPDATE translation_cache SET last_access = ? WHERE kind = ? AND source_lang = ? AND sentence = ? AND word = ?",
+                (now, *key)
+            )
+            conn.commit()
+        elif row is not None:
+            conn.execute("DELETE FROM translation_cache WHERE kind = ? AND source_lang = ? AND sentence = ? AND word = ?", key)
+            conn.commit()
+            row = None
+    finally:
+        conn.close()
+
+    with _lock:
+        _stats['db_hits' if row is not None else 'misses'] += 1
+    if row is None:
+        return None
+    _remember(key, row['value'], row['created_at'])
+    return json.loads(row['value'])
+
+
+def put(kind, source_lang, value, sentence='', word=''):
+    """Stores a JSON-serialisable value in both tiers."""
+    global _writes
+    key = (kind, source_lang, sentence, word)
+    now = time.time()
+    encoded = json.dumps(value, ensure_ascii=False)
+    _remember(key, encoded, now)
+
+    conn = database.get_connection()
+    try:
+        conn.execute(
+            "INSERT OR REPLACE INTO translation_cache (kind, source_lang, sentence, word, value, created_at, last_access) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (*key, encoded, now, now)
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+    with _lock:
+        _writes += 1
+        should_evict = _writes % EVICT_EVERY == 0
+    if should_evict:
+        evict()
+
+
+def get_or_compute(kind, source_lang, compute, sentence='', word=''):
+    """Returns the cached value, or calls compute() and caches its result.
+
+    Concurrent misses on the same key are coalesced: only the first caller runs compute(),
+    the others wait for its result (or its exception).
+    """
+    value = get(kind, source_lang, sentence, word)
+    if value is not None:
+        return value
+
+    key = (kind, source_lang, sentence, word)
+    with _lock:
+        future = _inflight.get(key)
+        leader = future is None
+        if leader:
+            future = _inflight[key] = Future()
+        else:
+            _stats['coalesced'] += 1
+    if not leader:
+        return future.result()
+
+    try:
+        value = compute()
+        put(kind, source_lang, value, sentence, word)
+        future.set_result(value)
+        return value
+    except BaseException as e:
+        future.set_exception(e)
+        raise
+    finally:
+        with _lock:
+            _inflight.pop(key, None)
+
+
+def evict():
+    """Drops expired rows and trims the table to MAX_ROWS, least recently used first."""
+    conn = database.get_connection()
+    try:
+        removed = 0
+        if TTL_SECONDS > 0:
+            removed += conn.execute("DELETE FROM translation_cache WHERE created_at < ?", (time.time() - TTL_SECONDS,)).rowcount
+        excess = conn.execute("SELECT COUNT(*) FROM translation_cache").fetchone()[0] - MAX_ROWS
+        if excess > 0:
+            removed += conn.execute(
+                "DELETE FROM translation_cache WHERE rowid IN "
+                "(SELECT rowid FROM translation_cache ORDER BY last_access LIMIT ?)",
+                (excess,)
+            ).rowcount
+        conn.commit()
+    finally:
+        conn.close()
+    with _lock:
+        _stats['evictions'] += removed
+    return removed
+
+
+def stats():
+    with _lock:
+        lookups = _stats['memory_hits'] + _stats['db_hits'] + _stats['misses']
+        hit_rate = (_stats['memory_hits'] + _stats['db_hits']) / lookups if lookups else 0.0
+        return {**_stats, 'memory_entries': len(_memory), 'in_flight': len(_inflight), 'hit_rate': round(hit_rate, 3)}
@@ -0,0 +1,154 @@
+import os
+import re
+import json
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pydantic import BaseModel
+from . import srt_llm
+from . import subtitle_store
+from .translation import WordAlignment
+
+SENTENCE_BATCH_SIZE = 25
+WORD_BATCH_SIZE = 150
+
+_loaded = {}
+_loaded_lock = threading.Lock()
+
+
+class LineTranslation(BaseModel):
+    index: int
+    translation: str
+    alignments: list[WordAlignment]
+
+
+class LineTranslationBatch(BaseModel):
+    lines: list[LineTranslation]
+
+
+class WordTranslation(BaseModel):
+    word: str
+    translation: str
+
+
+class WordTranslationBatch(BaseModel):
+    words: list[WordTranslation]
+
+
+def sentence_key(sentence):
+    """Normalises a line the way it may come back from the player, where <br> joins lines without a space."""
+    return re.sub(r'\s+', '', sentence)
+
+
+def tokenize(text):
+    """Splits a line into clickable words exactly like wrapWordsInSpans in player.js."""
+    return [word.replace('.', '').replace(',', '').replace('!', '').replace('?', '') for word in text.split()]
+
+
+def index_path(video_save_path, youtube_id, lang_code):
+    return os.path.join(video_save_path, f"{youtube_id}.{lang_code}.translations.json")
+
+
+def _generate(client, model_name, prompt, schema):
+    response = client.models.generate_content(
+        model=model_name,
+        contents=prompt,
+        config={'temperature': 0.0, 'response_mime_type': "application/json", 'response_schema': schema}
+    )
+    return schema.model_validate(json.loads(response.text))
+
+
+def _translate_lines(lines, lang_code, client, model_name):
+    prompt = (
+        f"Translate each of the following numbered lines from the language with code '{lang_code}' to English. "
+        "For every line also align it word by word: for every word of the original line give the word as written "
+        "('source') and the word or short phrase of your English translation that most closely corresponds to it ('target'), "
+        "copied exactly as it appears in the translation. Return one entry per line with its 'index'.\n\n"
+        + "\n".join(json.dumps({"index": i, "text": line}, ensure_ascii=False) for i, line in lines)
+    )
+    batch = _generate(client, model_name, prompt, LineTranslationBatch)
+    return {item.index: item for item in batch.lines}
+
+
+def _translate_words(words, lang_code, client, model_name):
+    prompt = (
+        f"Translate each of the following words from the language with code '{lang_code}' to English, "
+        "as a short dictionary-style translation. Return one entry per word, with the word exactly as given.\n\n"
+        + "\n".join(words)
+    )
+    batch = _generate(client, model_name, prompt, WordTranslationBatch)
+    return {item.word: item.translation for item in batch.words}
+
+
+def build_index(srt_path, youtube_id, lang_code, client, model_name, video_save_path=None):
+    """Batch-translates every line and every distinct word of a subtitle track into a per-video index file."""
+    video_save_path = video_save_path or os.path.dirname(srt_path)
+    lines = list(dict.fromkeys(cue.text.replace('\n', ' ').strip() for cue in subtitle_store.read_cues(srt_path)))
+    lines = [line for line in lines if line]
+    words = list(dict.fromkeys(word for line in lines for word in tokenize(line) if word))
+    print(f"Precomputing translations for {len(lines)} lines and {len(words)} words ({lang_code} -> en)...")
+
+    line_batches = [list(enumerate(lines))[i:i + SENTENCE_BATCH_SIZE] for i in range(0, len(lines), SENTENCE_BATCH_SIZE)]
+    word_batches = [words[i:i + WORD_BATCH_SIZE] for i in range(0, len(words), WORD_BATCH_SIZE)]
+
+    sentences, word_translations = {}, {}
+    with ThreadPoolExecutor(max_workers=max(1, srt_llm.MAX_CONCURRENCY)) as pool:
+        line_futures = [pool.submit(_translate_lines, batch, lang_code, client, model_name) for batch in line_batches]
+        word_futures = [pool.submit(_translate_words, batch, lang_code, client, model_name) for batch in word_batches]
+        for future in line_futures:
+            try:
+                for index, item in future.result().items():
+                    if 0 <= index < len(lines):
+                        sentences[sentence_key(lines[index])] = {
+                            'translation': item.translation,
+                            'alignments': [a.model_dump() for a in item.alignments],
+                        }
+            except Exception as e:
+                # Misses fall back to on-demand translation at click time.
+                print(f"⚠️ Line batch translation failed: {e}")
+        for future in word_futures:
+            try:
+                word_translations.update(future.result())
+            except Exception as e:
+                print(f"⚠️ Word batch translation failed: {e}")
+
+    path = index_path(video_save_path, youtube_id, lang_code)
+    # Written aside and swapped in, so a click reading the index never sees half a file
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or '.', prefix=f"{os.path.basename(path)}.", suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump({'source_lang': lang_code, 'target_lang': 'en', 'sentences': sentences, 'words': word_translations},
+                      f, ensure_ascii=False)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    print(f"✅ Translation index saved: {path} ({len(sentences)}/{len(lines)} lines, {len(word_translations)}/{len(words)} words)")
+    return path
+
+
+def load_index(video_save_path, youtube_id, lang_code):
+    """Returns the parsed index for a track, reloading only when the file changes."""
+    path = index_path(video_save_path, youtube_id, lang_code)
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return None
+    with _loaded_lock:
+        cached = _loaded.get(path)
+        if cached and cached[0] == mtime:
+            return cached[1]
+    with open(path, 'r', encoding='utf-8') as f:
+        index = json.load(f)
+    with _loaded_lock:
+        _loaded[path] = (mtime, index)
+    return index
+
+
+def lookup(video_save_path, youtube_id, lang_code, sentence, word):
+    """Returns (sentence_translation or None, word_translation or None) from the precomputed index."""
+    index = load_index(video_save_path, youtube_id, lang_code)
+    if not index:
+        return None, None
+    return index['sentences'].get(sentence_key(sentence)), index['words'].get(word)
@@ -0,0 +1,58 @@
+import re
+import time
+import unicodedata
+import database
+
+# SQLite's default limit on bound parameters is 999; stay well under it per query.
+_BATCH = 500
+_WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_line(text):
+    """Key under which a subtitle line is remembered: NFC, case-folded, whitespace collapsed."""
+    return _WHITESPACE.sub(' ', unicodedata.normalize('NFC', text or '')).strip().casefold()
+
+
+def lookup(source_lang, target_lang, line_keys):
+    """Returns {line_key: translation} for the keys that have already been translated."""
+    line_keys = list(line_keys)
+    found = {}
+    conn = database.get_connection()
+    try:
+        for start in range(0, len(line_keys), _BATCH):
+            batch = line_keys[start:start + _BATCH]
+            rows = conn.execute(
+                f"SELECT line_key, translation FROM translation_memory WHERE source_lang = ? AND target_lang = ? "
+                f"AND line_key IN ({', '.join('?' * len(batch))})",
+                (source_lang, target_lang, *batch)
+            )
+            found.update((row['line_key'], row['translation']) for row in rows)
+    finally:
+        conn.close()
+    return found
+
+
+def store(source_lang, target_lang, entries):
+    """Remembers [(line_key, source_text, translation), ...] for a language pair."""
+    now = time.time()
+    conn = database.get_connection()
+    try:
+        with conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO translation_memory (source_lang, line_key, target_lang, source_text, translation, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [(source_lang, key, target_lang, source_text, translation, now) for key, source_text, translation in entries]
+            )
+    finally:
+        conn.close()
+
+
+def stats():
+    conn = database.get_connection()
+    try:
+        rows = conn.execute(
+            "SELECT source_lang, target_lang, COUNT(*) AS lines FROM translation_memory GROUP BY source_lang, target_lang"
+        ).fetchall()
+    finally:
+        conn.close()
+    return [dict(row) for row in rows]
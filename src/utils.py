@@ -1,14 +1,27 @@
 import os
 import glob
 import json
-import datetime
 import requests
-import yt_dlp
 import re
+import time
 import lyricsgenius
-from faster_whisper import WhisperModel
+from concurrent.futures import ThreadPoolExecutor
 from pydantic import BaseModel
 from dotenv import load_dotenv
+from . import whisper_registry
+from . import transcription_profiles
+from . import parallel_transcribe
+from . import srt_llm
+from . import translation_index
+from . import library
+from . import search
+from . import audio_cache
+from . import metadata_cache
+from . import translation_memory
+from . import metrics
+from . import subtitle_store
+from . import thumbnails
+from .srt import Cue, format_timestamp, write_srt, parse_subtitle_filename
 
 class MusicInfo(BaseModel):
     artist: str
@@ -17,10 +30,17 @@ class MusicInfo(BaseModel):
 
 load_dotenv()
 
+PARALLEL_TRANSCRIPTION = os.environ.get("PARALLEL_TRANSCRIPTION", "1") == "1"
+# Word-level start/end times, kept in the .subs store for karaoke highlighting
+WORD_TIMINGS = os.environ.get("SUBTITLE_WORD_TIMINGS", "1") == "1"
+TRANSCRIBE_OPTIONS = {"beam_size": 5, "temperature": 0.0, "condition_on_previous_text": False, "no_speech_threshold": 0.6,
+                      "word_timestamps": WORD_TIMINGS}
+
 # Client Setups
-print("Loading transcription model...")
-transcription_model = WhisperModel("medium", device="cpu", compute_type="int8")
-print("Transcription model loaded.")
+# One pooled session for thumbnails and other plain HTTP fetches, so bulk ingest reuses connections
+HTTP_TIMEOUT = 15
+http_session = requests.Session()
+http_session.mount("https://", requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=2))
 
 genius_token = os.environ.get("GENIUS_API_KEY")
 if genius_token:
@@ -30,21 +50,31 @@ else:
     genius = None
 
 # Helper Functions
-def format_timestamp(seconds: float):
-    """Converts seconds into SRT time format HH:MM:SS,ms"""
-    td = datetime.timedelta(seconds=seconds)
-    total_seconds = int(td.total_seconds())
-    hours, remainder = divmod(total_seconds, 3600)
-    minutes, seconds = divmod(remainder, 60)
-    milliseconds = int(td.microseconds / 1000)
-    return f"{hours:02}:{minutes:02}:{seconds:02},{milliseconds:03}"
-
-def get_lyrics_from_genius(title, artist):
-    """Searches for a song on Genius using a clean title and artist."""
+def _report(progress, stage, percent=None):
+    if progress:
+        progress(stage, percent)
+
+def _download_progress_hook(progress):
+    """Builds a yt-dlp progress hook that reports download percentage."""
+    def hook(d):
+        if d.get('status') == 'downloading':
+            total = d.get('total_bytes') or d.get('total_bytes_estimate')
+            if total:
+                _report(progress, 'downloading', 100.0 * d.get('downloaded_bytes', 0) / total)
+    return hook
+
+def get_lyrics_from_genius(title, artist, raise_errors=False):
+    """Searches for a song on Genius using a clean title and artist.
+
+    Returns None when the song isn't there; API and network errors are logged and give None
+    too, unless raise_errors is set.
+    """
     if not genius: return None
     try:
         print(f"Searching Genius for '{title}' by {artist}...")
-        song = genius.search_song(title, artist)
+        with metrics.GENIUS_SECONDS.time(found='error') as labels:
+            song = genius.search_song(title, artist)
+            labels['found'] = 'yes' if song else 'no'
         if song:
             print("✅ Found lyrics on Genius.")
             lyrics = re.sub(r'^.*Lyrics(\[.*?\])?\n', '', song.lyrics)
@@ -53,6 +83,8 @@ def get_lyrics_from_genius(title, artist):
         return None
     except Exception as e:
         print(f"⚠️ An error occurred with Genius API: {e}")
+        if raise_errors:
+            raise
         return None
 
 
@@ -92,81 +124,140 @@ def get_clean_title_and_artist_with_llm(video_title: str, client, model_name: st
         return video_title, None
 
 # Core Transcription & LLM Functions
-def transcribe_and_save_srt(video_path: str, lang_code: str = None) -> str:
-    """Generates an initial SRT file from a video using Whisper."""
-    print(f"Transcribing '{os.path.basename(video_path)}'...")
-    transcribe_options = {"temperature": 0.0, "condition_on_previous_text": False, "no_speech_threshold": 0.6}
-    segments, info = transcription_model.transcribe(video_path, language=lang_code, beam_size=5, **transcribe_options)
-
-    detected_lang_code = info.language
-    print(f"Detected language: {detected_lang_code.upper()}")
-    base_filename, _ = os.path.splitext(video_path)
-    output_srt_path = f"{base_filename}.{detected_lang_code}.srt"
-
-    with open(output_srt_path, "w", encoding="utf-8") as srt_file:
-        for i, segment in enumerate(segments):
-            start, end, text = segment.start, segment.end, segment.text.strip()
-            srt_file.write(f"{i + 1}\n{format_timestamp(start)} --> {format_timestamp(end)}\n{text}\n\n")
+def transcribe_and_save_srt(video_path: str, lang_code: str = None, progress=None, parallel=None, youtube_id=None, srt_base=None,
+                            profile=None) -> str:
+    """Generates an initial SRT file from a video using Whisper.
+
+    With a youtube_id the audio is decoded once into the PCM cache and read back from there
+    on every later run. The SRT is written to '<srt_base>.<lang>.srt' (default: next to the video).
+    profile names a transcription profile (fast/balanced/accurate); None uses WHISPER_PROFILE.
+    """
+    profile = transcription_profiles.get_profile(profile)
+    print(f"Transcribing '{os.path.basename(video_path)}' with the '{profile.name}' profile...")
+    base_filename = srt_base or os.path.splitext(video_path)[0]
+    _report(progress, 'transcribing', 0)
+
+    # Batched profiles already spread one clip over every core, so the process pool is only for unbatched ones
+    if (PARALLEL_TRANSCRIPTION if parallel is None else parallel) and not profile.batch_size:
+        options = transcription_profiles.transcribe_options(profile, TRANSCRIBE_OPTIONS)
+        result = parallel_transcribe.transcribe(video_path, lang_code=lang_code, options=options, progress=progress,
+                                                youtube_id=youtube_id, profile=profile)
+        if result:
+            detected_lang_code, segments = result
+            print(f"Detected language: {detected_lang_code.upper()}")
+            output_srt_path = f"{base_filename}.{detected_lang_code}.srt"
+            cues = [Cue(start, end, text) for start, end, text, _ in segments]
+            write_srt(output_srt_path, cues)
+            words = [subtitle_store.Word(*word) for _, _, _, segment_words in segments for word in segment_words]
+            subtitle_store.save(output_srt_path, cues, words if WORD_TIMINGS else None)
+            print(f"Initial transcription saved to '{output_srt_path}'")
+            return output_srt_path
+
+    audio_input = video_path
+    if youtube_id:
+        import numpy as np
+        audio_input = np.asarray(audio_cache.get_audio(youtube_id, video_path))
+
+    with whisper_registry.acquire_model(profile.model_size, profile.compute_type, profile.cpu_threads) as transcription_model:
+        # Started once the model is loaded, so the real-time factor is the transcription's alone
+        started = time.perf_counter()
+        segments, info = transcription_profiles.transcribe(transcription_model, audio_input, profile, language=lang_code,
+                                                           base_options=TRANSCRIBE_OPTIONS)
+
+        detected_lang_code = info.language
+        print(f"Detected language: {detected_lang_code.upper()}")
+        output_srt_path = f"{base_filename}.{detected_lang_code}.srt"
+
+        # segments is a lazy generator, so the model stays acquired while we consume it
+        cues, words = [], []
+        for segment in segments:
+            if info.duration:
+                _report(progress, 'transcribing', 100.0 * segment.end / info.duration)
+            cues.append(Cue(segment.start, segment.end, segment.text.strip()))
+            words.extend(subtitle_store.Word(word.start, word.end, word.word.strip()) for word in segment.words or ())
+    metrics.observe_transcription('serial', time.perf_counter() - started, info.duration)
+    write_srt(output_srt_path, cues)
+    subtitle_store.save(output_srt_path, cues, words if WORD_TIMINGS else None)
 
     print(f"Initial transcription saved to '{output_srt_path}'")
     return output_srt_path
 
-def correct_and_translate_srt_with_llm(srt_path, video_title, original_lang, target_lang, client, model_name, genius_lyrics=None):
-    """Uses two separate LLM calls to first correct an SRT file and then translate it."""
-    try:
-        with open(srt_path, 'r', encoding='utf-8') as f:
-            srt_content = f.read()
-
-        # --- First Pass: Correction ---
-        print("Starting LLM Pass 1: Correcting original lyrics...")
-        correction_instruction = (
-            f"The official lyrics for '{video_title}' are provided below. You must align these official lyrics with the timestamps from the original SRT file. "
-            f"Preserve the original numbering and timestamps perfectly, but replace the text with the accurate lyrics. in the language '{original_lang}'. "
-            f"Only output the raw, corrected SRT content and nothing else."
-            f"\n\n--- OFFICIAL LYRICS ---\n{genius_lyrics}"
-        ) if genius_lyrics else (
-            f"Search the web for the official lyrics of '{video_title}' in its native language ({original_lang}). "
-            "Then, use those official lyrics to correct any transcription errors in the provided SRT content. Only output the raw, corrected SRT content."
-        )
-        
-        correction_prompt = (
-            f"You are an expert SRT file processor. Your task is to correct the text of the provided SRT file using the official lyrics. "
-            f"{correction_instruction}\n\n"
-            f"\n\n--- ORIGINAL SRT CONTENT WITH TIMESTAMPS ---\n{srt_content}"        )
-
-        correction_response = client.models.generate_content(model=model_name, contents=correction_prompt)
-        corrected_original_srt = correction_response.text.strip()
-
-        with open(srt_path, 'w', encoding='utf-8') as f:
-            f.write(corrected_original_srt)
-        print("✅ Correction complete.")
-
-        # --- Second Pass: Translation ---
-        print("Starting LLM Pass 2: Translating corrected lyrics...")
-        translation_prompt = (
-            f"You are an expert SRT file translator. Your task is to translate the text portion of the provided SRT file into the language with the code '{target_lang}'. "
-            f"You MUST preserve the original timestamps and numbering perfectly. Only output the raw, translated SRT content."
-            f"\n\n--- CORRECTED SRT CONTENT TO TRANSLATE ---\n{corrected_original_srt}"
-        )
+def correct_srt_with_llm(srt_path, video_title, original_lang, client, model_name, genius_lyrics=None, progress=None):
+    """Corrects a transcribed SRT file in place, sending overlapping windows of cues to the LLM in parallel.
 
-        translation_response = client.models.generate_content(model=model_name, contents=translation_prompt)
-        translated_srt = translation_response.text.strip()
-        
-        base_filename, _ = os.path.splitext(srt_path)
-        translated_srt_path = f"{base_filename.rsplit('.', 1)[0]}.{target_lang}.srt"
-        with open(translated_srt_path, 'w', encoding='utf-8') as f:
-            f.write(translated_srt)
-            
-        print(f"✅ Translation complete. New file saved: {translated_srt_path}")
-    except Exception as e:
-        print(f"⚠️ LLM processing failed: {e}")
+    Errors propagate so the ingest pipeline can record the stage as failed and retry it later.
+    """
+    cues = subtitle_store.read_cues(srt_path)
+    print(f"Starting LLM Pass 1: Correcting original lyrics ({len(cues)} cues)...")
+    _report(progress, 'correcting')
+    correction_instruction = (
+        f"The official lyrics for '{video_title}' are provided below. Align these official lyrics with the transcribed lines "
+        f"and replace the text of each line with the accurate lyrics in the language '{original_lang}'."
+        f"\n\n--- OFFICIAL LYRICS ---\n{genius_lyrics}"
+    ) if genius_lyrics else (
+        f"Use the official lyrics of '{video_title}' in its native language ({original_lang}) "
+        "to correct any transcription errors in the provided lines."
+    )
+    correction_prompt = (
+        "You are an expert subtitle processor. Your task is to correct the text of transcribed subtitle lines using the official lyrics. "
+        f"{correction_instruction}"
+    )
+    with metrics.LLM_PASS_SECONDS.time(operation='correction'):
+        corrected_cues = srt_llm.process_cues(cues, correction_prompt, client, model_name)
+    write_srt(srt_path, corrected_cues)
+    print("✅ Correction complete.")
+    return srt_path
+
+def translate_srt_with_llm(srt_path, original_lang, target_langs, client, model_name, progress=None):
+    """Translates an SRT file into '<id>.<lang>.srt' next to it for every target language.
+
+    Each unique line is sent once, and only if the translation memory doesn't already hold it,
+    so repeated choruses and lines seen in other videos cost nothing. Languages are translated
+    concurrently. Returns {target_lang: path}.
+    """
+    if isinstance(target_langs, str):
+        target_langs = [target_langs]
+    cues = subtitle_store.read_cues(srt_path)
+    line_keys = [translation_memory.normalize_line(cue.text) for cue in cues]
+    unique_lines = {}
+    for key, cue in zip(line_keys, cues):
+        if key:
+            unique_lines.setdefault(key, cue.text)
+    print(f"Starting LLM Pass 2: Translating {len(unique_lines)} unique of {len(cues)} lines into {', '.join(target_langs)}...")
+    _report(progress, 'translating')
+    base_filename = os.path.splitext(srt_path)[0].rsplit('.', 1)[0]
+
+    def translate_into(target_lang):
+        translations = translation_memory.lookup(original_lang, target_lang, unique_lines)
+        missing = [key for key in unique_lines if key not in translations]
+        if missing:
+            translation_prompt = (
+                f"You are an expert subtitle translator. Your task is to translate each of the provided subtitle lines "
+                f"from '{original_lang}' into the language with the code '{target_lang}'."
+            )
+            line_cues = [Cue(0.0, 0.0, unique_lines[key]) for key in missing]
+            with metrics.LLM_PASS_SECONDS.time(operation='translation'):
+                translated = srt_llm.process_cues(line_cues, translation_prompt, client, model_name)
+            new_translations = {key: cue.text for key, cue in zip(missing, translated)}
+            translation_memory.store(original_lang, target_lang, [(key, unique_lines[key], new_translations[key]) for key in missing])
+            translations.update(new_translations)
+
+        translated_srt_path = f"{base_filename}.{target_lang}.srt"
+        write_srt(translated_srt_path, [(cue.start, cue.end, translations.get(key, cue.text)) for key, cue in zip(line_keys, cues)])
+        print(f"✅ Translation into '{target_lang}' complete ({len(missing)} new lines, {len(unique_lines) - len(missing)} from memory). "
+              f"New file saved: {translated_srt_path}")
+        return translated_srt_path
+
+    with ThreadPoolExecutor(max_workers=max(1, min(len(target_langs), srt_llm.MAX_CONCURRENCY))) as pool:
+        return dict(zip(target_langs, pool.map(translate_into, target_langs)))
 
 # Main Workflow Functions
 def get_subtitle_options(video_url):
-    """Fetches a list of OFFICIAL subtitles for a video, ignoring auto-captions."""
-    ydl_opts = {'listsubtitles': True, 'quiet': True}
-    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-        info = ydl.extract_info(video_url, download=False)
+    """Fetches a list of OFFICIAL subtitles for a video, ignoring auto-captions.
+
+    This also fills the metadata cache, so the download that follows doesn't extract again.
+    """
+    info = metadata_cache.get_info(video_url)
     
     subtitles_list = []
     if 'subtitles' in info and info.get('subtitles'):
@@ -176,79 +267,67 @@ def get_subtitle_options(video_url):
     
     return {'youtube_id': info.get('id'), 'title': info.get('title'), 'subtitles': subtitles_list, 'has_subs': len(subtitles_list) > 0}
 
-def download_and_transcribe(video_url, video_save_path, use_genius, client, model_name, lang_code=None, target_lang='en'):
-    """Orchestrates the full Whisper -> Genius -> LLM workflow."""
+def precompute_translations(youtube_id, video_save_path, client, model_name, progress=None):
+    """Builds a translation index for every non-English subtitle track of a video."""
+    _report(progress, 'indexing')
+    for srt_path in glob.glob(os.path.join(video_save_path, f'{youtube_id}.*.srt')):
+        parsed = parse_subtitle_filename(os.path.basename(srt_path))
+        if not parsed or parsed[0] != youtube_id:
+            continue
+        lang_code = parsed[1]
+        if lang_code.lower().startswith('en'):
+            continue
+        try:
+            translation_index.build_index(srt_path, youtube_id, lang_code, client, model_name, video_save_path)
+        except Exception as e:
+            print(f"⚠️ Could not precompute translations for {lang_code}: {e}")
+
+def download_audio_file(video_url, video_save_path, progress=None):
+    """Downloads only the audio track of a video, for transcription, and returns its path."""
+    _report(progress, 'downloading', 0)
+    ydl_opts = {'format': 'bestaudio[ext=m4a]/bestaudio', 'outtmpl': os.path.join(video_save_path, '%(id)s.audio.%(ext)s'), 'quiet': True,
+                'progress_hooks': [_download_progress_hook(progress)]}
+    return metadata_cache.download(video_url, ydl_opts)[1]
+
+def download_video_file(video_url, video_save_path):
+    """Downloads the mp4 for a video and returns its path."""
     ydl_opts = {'format': 'bestvideo[ext=mp4]+bestaudio[ext=m4a]/mp4/best', 'outtmpl': os.path.join(video_save_path, '%(id)s.%(ext)s'), 'quiet': True}
-    
-    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-        info = ydl.extract_info(video_url, download=False)
-        title, youtube_id = info.get('title'), info.get('id')
-    
-    genius_lyrics = None
-    if use_genius:
-        clean_title, clean_artist = get_clean_title_and_artist_with_llm(title, client, model_name)
-        
-        if clean_title and clean_artist:
-            genius_lyrics = get_lyrics_from_genius(clean_title, clean_artist)
-
-    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-        info = ydl.extract_info(video_url, download=True)
-        video_filename = ydl.prepare_filename(info)
+    return metadata_cache.download(video_url, ydl_opts)[1]
 
-    initial_srt_path = transcribe_and_save_srt(video_filename, lang_code=lang_code)
+def download_thumbnail(youtube_id, thumbnail_folder):
+    """Saves the best available YouTube thumbnail for a video. Returns its path, or None if none exists."""
+    os.makedirs(thumbnail_folder, exist_ok=True)
+    thumbnail_path = os.path.join(thumbnail_folder, f"{youtube_id}.jpg")
+    if os.path.exists(thumbnail_path):
+        return thumbnail_path
 
-    if initial_srt_path:
-        original_lang = os.path.basename(initial_srt_path).split('.')[-2]
-        correct_and_translate_srt_with_llm(initial_srt_path, title, original_lang, target_lang, client, model_name, genius_lyrics)
-    
-    # Update library.json
-    library_path = 'library.json'
-    try:
-        with open(library_path, 'r', encoding='utf-8') as f: library_data = json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError): library_data = {}
-    library_data[youtube_id] = title
-    with open(library_path, 'w', encoding='utf-8') as f: json.dump(library_data, f, indent=4, ensure_ascii=False)
-    
-    return title
-def download_video_and_subs(video_url, lang_codes, video_save_path):
+    print(f"Downloading thumbnail for {youtube_id}...")
+    for quality in ["maxresdefault", "sddefault", "hqdefault", "default"]:
+        thumbnail_url = f"https://i.ytimg.com/vi/{youtube_id}/{quality}.jpg"
+        try:
+            response = http_session.get(thumbnail_url, timeout=HTTP_TIMEOUT)
+        except requests.exceptions.RequestException as e:
+            print(f"Could not download thumbnail: {e}")
+            return None
+        if response.status_code == 200:
+            with open(thumbnail_path, "wb") as f:
+                f.write(response.content)
+            print(f"✅ Thumbnail saved in '{quality}' quality.")
+            return thumbnail_path
+    print("⚠️ Thumbnail not found in any resolution.")
+    return None
+
+def download_video_and_subs(video_url, lang_codes, video_save_path, progress=None, client=None, model_name=None, precompute=False):
     """
-    Downloads video/subs, saves the title to library.json, and downloads a thumbnail.
+    Downloads video/subs and a thumbnail, and adds the video to the library catalog.
     """
-    with yt_dlp.YoutubeDL({'quiet': True}) as ydl:
-        info = ydl.extract_info(video_url, download=False)
-        title = info.get('title', 'video')
-        youtube_id = info.get('id')
+    _report(progress, 'metadata')
+    info = metadata_cache.get_info(video_url)
+    title = info.get('title', 'video')
+    youtube_id = info.get('id')
 
-    library_path = 'library.json'
-    try:
-        with open(library_path, 'r', encoding='utf-8') as f:
-            library_data = json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError):
-        library_data = {}
-    library_data[youtube_id] = title
-    with open(library_path, 'w', encoding='utf-8') as f:
-        json.dump(library_data, f, indent=4, ensure_ascii=False)
-    
     thumbnail_folder = os.path.join(video_save_path, "thumbnails")
-    os.makedirs(thumbnail_folder, exist_ok=True)
-    thumbnail_path = os.path.join(thumbnail_folder, f"{youtube_id}.jpg")
-    
-    if not os.path.exists(thumbnail_path):
-        print(f"Downloading thumbnail for {youtube_id}...")
-        for quality in ["maxresdefault", "sddefault", "hqdefault", "default"]:
-            thumbnail_url = f"https://i.ytimg.com/vi/{youtube_id}/{quality}.jpg"
-            try:
-                response = requests.get(thumbnail_url)
-                if response.status_code == 200:
-                    with open(thumbnail_path, "wb") as f:
-                        f.write(response.content)
-                    print(f"✅ Thumbnail saved in '{quality}' quality.")
-                    break
-            except requests.exceptions.RequestException as e:
-                print(f"Could not download thumbnail: {e}")
-                break
-        else:
-            print("⚠️ Thumbnail not found in any resolution.")
+    thumbnail_path = download_thumbnail(youtube_id, thumbnail_folder)
 
     ydl_opts = {
         'format': 'bestvideo[ext=mp4]+bestaudio[ext=m4a]/mp4/best',
@@ -257,23 +336,32 @@ def download_video_and_subs(video_url, lang_codes, video_save_path):
         'subtitleslangs': lang_codes,
         'subtitlesformat': 'srt',
         'quiet': True,
+        'progress_hooks': [_download_progress_hook(progress)],
     }
 
     print(f"Downloading '{title}'...")
-    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-        ydl.download([video_url])
+    _report(progress, 'downloading', 0)
+    metadata_cache.download(video_url, ydl_opts)
     print("Download complete.")
+
+    thumbnail = None
+    if thumbnail_path:
+        thumbnail = os.path.relpath(thumbnail_path, os.path.dirname(video_save_path)).replace(os.sep, '/')
+    library.add_video(youtube_id, title, f"{youtube_id}.mp4", thumbnail)
+    thumbnails.process(youtube_id, video_save_path)
+    library.sync_subtitles(youtube_id, video_save_path)
+    search.sync_video(youtube_id, video_save_path)
+
+    if precompute and client:
+        precompute_translations(youtube_id, video_save_path, client, model_name, progress=progress)
     return title
 
 
 def delete_video_files(youtube_id, video_save_path):
-    """Deletes a video, its thumbnail, all subtitles, and its library entry."""
+    """Deletes a video, its thumbnails, all subtitles, and its library entry."""
     print(f"Attempting to delete files for {youtube_id}...")
     video_files_pattern = os.path.join(video_save_path, f'{youtube_id}.*')
     files_to_delete = glob.glob(video_files_pattern)
-    thumbnail_path = os.path.join(video_save_path, "thumbnails", f"{youtube_id}.jpg")
-    if os.path.exists(thumbnail_path):
-        files_to_delete.append(thumbnail_path)
 
     for f in files_to_delete:
         try:
@@ -281,15 +369,11 @@ def delete_video_files(youtube_id, video_save_path):
             print(f"Deleted file: {f}")
         except OSError as e:
             print(f"Error deleting file {f}: {e}")
-
-    library_path = 'library.json'
-    try:
-        with open(library_path, 'r', encoding='utf-8') as f:
-            library_data = json.load(f)
-        if youtube_id in library_data:
-            del library_data[youtube_id]
-            print(f"Removed {youtube_id} from library.json")
-        with open(library_path, 'w', encoding='utf-8') as f:
-            json.dump(library_data, f, indent=4, ensure_ascii=False)
-    except (FileNotFoundError, json.JSONDecodeError):
-        print("library.json not found or is empty.")
+    for f in thumbnails.remove(youtube_id, video_save_path):
+        print(f"Deleted file: {f}")
+
+    if audio_cache.remove(youtube_id):
+        print(f"Deleted cached audio for {youtube_id}")
+    if library.remove_video(youtube_id):
+        print(f"Removed {youtube_id} from the library catalog")
+    search.remove_video(youtube_id)
@@ -0,0 +1,195 @@
+import csv
+import io
+import json
+import time
+import base64
+import html
+import database
+
+PAGE_SIZE = 100
+EXPORT_BATCH = 1000
+# Keeps a single bulk request from holding the write lock for too long
+MAX_BULK = 5000
+
+_WORD_COLUMNS = 'id, word, lang, youtube_id, timestamp, definition, context, created_at'
+
+
+def _entry_row(entry, now):
+    word = (entry.get('word') or '').strip()
+    definition = entry.get('definition')
+    context = entry.get('context')
+    if not word or not definition or not context:
+        raise ValueError("Every word needs a word, definition and context")
+    timestamp = entry.get('timestamp')
+    if timestamp not in (None, ''):
+        try:
+            timestamp = float(timestamp)
+        except (TypeError, ValueError):
+            raise ValueError(f"Invalid timestamp for '{word}': {timestamp!r}") from None
+    else:
+        timestamp = None
+    return (word, (entry.get('lang') or entry.get('lang_code') or '').lower(), entry.get('youtube_id') or '',
+            timestamp, definition, context, now)
+
+
+def save_words(entries):
+    """Saves many words in one transaction. Returns how many were new.
+
+    A word already saved for the same language and video is left as it was.
+    """
+    if len(entries) > MAX_BULK:
+        raise ValueError(f"At most {MAX_BULK} words per request")
+    now = time.time()
+    rows = [_entry_row(entry, now) for entry in entries]
+    conn = database.get_connection()
+    try:
+        with conn:
+            # rowcount, unlike total_changes, leaves out the flashcard rows added by trigger
+            return conn.executemany(
+                "INSERT OR IGNORE INTO vocabulary (word, lang, youtube_id, timestamp, definition, context, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows
+            ).rowcount
+    finally:
+        conn.close()
+
+
+def save_word(word, definition, context, lang=None, youtube_id=None, timestamp=None):
+    return save_words([{'word': word, 'definition': definition, 'context': context, 'lang': lang,
+                        'youtube_id': youtube_id, 'timestamp': timestamp}]) == 1
+
+
+def delete_words(ids):
+    """Deletes words by id in one transaction. Returns how many were deleted."""
+    ids = [int(word_id) for word_id in ids]
+    if len(ids) > MAX_BULK:
+        raise ValueError(f"At most {MAX_BULK} words per request")
+    conn = database.get_connection()
+    try:
+        with conn:
+            return conn.executemany("DELETE FROM vocabulary WHERE id = ?", [(word_id,) for word_id in ids]).rowcount
+    finally:
+        conn.close()
+
+
+def delete_word(word):
+    """Deletes every saved entry of a word, in any language."""
+    conn = database.get_connection()
+    try:
+        with conn:
+            return conn.execute("DELETE FROM vocabulary WHERE word = ?", (word,)).rowcount
+    finally:
+        conn.close()
+
+
+def encode_cursor(row):
+    return base64.urlsafe_b64encode(json.dumps([row['word'], row['id']]).encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor):
+    """The (word, id) a page ends at; ValueError for anything that isn't a cursor we issued."""
+    try:
+        word, word_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        return str(word), int(word_id)
+    except (TypeError, ValueError, UnicodeError) as e:
+        raise ValueError("Invalid cursor") from e
+
+
+def list_words(lang=None, after=None, limit=PAGE_SIZE):
+    """Returns (words, next_cursor) for one page in alphabetical order.
+
+    Pages are keyed on the last (word, id) seen rather than an offset, so page 500 costs
+    the same index seek as page 1. next_cursor is None on the last page.
+    """
+    query = f"SELECT {_WORD_COLUMNS} FROM vocabulary"
+    conditions, params = [], []
+    if lang:
+        conditions.append("lang = ?")
+        params.append(lang)
+    if after:
+        conditions.append("(word, id) > (?, ?)")
+        params += decode_cursor(after)
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    query += " ORDER BY word, id LIMIT ?"
+    params.append(limit + 1)
+    conn = database.get_connection()
+    try:
+        rows = [dict(row) for row in conn.execute(query, params)]
+    finally:
+        conn.close()
+    next_cursor = encode_cursor(rows[limit - 1]) if len(rows) > limit else None
+    return rows[:limit], next_cursor
+
+
+def count_words(lang=None):
+    conn = database.get_connection()
+    try:
+        if lang:
+            return conn.execute("SELECT COUNT(*) FROM vocabulary WHERE lang = ?", (lang,)).fetchone()[0]
+        return conn.execute("SELECT COUNT(*) FROM vocabulary").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def list_langs():
+    conn = database.get_connection()
+    try:
+        return [row[0] for row in conn.execute("SELECT DISTINCT lang FROM vocabulary WHERE lang != '' ORDER BY lang")]
+    finally:
+        conn.close()
+
+
+def iter_words(lang=None):
+    """Yields every saved word in order, a page at a time, without holding a read open between pages."""
+    after = None
+    while True:
+        words, after = list_words(lang, after, EXPORT_BATCH)
+        yield from words
+        if after is None:
+            return
+
+
+def _export(rows, write_header, write_row):
+    buffer = io.StringIO()
+    write_header(buffer)
+    for count, row in enumerate(rows, 1):
+        write_row(buffer, row)
+        if count % EXPORT_BATCH == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def export_csv(lang=None):
+    """Yields the vocabulary as CSV text in chunks, for a streaming response."""
+    columns = ['word', 'lang', 'definition', 'context', 'youtube_id', 'timestamp']
+
+    def header(buffer):
+        csv.writer(buffer).writerow(columns)
+
+    def row(buffer, word):
+        csv.writer(buffer).writerow([word[column] if word[column] is not None else '' for column in columns])
+
+    return _export(iter_words(lang), header, row)
+
+
+def _anki_field(text):
+    return html.escape(text or '').replace('\t', ' ').replace('\r\n', '<br>').replace('\n', '<br>')
+
+
+def export_anki(lang=None):
+    """Yields the vocabulary as an Anki import file (tab-separated, HTML fields, tags column).
+
+    Front is the word; back is the definition with the context sentence under it.
+    """
+    def header(buffer):
+        buffer.write("#separator:tab\n#html:true\n#tags column:3\n")
+
+    def row(buffer, word):
+        back = f"{_anki_field(word['definition'])}<br><i>{_anki_field(word['context'])}</i>"
+        tags = ' '.join(tag for tag in ('lingopy', word['lang'], word['youtube_id'] and f"yt:{word['youtube_id']}") if tag)
+        buffer.write(f"{_anki_field(word['word'])}\t{back}\t{tags}\n")
+
+    return _export(iter_words(lang), header, row)
@@ -0,0 +1,138 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+from . import metrics
+
+DEFAULT_MODEL_SIZE = os.environ.get("WHISPER_MODEL_SIZE", "medium")
+DEFAULT_COMPUTE_TYPE = os.environ.get("WHISPER_COMPUTE_TYPE", "int8")
+DEFAULT_DEVICE = os.environ.get("WHISPER_DEVICE", "cpu")
+# Transcriptions one loaded model can run at the same time (CTranslate2 replicas share the weights).
+NUM_WORKERS = int(os.environ.get("WHISPER_NUM_WORKERS", "1"))
+# Seconds a model may sit unused before release_idle_models() drops it. 0 disables.
+IDLE_TIMEOUT = float(os.environ.get("WHISPER_IDLE_TIMEOUT", "1800"))
+
+
+class _Entry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.model = None
+        self.last_used = time.monotonic()
+        self.in_use = 0
+
+
+_entries = {}
+_entries_lock = threading.Lock()
+_reaper = None
+# Other holders of models (the parallel transcription pool) that release_idle_models also asks to let go
+_release_hooks = []
+
+
+def _key(size, compute_type, cpu_threads=0):
+    return (size or DEFAULT_MODEL_SIZE, compute_type or DEFAULT_COMPUTE_TYPE, cpu_threads or 0)
+
+
+def _get_entry(key):
+    with _entries_lock:
+        entry = _entries.get(key)
+        if entry is None:
+            entry = _entries[key] = _Entry()
+        return entry
+
+
+def _load(entry, key):
+    """Loads the model for an entry once; concurrent callers wait on the entry lock."""
+    with entry.lock:
+        if entry.model is None:
+            from faster_whisper import WhisperModel
+
+            size, compute_type, cpu_threads = key
+            print(f"Loading transcription model ({size}, {compute_type}, {cpu_threads or 'default'} threads)...")
+            started = time.monotonic()
+            entry.model = WhisperModel(size, device=DEFAULT_DEVICE, compute_type=compute_type, cpu_threads=cpu_threads,
+                                       num_workers=NUM_WORKERS)
+            print(f"Transcription model loaded in {time.monotonic() - started:.1f}s.")
+            metrics.WHISPER_LOAD_SECONDS.observe(time.monotonic() - started, mode='serial')
+        entry.last_used = time.monotonic()
+        return entry.model
+
+
+def get_model(size=None, compute_type=None, cpu_threads=0):
+    """Returns the shared WhisperModel for (size, compute_type, cpu_threads), loading it on first use."""
+    key = _key(size, compute_type, cpu_threads)
+    return _load(_get_entry(key), key)
+
+
+@contextmanager
+def acquire_model(size=None, compute_type=None, cpu_threads=0):
+    """Like get_model, but keeps the model from being released while the block runs."""
+    key = _key(size, compute_type, cpu_threads)
+    entry = _get_entry(key)
+    with _entries_lock:
+        entry.in_use += 1
+    try:
+        yield _load(entry, key)
+    finally:
+        with _entries_lock:
+            entry.in_use -= 1
+            entry.last_used = time.monotonic()
+
+
+def is_loaded(size=None, compute_type=None, cpu_threads=0):
+    entry = _entries.get(_key(size, compute_type, cpu_threads))
+    return entry is not None and entry.model is not None
+
+
+def warm_up(size=None, compute_type=None, cpu_threads=0):
+    """Loads a model in a daemon thread so the first transcription doesn't pay for it."""
+    def _warm():
+        try:
+            get_model(size, compute_type, cpu_threads)
+        except Exception as e:
+            print(f"⚠️ Background model warm-up failed: {e}")
+
+    thread = threading.Thread(target=_warm, name="whisper-warmup", daemon=True)
+    thread.start()
+    return thread
+
+
+def release_idle_models(max_idle=None):
+    """Drops models that haven't been used for max_idle seconds. Returns the released keys."""
+    max_idle = IDLE_TIMEOUT if max_idle is None else max_idle
+    now = time.monotonic()
+    released = []
+    with _entries_lock:
+        for key, entry in list(_entries.items()):
+            if entry.model is None or entry.in_use:
+                continue
+            if now - entry.last_used >= max_idle:
+                # Take the entry lock so we never drop a model mid-load.
+                with entry.lock:
+                    entry.model = None
+                released.append(key)
+    for size, compute_type, _ in released:
+        print(f"Released idle transcription model ({size}, {compute_type}).")
+    for hook in _release_hooks:
+        hook(max_idle)
+    return released
+
+
+def add_release_hook(hook):
+    """Registers hook(max_idle), called by every release_idle_models() pass."""
+    _release_hooks.append(hook)
+
+
+def start_idle_reaper(interval=60):
+    """Starts a daemon thread that periodically releases idle models."""
+    global _reaper
+    if IDLE_TIMEOUT <= 0 or (_reaper and _reaper.is_alive()):
+        return _reaper
+
+    def _reap():
+        while True:
+            time.sleep(interval)
+            release_idle_models()
+
+    _reaper = threading.Thread(target=_reap, name="whisper-reaper", daemon=True)
+    _reaper.start()
+    return _reaper
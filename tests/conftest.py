@@ -0,0 +1,47 @@
+"""Runs everything against a scratch database and folder, with the offline fakes from
+benchmarks/fakes.py in place of yt-dlp, Gemini, Genius, Google Translate and Whisper.
+
+The environment is set before anything from `src` is imported, since several modules
+read it at import time.
+"""
+import os
+import sys
+import shutil
+import tempfile
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+WORKDIR = tempfile.mkdtemp(prefix='lingopy-test-')
+
+os.environ['LINGOPY_DB'] = os.path.join(WORKDIR, 'library.db')
+os.environ['LINGOPY_STATIC_FOLDER'] = WORKDIR
+os.environ['LINGOPY_LIBRARY_JSON'] = os.path.join(WORKDIR, 'library.json')
+os.environ['AUDIO_CACHE_DIR'] = os.path.join(WORKDIR, 'audio_cache')
+os.environ['PARALLEL_TRANSCRIPTION'] = '0'
+os.environ['WHISPER_WARMUP'] = '0'
+sys.path.insert(0, ROOT)
+
+from benchmarks import fakes  # noqa: E402
+
+SAMPLE_CLIP = fakes.write_sample_clip(os.path.join(WORKDIR, 'sample.wav'))
+GEMINI = fakes.install(SAMPLE_CLIP)
+
+import database  # noqa: E402
+
+database.init_db()
+
+
+@pytest.fixture(scope='session', autouse=True)
+def _scratch_folder():
+    yield
+    shutil.rmtree(WORKDIR, ignore_errors=True)
+
+
+@pytest.fixture
+def workdir():
+    return WORKDIR
+
+
+@pytest.fixture
+def gemini():
+    return GEMINI
@@ -0,0 +1,20 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from benchmarks import fakes
+from src import audio_cache
+
+
+def test_concurrent_decodes_publish_one_complete_cache(workdir, monkeypatch):
+    clip = fakes.write_sample_clip(os.path.join(workdir, 'decode.wav'), seconds=30)
+    expected = fakes.decode_audio(clip)
+    # A fresh lock per call, as separate processes would have
+    monkeypatch.setattr(audio_cache, '_lock_for', lambda youtube_id: threading.Lock())
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        results = list(pool.map(lambda _: np.array(audio_cache.get_audio('decode00001', clip)), range(4)))
+
+    for audio in results:
+        np.testing.assert_array_equal(audio, expected)
+    assert [name for name in os.listdir(audio_cache.AUDIO_CACHE_DIR) if name.startswith('decode00001')] == ['decode00001.f32']
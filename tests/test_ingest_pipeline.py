@@ -0,0 +1,59 @@
+import os
+from types import SimpleNamespace
+import pytest
+from benchmarks import fakes
+from src import ingest_pipeline, utils
+
+PARAMS = {'use_genius': True, 'lang_code': None, 'target_langs': ['en'], 'precompute_translations': False}
+
+
+class FlakyGenius(fakes.FakeGenius):
+    """Fails its first `failures` searches, as Genius does when rate limiting."""
+
+    def __init__(self, failures):
+        super().__init__()
+        self.failures = failures
+        self.searches = 0
+
+    def search_song(self, title, artist):
+        self.searches += 1
+        if self.searches <= self.failures:
+            raise ConnectionError("429 Too Many Requests")
+        return super().search_song(title, artist)
+
+
+@pytest.fixture
+def video_folder(workdir):
+    folder = os.path.join(workdir, 'videos')
+    os.makedirs(folder, exist_ok=True)
+    return folder
+
+
+def _lyrics_stage(youtube_id):
+    return next(stage for stage in ingest_pipeline.get_state(youtube_id)['stages'] if stage['stage'] == 'lyrics')
+
+
+def test_failed_genius_lookup_is_retried_on_resume(video_folder, gemini, monkeypatch):
+    genius = FlakyGenius(failures=1)
+    monkeypatch.setattr(utils, 'genius', genius)
+    ingest_pipeline.run("https://www.youtube.com/watch?v=lyrics00001", PARAMS, video_folder, gemini, 'fake-model')
+    assert _lyrics_stage('lyrics00001')['output'] == {'use_genius': True, 'lyrics': None, 'lookup_failed': True}
+
+    ingest_pipeline.resume('lyrics00001', video_folder, gemini, 'fake-model')
+    assert genius.searches == 2
+    assert _lyrics_stage('lyrics00001')['output']['lyrics'].splitlines() == fakes.LYRICS
+
+
+def test_song_missing_from_genius_is_not_looked_up_again(video_folder, gemini, monkeypatch):
+    genius = SimpleNamespace(searches=0)
+
+    def search_song(title, artist):
+        genius.searches += 1
+        return None
+
+    genius.search_song = search_song
+    monkeypatch.setattr(utils, 'genius', genius)
+    ingest_pipeline.run("https://www.youtube.com/watch?v=lyrics00002", PARAMS, video_folder, gemini, 'fake-model')
+    ingest_pipeline.resume('lyrics00002', video_folder, gemini, 'fake-model')
+    assert genius.searches == 1
+    assert _lyrics_stage('lyrics00002')['output'] == {'use_genius': True, 'lyrics': None}
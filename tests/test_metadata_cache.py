@@ -0,0 +1,106 @@
+import os
+import itertools
+from types import SimpleNamespace
+import pytest
+import yt_dlp
+from benchmarks import fakes
+from src import metadata_cache, utils, library
+
+URL = "https://www.youtube.com/watch?v={}"
+
+
+class CountingYoutubeDL(fakes.FakeYoutubeDL):
+    """Counts extractions and stamps each with a generation; downloads from an expired generation fail."""
+    extractions = []
+    expired = set()
+    _generations = itertools.count(1)
+
+    def extract_info(self, url, download=False):
+        info = dict(super().extract_info(url, download=False), format_generation=next(self._generations))
+        self.extractions.append(info['id'])
+        return self.process_ie_result(info, download=True) if download else info
+
+    def process_ie_result(self, info, download=True):
+        if download and info.get('format_generation') in self.expired:
+            raise yt_dlp.utils.DownloadError("HTTP Error 403: Forbidden")
+        return super().process_ie_result(info, download)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """metadata_cache's view of time.time(), moved by hand."""
+    clock = SimpleNamespace(now=1_000_000.0)
+    monkeypatch.setattr(metadata_cache, 'time', SimpleNamespace(time=lambda: clock.now))
+    return clock
+
+
+@pytest.fixture(autouse=True)
+def extractor():
+    CountingYoutubeDL.extractions = []
+    CountingYoutubeDL.expired = set()
+    CountingYoutubeDL._generations = itertools.count(1)
+    conn = metadata_cache.database.get_connection()
+    with conn:
+        conn.execute("DELETE FROM video_metadata")
+    conn.close()
+    metadata_cache.set_extractor(CountingYoutubeDL)
+    yield CountingYoutubeDL
+    metadata_cache.set_extractor(fakes.FakeYoutubeDL)
+
+
+def test_miss_then_hit(clock):
+    before = metadata_cache.stats()
+    first = metadata_cache.get_info(URL.format('aaaaaaaaaaa'))
+    first['title'] = "changed by the caller"
+    second = metadata_cache.get_info(URL.format('aaaaaaaaaaa'))
+    after = metadata_cache.stats()
+
+    assert CountingYoutubeDL.extractions == ['aaaaaaaaaaa']
+    assert second['title'] != "changed by the caller"
+    assert after['misses'] - before['misses'] == 1
+    assert after['hits'] - before['hits'] == 1
+
+
+def test_entries_expire_after_the_ttl(clock, monkeypatch):
+    monkeypatch.setattr(metadata_cache, 'TTL_SECONDS', 60)
+    metadata_cache.get_info(URL.format('bbbbbbbbbbb'))
+    clock.now += 59
+    metadata_cache.get_info(URL.format('bbbbbbbbbbb'))
+    assert CountingYoutubeDL.extractions == ['bbbbbbbbbbb']
+
+    clock.now += 1
+    metadata_cache.get_info(URL.format('bbbbbbbbbbb'))
+    assert CountingYoutubeDL.extractions == ['bbbbbbbbbbb', 'bbbbbbbbbbb']
+
+
+def test_least_recently_used_entries_are_evicted_past_the_cap(clock, monkeypatch):
+    monkeypatch.setattr(metadata_cache, 'MAX_ROWS', 3)
+    for youtube_id in ('ccccccccccc', 'ddddddddddd', 'eeeeeeeeeee'):
+        clock.now += 1
+        metadata_cache.get_info(URL.format(youtube_id))
+    clock.now += 1
+    metadata_cache.get_info(URL.format('ccccccccccc'))  # a hit: now the most recently used
+    clock.now += 1
+    metadata_cache.get_info(URL.format('fffffffffff'))
+
+    conn = metadata_cache.database.get_connection()
+    cached = {row[0] for row in conn.execute("SELECT youtube_id FROM video_metadata")}
+    conn.close()
+    assert cached == {'ccccccccccc', 'eeeeeeeeeee', 'fffffffffff'}
+
+
+def test_stale_format_urls_are_extracted_again(workdir, clock):
+    video_folder = os.path.join(workdir, 'videos')
+    os.makedirs(video_folder, exist_ok=True)
+    url = URL.format('ggggggggggg')
+    cached = metadata_cache.get_info(url)
+    # The cached format URLs have expired since, as they do after a few hours
+    CountingYoutubeDL.expired.add(cached['format_generation'])
+
+    utils.download_video_and_subs(url, ['es'], video_folder)
+
+    assert CountingYoutubeDL.extractions == ['ggggggggggg', 'ggggggggggg']
+    assert os.path.exists(os.path.join(video_folder, 'ggggggggggg.mp4'))
+    assert os.path.exists(os.path.join(video_folder, 'ggggggggggg.es.srt'))
+    assert library.get_video('ggggggggggg')['title'] == "Fake Artist - Song ggggggggggg (Official Video)"
+    assert metadata_cache.get_info(url)['format_generation'] == cached['format_generation'] + 1
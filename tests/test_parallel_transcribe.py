@@ -0,0 +1,42 @@
+import os
+from benchmarks import fakes
+from src import utils, parallel_transcribe, subtitle_store
+
+
+def _track(srt_path):
+    """Cues and word timings of a saved transcription, rounded to the millisecond."""
+    def ms(seconds):
+        return round(seconds * 1000)
+
+    with subtitle_store.open_track(srt_path) as track:
+        return [(ms(cue.start), ms(cue.end), cue.text, [(ms(w.start), ms(w.end), w.text) for w in track.words(i)])
+                for i, cue in enumerate(track)]
+
+
+def test_chunked_transcription_matches_serial(workdir, monkeypatch, capsys):
+    clip = fakes.write_sample_clip(os.path.join(workdir, 'long.wav'), seconds=240)
+    # Forked workers inherit the fake faster_whisper module; spawned ones would look for the real one
+    monkeypatch.setattr(parallel_transcribe, 'START_METHOD', 'fork')
+    monkeypatch.setattr(parallel_transcribe, 'WORKERS', 2)
+    try:
+        serial = utils.transcribe_and_save_srt(clip, parallel=False, youtube_id='testlong000', profile='accurate',
+                                               srt_base=os.path.join(workdir, 'serial'))
+        chunked = utils.transcribe_and_save_srt(clip, parallel=True, youtube_id='testlong000', profile='accurate',
+                                                srt_base=os.path.join(workdir, 'chunked'))
+    finally:
+        parallel_transcribe.release_idle_pool(max_idle=0)
+
+    # The chunked run must not have quietly fallen back to the serial path
+    assert "in 4 chunks across 2 workers" in capsys.readouterr().out
+    assert os.path.basename(serial) == 'serial.es.srt'
+    assert os.path.basename(chunked) == 'chunked.es.srt'
+    assert len(_track(serial)) == 80
+    assert _track(chunked) == _track(serial)
+
+
+def test_batched_profiles_stay_on_the_serial_path(workdir, monkeypatch):
+    calls = []
+    monkeypatch.setattr(parallel_transcribe, 'transcribe', lambda *args, **kwargs: calls.append(args))
+    utils.transcribe_and_save_srt(fakes.write_sample_clip(os.path.join(workdir, 'short.wav')), parallel=True,
+                                  profile='balanced', srt_base=os.path.join(workdir, 'batched'))
+    assert calls == []
@@ -0,0 +1,79 @@
+import json
+import threading
+from types import SimpleNamespace
+import pytest
+from src import srt_llm
+from src.srt import Cue
+
+
+class ScriptedLLM:
+    """Answers each window from `script(own_start, own_end, attempt)`, which returns the 'cues' payload."""
+
+    def __init__(self, script):
+        self.script = script
+        self.models = self
+        self.attempts = {}
+        self._lock = threading.Lock()
+
+    def generate_content(self, model, contents, config=None):
+        section = contents.split('--- LINES TO PROCESS ---\n', 1)[1].split('\n\n', 1)[0]
+        indices = [json.loads(line)['index'] for line in section.splitlines()]
+        own_start, own_end = indices[0] - 1, indices[-1]
+        with self._lock:
+            attempt = self.attempts.get(own_start, 0)
+            self.attempts[own_start] = attempt + 1
+        return SimpleNamespace(text=json.dumps({'cues': self.script(own_start, own_end, attempt)}))
+
+
+def _upper(start, end):
+    return [{'index': i + 1, 'text': f"LINE {i}"} for i in range(start, end)]
+
+
+@pytest.fixture
+def cues():
+    return [Cue(i * 2.0, i * 2.0 + 1.5, f"line {i}") for i in range(25)]
+
+
+@pytest.fixture(autouse=True)
+def _no_backoff(monkeypatch):
+    monkeypatch.setattr(srt_llm.time, 'sleep', lambda seconds: None)
+
+
+def _process(cues, client, **kwargs):
+    return srt_llm.process_cues(cues, "Uppercase every line.", client, 'fake-model', window_size=10, overlap=2, **kwargs)
+
+
+def test_windows_cover_every_cue_once():
+    windows = srt_llm.make_windows(25, window_size=10, overlap=2)
+    assert windows == [(0, 0, 10, 12), (8, 10, 20, 22), (18, 20, 25, 25)]
+
+
+def test_valid_responses_replace_text_only(cues):
+    result = _process(cues, ScriptedLLM(lambda start, end, attempt: _upper(start, end)))
+    assert [cue.text for cue in result] == [f"LINE {i}" for i in range(25)]
+    assert [(cue.start, cue.end) for cue in result] == [(cue.start, cue.end) for cue in cues]
+
+
+@pytest.mark.parametrize('broken', [
+    pytest.param(lambda start, end: _upper(start, end) + [{'index': end + 1, 'text': "extra"}], id='out-of-range index'),
+    pytest.param(lambda start, end: _upper(start, end)[:-1], id='missing cue'),
+    pytest.param(lambda start, end: _upper(start, end - 1) + [{'index': start + 1, 'text': "again"}], id='duplicate index'),
+    pytest.param(lambda start, end: _upper(start, end) + [{'index': start + 1, 'text': "again"}], id='duplicate of a full set'),
+])
+def test_malformed_window_is_retried_alone(cues, broken):
+    # The middle window is malformed on its first attempt only
+    client = ScriptedLLM(lambda start, end, attempt: broken(start, end) if start == 10 and attempt == 0 else _upper(start, end))
+    result = _process(cues, client)
+    assert [cue.text for cue in result] == [f"LINE {i}" for i in range(25)]
+    assert client.attempts == {0: 1, 10: 2, 20: 1}
+
+
+def test_window_failing_every_attempt_keeps_its_original_text(cues):
+    client = ScriptedLLM(lambda start, end, attempt: _upper(start, end)[1:] if start == 10 else _upper(start, end))
+    with pytest.raises(srt_llm.SrtProcessingError, match="cues 11-20") as error:
+        _process(cues, client, max_attempts=3)
+    assert client.attempts[10] == 3
+    fallback = error.value.cues
+    assert len(fallback) == len(cues)
+    assert [(cue.start, cue.end) for cue in fallback] == [(cue.start, cue.end) for cue in cues]
+    assert [cue.text for cue in fallback] == [f"LINE {i}" if not 10 <= i < 20 else f"line {i}" for i in range(25)]
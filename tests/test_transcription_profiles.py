@@ -0,0 +1,25 @@
+import wave
+from src import transcription_profiles
+
+
+def test_unknown_names_fall_back_to_the_configured_default(monkeypatch):
+    monkeypatch.setattr(transcription_profiles, 'DEFAULT_PROFILE', 'accurate')
+    assert transcription_profiles.get_profile(None).name == 'accurate'
+    assert transcription_profiles.get_profile('no-such-profile').name == 'accurate'
+    assert transcription_profiles.get_profile('fast').name == 'fast'
+
+
+def test_unknown_default_falls_back_to_balanced(monkeypatch):
+    monkeypatch.setattr(transcription_profiles, 'DEFAULT_PROFILE', 'no-such-profile')
+    assert transcription_profiles.get_profile('no-such-profile').name == 'balanced'
+
+
+def test_calibration_table_handles_an_empty_clip(workdir, capsys):
+    clip = f"{workdir}/empty.wav"
+    with wave.open(clip, 'wb') as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(16000)
+    assert transcription_profiles.main([clip, '--profiles', 'fast']) == 0
+    row = capsys.readouterr().out.splitlines()[-2]
+    assert row.startswith('fast') and row.endswith('-')